@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class FinanzasConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'finanzas'
+
+    def ready(self):
+        # Conecta los receptores que mantienen los resúmenes
+        from finanzas import signals  # noqa: F401
@@ -0,0 +1,76 @@
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import connection
+
+from finanzas.models import Transaccion
+
+DESCRIPCIONES = [
+    "Supermercado", "Netflix", "Spotify", "Carga SUBE", "Farmacia",
+    "Sueldo", "Alquiler", "Luz", "Gas", "Internet", "Kiosco", "Taxi",
+    "Restaurante", "Transferencia a Juan", "Venta bicicleta", "Nafta",
+]
+DESTINOS = [None, "Coto", "Carrefour", "Mercado Libre", "Rappi", "YPF", "Dia"]
+
+
+class RollbackBenchmark(Exception):
+    """
+    Se lanza al final de un benchmark para descartar los datos sintéticos.
+    """
+
+
+def generar_transacciones(usuario, cantidad, rnd):
+    """
+    Genera (sin guardar) transacciones aleatorias repartidas en ~3 años.
+    """
+    categorias = [valor for valor, _ in Transaccion.CATEGORIA_CHOICES]
+    hoy = date.today()
+    for _ in range(cantidad):
+        yield Transaccion(
+            usuario=usuario,
+            tipo=rnd.choice(("ingreso", "gasto", "gasto", "gasto")),
+            cantidad=Decimal(rnd.randrange(100, 500000)) / 100,
+            descripcion=f"{rnd.choice(DESCRIPCIONES)} {rnd.randrange(1000)}",
+            categoria=rnd.choice(categorias),
+            destino=rnd.choice(DESTINOS),
+            fecha=hoy - timedelta(days=rnd.randrange(3 * 365)),
+        )
+
+
+def guardar_en_lotes(transacciones, batch_size=5000):
+    lote = []
+    for transaccion in transacciones:
+        lote.append(transaccion)
+        if len(lote) >= batch_size:
+            Transaccion.objects.bulk_create(lote)
+            lote = []
+    if lote:
+        Transaccion.objects.bulk_create(lote)
+
+
+def cargar_transacciones_sinteticas(usuarios, filas_por_usuario, batch_size=5000, semilla=1234):
+    """
+    Crea usuarios sintéticos con sus transacciones.
+    Devuelve la lista de usuarios creados.
+    """
+    rnd = random.Random(semilla)
+
+    creados = []
+    for i in range(usuarios):
+        usuario = User.objects.create_user(username=f"bench_{i}_{rnd.randrange(10**9)}")
+        creados.append(usuario)
+        guardar_en_lotes(generar_transacciones(usuario, filas_por_usuario, rnd), batch_size)
+
+    actualizar_estadisticas()
+    return creados
+
+
+def actualizar_estadisticas():
+    # Sin estadísticas el planificador puede ignorar los índices nuevos
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute("ANALYZE finanzas_transaccion")
+        else:
+            cursor.execute("ANALYZE")
@@ -0,0 +1,157 @@
+import base64
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from finanzas.utils.formatos import montos_en_texto
+
+# PNG de 1x1 que devuelve el stub de Telegram como "foto"
+PNG_MINIMO = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAAAAAA6fptVAAAACklEQVR4nGNgAAAAAgABSK+kcQAAAABJRU5ErkJggg=="
+)
+
+
+class _Manejador(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _responder(self, cuerpo, tipo="application/json", estado=200):
+        if not isinstance(cuerpo, bytes):
+            cuerpo = json.dumps(cuerpo).encode()
+        self.send_response(estado)
+        self.send_header("Content-Type", tipo)
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def _leer_json(self):
+        largo = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(largo) or b"{}")
+
+    def do_GET(self):
+        self.server.stub.registrar(self.path)
+        self.server.stub.esperar()
+        self.server.stub.get(self)
+
+    def do_POST(self):
+        self.server.stub.registrar(self.path)
+        self.server.stub.esperar()
+        self.server.stub.post(self, self._leer_json())
+
+
+class ServidorStub:
+    """
+    Servidor HTTP local en un thread, con latencia configurable
+    (latencia ± jitter, en milisegundos). Se usa como context manager.
+    """
+
+    def __init__(self, latencia_ms=0, jitter_ms=0, semilla=1):
+        self.latencia_ms = latencia_ms
+        self.jitter_ms = jitter_ms
+        self.rnd = random.Random(semilla)
+        self.lock = threading.Lock()
+        self.pedidos = {}
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.servidor.server_port}"
+
+    def __enter__(self):
+        self.servidor = ThreadingHTTPServer(("127.0.0.1", 0), _Manejador)
+        self.servidor.daemon_threads = True
+        self.servidor.stub = self
+        threading.Thread(target=self.servidor.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.servidor.shutdown()
+        self.servidor.server_close()
+
+    def registrar(self, ruta):
+        metodo = ruta.split("?")[0].rsplit("/", 1)[-1]
+        with self.lock:
+            self.pedidos[metodo] = self.pedidos.get(metodo, 0) + 1
+
+    def esperar(self):
+        if self.latencia_ms or self.jitter_ms:
+            with self.lock:
+                ms = self.latencia_ms + self.rnd.uniform(-self.jitter_ms, self.jitter_ms)
+            time.sleep(max(ms, 0) / 1000)
+
+    def get(self, manejador):
+        manejador._responder({"ok": False}, estado=404)
+
+    def post(self, manejador, cuerpo):
+        manejador._responder({"ok": False}, estado=404)
+
+
+class StubTelegram(ServidorStub):
+    """
+    Bot API: sendMessage, getFile, deleteWebhook, getUpdates (vacío) y la
+    descarga de archivos. Guarda los mensajes enviados en `enviados`.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.enviados = []
+
+    def get(self, manejador):
+        if "/file/" in manejador.path:
+            manejador._responder(PNG_MINIMO, tipo="image/png")
+        else:
+            super().get(manejador)
+
+    def post(self, manejador, cuerpo):
+        metodo = manejador.path.rsplit("/", 1)[-1]
+        if metodo == "sendMessage":
+            with self.lock:
+                self.enviados.append((cuerpo.get("chat_id"), cuerpo.get("text")))
+            resultado = {"message_id": len(self.enviados)}
+        elif metodo == "getFile":
+            resultado = {"file_id": cuerpo.get("file_id"), "file_path": f"photos/{cuerpo.get('file_id')}.png"}
+        elif metodo == "getUpdates":
+            resultado = []
+        else:
+            resultado = True
+        manejador._responder({"ok": True, "result": resultado})
+
+
+class StubOpenAI(ServidorStub):
+    """
+    /v1/chat/completions: devuelve un gasto por cada importe del mensaje del
+    usuario (en el formato que espera extraer_transacciones_openai).
+    """
+
+    def post(self, manejador, cuerpo):
+        mensajes = cuerpo.get("messages") or [{}]
+        texto = mensajes[-1].get("content") or ""
+
+        transacciones = []
+        for numero, linea in enumerate(texto.splitlines() or [""], start=1):
+            marcado = re.match(r"\[(\d+)\]\s*", linea)
+            for monto, _, _ in montos_en_texto(linea[marcado.end():] if marcado else linea):
+                transacciones.append({
+                    "tipo": "gasto", "monto": float(monto), "categoria": "Otros",
+                    "fecha": None, "destino": None, "descripcion": linea,
+                    "mensaje": int(marcado.group(1)) if marcado else numero,
+                    "confidence": 0.9,
+                })
+
+        contenido = json.dumps({"es_transaccion": bool(transacciones), "transacciones": transacciones})
+        manejador._responder({
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": cuerpo.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {"role": "assistant", "content": contenido},
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        })
@@ -0,0 +1,30 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from finanzas.utils.resumenes import reconstruir_resumen_diario
+
+
+class Command(BaseCommand):
+    help = 'Construye los rollups diarios (ResumenDiario) a partir de las transacciones existentes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuario', help='Username a procesar (por defecto todos)')
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Filas por bulk_create (default: 1000)',
+        )
+
+    def handle(self, *args, **options):
+        usuarios = User.objects.order_by('id')
+        if options['usuario']:
+            usuarios = usuarios.filter(username=options['usuario'])
+
+        total = 0
+        for usuario_id, username in usuarios.values_list('id', 'username').iterator():
+            filas = reconstruir_resumen_diario(usuario_id, batch_size=options['batch_size'])
+            total += filas
+            self.stdout.write(f'{username}: {filas} filas')
+
+        self.stdout.write(self.style.SUCCESS(f'Rollups diarios generados: {total}'))
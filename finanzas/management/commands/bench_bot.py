@@ -0,0 +1,183 @@
+import json
+import random
+import time
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from finanzas.benchmarks.datos import RollbackBenchmark
+from finanzas.benchmarks.stubs import StubOpenAI, StubTelegram
+from finanzas.models import Perfil
+from finanzas.utils import cache_ia, openai_cliente, telegram
+from finanzas.utils.cola_bot import completar_trabajo, fallar_trabajo, reclamar_lote
+from finanzas.views import procesar_updates
+
+CORPUS = Path(__file__).resolve().parents[2] / 'benchmarks' / 'updates_bot.json'
+# Chats sintéticos: lejos de cualquier chat_id real
+PRIMER_CHAT = 9_100_000
+
+
+def percentil(valores, p):
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * p))] if valores else 0
+
+
+class Command(BaseCommand):
+    help = (
+        'Reproduce un corpus de updates de Telegram contra el webhook con la API de '
+        'Telegram y OpenAI simuladas localmente (los datos se descartan al terminar)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--updates', type=int, default=300)
+        parser.add_argument('--chats', type=int, default=20)
+        parser.add_argument('--modo', choices=['sincrono', 'cola'], default='sincrono',
+                            help='sincrono: el webhook procesa; cola: encola y después procesa como run_bot_workers')
+        parser.add_argument('--latencia-telegram', type=float, default=30, help='ms por llamada')
+        parser.add_argument('--latencia-openai', type=float, default=400, help='ms por llamada')
+        parser.add_argument('--jitter', type=float, default=0.25, help='Variación de la latencia (fracción)')
+        parser.add_argument('--sin-parser-local', action='store_true')
+        parser.add_argument('--sin-cache-ia', action='store_true')
+        parser.add_argument('--corpus', default=str(CORPUS), help='JSON con una lista de "message" de ejemplo')
+        parser.add_argument('--semilla', type=int, default=1234)
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['corpus'], encoding='utf-8') as archivo:
+                mensajes = json.load(archivo)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"No se pudo leer el corpus: {e}")
+
+        jitter = options['jitter']
+        tg = StubTelegram(options['latencia_telegram'], options['latencia_telegram'] * jitter, options['semilla'])
+        oa = StubOpenAI(options['latencia_openai'], options['latencia_openai'] * jitter, options['semilla'])
+
+        with tg, oa, override_settings(
+            TELEGRAM_API_URL=tg.url,
+            TELEGRAM_TOKEN='bench',
+            # Los limitadores dormirían o cortarían mensajes: se mide el bot, no los límites
+            TELEGRAM_MENSAJES_POR_CHAT=10_000,
+            TELEGRAM_MENSAJES_POR_SEGUNDO=10_000,
+            BOT_IA_LLAMADAS_POR_MINUTO=0,
+            BOT_IA_LLAMADAS_POR_DIA=0,
+            OPENAI_BASE_URL=f"{oa.url}/v1",
+            OPENAI_API_KEY='bench',
+            TELEGRAM_WEBHOOK_ASINCRONO=options['modo'] == 'cola',
+            # Sin reintentos: un trabajo fallido no frena al resto de su chat
+            BOT_COLA_MAX_INTENTOS=1,
+            BOT_PARSER_LOCAL=not options['sin_parser_local'],
+            BOT_CACHE_IA_TAMANIO=0 if options['sin_cache_ia'] else 5000,
+            # Cache aparte: no dejar chats sintéticos en la cache real
+            CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+        ):
+            # Los clientes se crean con la configuración de arriba
+            telegram._cliente = None
+            openai_cliente._cliente = None
+            cache_ia._cache = None
+            try:
+                with transaction.atomic():
+                    resultado = self.correr(mensajes, options)
+                    raise RollbackBenchmark
+            except RollbackBenchmark:
+                pass
+            finally:
+                telegram._cliente = None
+                openai_cliente._cliente = None
+                cache_ia._cache = None
+
+        self.informar(resultado, tg, oa, options)
+
+    def crear_updates(self, mensajes, options):
+        rnd = random.Random(options['semilla'])
+        primer_update = rnd.randrange(10**8, 10**9)
+        ahora = int(time.time())
+        updates = []
+        for i in range(options['updates']):
+            mensaje = dict(rnd.choice(mensajes))
+            mensaje.update(
+                message_id=i + 1,
+                date=ahora + i,
+                chat={"id": PRIMER_CHAT + rnd.randrange(options['chats']), "type": "private"},
+            )
+            updates.append({"update_id": primer_update + i, "message": mensaje})
+        return updates
+
+    def correr(self, mensajes, options):
+        for i in range(options['chats']):
+            usuario = User.objects.create_user(username=f"bench_bot_{i}_{random.randrange(10**9)}")
+            Perfil.objects.create(user=usuario, telegram_chat_id=str(PRIMER_CHAT + i))
+
+        cliente = Client(raise_request_exception=False)
+        updates = self.crear_updates(mensajes, options)
+
+        latencias = []
+        consultas = 0
+        errores = 0
+        inicio = time.perf_counter()
+        for update in updates:
+            with CaptureQueriesContext(connection) as capturadas:
+                t0 = time.perf_counter()
+                respuesta = cliente.post('/webhook/telegram/', json.dumps(update), content_type='application/json')
+                latencias.append((time.perf_counter() - t0) * 1000)
+            consultas += len(capturadas)
+            errores += respuesta.status_code != 200
+        duracion_webhook = time.perf_counter() - inicio
+
+        resultado = {
+            'updates': len(updates),
+            'latencias': latencias,
+            'duracion': duracion_webhook,
+            'consultas': consultas,
+            'errores': errores,
+        }
+
+        if options['modo'] == 'cola':
+            # Lo que haría un worker de run_bot_workers, en este mismo thread
+            lotes = 0
+            inicio = time.perf_counter()
+            with CaptureQueriesContext(connection) as capturadas:
+                while True:
+                    lote = reclamar_lote()
+                    if not lote:
+                        break
+                    lotes += 1
+                    try:
+                        procesar_updates([trabajo.update for trabajo in lote])
+                    except Exception as e:
+                        resultado['errores'] += len(lote)
+                        for trabajo in lote:
+                            fallar_trabajo(trabajo, e)
+                    else:
+                        for trabajo in lote:
+                            completar_trabajo(trabajo)
+            resultado['duracion_workers'] = time.perf_counter() - inicio
+            resultado['consultas'] += len(capturadas)
+            resultado['lotes'] = lotes
+        return resultado
+
+    def informar(self, r, tg, oa, options):
+        n = r['updates']
+        latencias = r['latencias']
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"{n} updates, {options['chats']} chats, modo {options['modo']} "
+            f"(Telegram {options['latencia_telegram']:.0f} ms, OpenAI {options['latencia_openai']:.0f} ms)"
+        ))
+        self.stdout.write(
+            f"  Webhook:     p50 {percentil(latencias, .50):.1f} ms | p95 {percentil(latencias, .95):.1f} ms | "
+            f"p99 {percentil(latencias, .99):.1f} ms | {n / r['duracion']:.1f} updates/s"
+        )
+        if 'duracion_workers' in r:
+            self.stdout.write(
+                f"  Workers:     {n / r['duracion_workers']:.1f} updates/s en {r['lotes']} lotes (1 worker)"
+            )
+        self.stdout.write(f"  Consultas:   {r['consultas'] / n:.1f} por update")
+        self.stdout.write(
+            f"  Llamadas:    {oa.pedidos.get('completions', 0)} a OpenAI, "
+            f"{tg.pedidos.get('sendMessage', 0)} sendMessage, {tg.pedidos.get('getFile', 0)} getFile"
+        )
+        if r['errores']:
+            self.stdout.write(self.style.WARNING(f"  Errores:     {r['errores']}"))
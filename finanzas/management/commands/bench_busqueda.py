@@ -0,0 +1,80 @@
+import random
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Q
+
+from finanzas.benchmarks.datos import (
+    RollbackBenchmark,
+    actualizar_estadisticas,
+    cargar_transacciones_sinteticas,
+    generar_transacciones,
+    guardar_en_lotes,
+)
+from finanzas.models import Transaccion
+from finanzas.utils.busqueda import filtrar_por_texto
+from finanzas.utils.paginacion import aplicar_cursor
+
+
+def medir(queryset, repeticiones):
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        filas = list(queryset.all())
+    return (time.perf_counter() - inicio) * 1000 / repeticiones, len(filas)
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara la búsqueda por índice de texto completo contra LIKE %...% a medida '
+        'que crece la tabla (los datos se descartan al terminar)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pasos', type=int, default=4, help='Cantidad de veces que se agranda la tabla')
+        parser.add_argument('--filas', type=int, default=25000, help='Filas del usuario buscado por paso')
+        parser.add_argument('--repeticiones', type=int, default=20)
+
+    def handle(self, *args, **options):
+        if connection.vendor not in ('sqlite', 'postgresql'):
+            raise CommandError(f'Motor sin índice de texto completo: {connection.vendor}')
+
+        rnd = random.Random(99)
+        termino = 'zumbalandia'
+        self.stdout.write(f"{'filas':>10} {'índice (ms)':>12} {'LIKE (ms)':>10} {'resultados':>11}")
+        try:
+            with transaction.atomic():
+                objetivo = cargar_transacciones_sinteticas(1, 0)[0]
+                # Pocas coincidencias y antiguas: el peor caso para LIKE,
+                # que tiene que recorrer todo el historial del usuario
+                Transaccion.objects.bulk_create([
+                    Transaccion(
+                        usuario=objetivo, tipo='gasto', cantidad=1000,
+                        descripcion=f'Pago {termino.capitalize()} {i}', categoria='Servicios',
+                        fecha=date.today() - timedelta(days=4 * 365 + i),
+                    )
+                    for i in range(5)
+                ])
+
+                for paso in range(1, options['pasos'] + 1):
+                    guardar_en_lotes(generar_transacciones(objetivo, options['filas'], rnd))
+                    cargar_transacciones_sinteticas(2, options['filas'], semilla=paso)
+                    actualizar_estadisticas()
+
+                    base = aplicar_cursor(Transaccion.objects.filter(usuario=objetivo))
+                    con_indice = filtrar_por_texto(base, termino)[:20]
+                    con_like = base.filter(
+                        Q(descripcion__icontains=termino) | Q(destino__icontains=termino)
+                    )[:20]
+
+                    ms_indice, n = medir(con_indice, options['repeticiones'])
+                    ms_like, _ = medir(con_like, options['repeticiones'])
+                    self.stdout.write(
+                        f'{Transaccion.objects.count():>10} {ms_indice:>12.2f} {ms_like:>10.2f} {n:>11}'
+                    )
+
+                self.stdout.write(con_indice.explain())
+                raise RollbackBenchmark
+        except RollbackBenchmark:
+            pass
@@ -0,0 +1,108 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pytesseract
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from finanzas.utils.ocr import ocr_en_proceso, opciones_ocr
+
+EXTENSIONES = {'.jpg', '.jpeg', '.png', '.webp', '.tif', '.tiff', '.bmp'}
+
+
+def distancia(a, b):
+    """
+    Distancia de Levenshtein (inserciones, borrados y reemplazos de caracteres).
+    """
+    if len(a) < len(b):
+        a, b = b, a
+    anterior = list(range(len(b) + 1))
+    for i, ca in enumerate(a, start=1):
+        actual = [i]
+        for j, cb in enumerate(b, start=1):
+            actual.append(min(anterior[j] + 1, actual[j - 1] + 1, anterior[j - 1] + (ca != cb)))
+        anterior = actual
+    return anterior[-1]
+
+
+def precision_caracteres(obtenido, esperado):
+    obtenido = " ".join(obtenido.split())
+    esperado = " ".join(esperado.split())
+    if not esperado:
+        return 1.0 if not obtenido else 0.0
+    return max(0.0, 1 - distancia(obtenido, esperado) / len(esperado))
+
+
+def percentil(valores, p):
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * p))] if valores else 0
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara tiempo y precisión por caracter del OCR con y sin preprocesado sobre '
+        'una carpeta de fotos (el texto esperado va en un .txt con el mismo nombre)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--carpeta', required=True, help='Carpeta con las imágenes y sus .txt')
+        parser.add_argument('--procesos', type=int, default=settings.OCR_PROCESOS or 1,
+                            help='Tamaño del pool para medir el rendimiento en paralelo')
+        parser.add_argument('--verbose', action='store_true', help='Mostrar el resultado de cada imagen')
+
+    def handle(self, *args, **options):
+        carpeta = Path(options['carpeta'])
+        if not carpeta.is_dir():
+            raise CommandError(f"No existe la carpeta {carpeta}")
+        imagenes = sorted(p for p in carpeta.iterdir() if p.suffix.lower() in EXTENSIONES)
+        if not imagenes:
+            raise CommandError(f"No hay imágenes en {carpeta}")
+
+        pytesseract.pytesseract.tesseract_cmd = settings.TESSERACT_CMD
+        try:
+            pytesseract.get_tesseract_version()
+        except pytesseract.TesseractNotFoundError:
+            raise CommandError(f"No se encontró Tesseract en {settings.TESSERACT_CMD!r} (configurar TESSERACT_CMD)")
+
+        datos = [(p, p.read_bytes(), self.esperado(p)) for p in imagenes]
+        con_texto = sum(1 for _, _, esperado in datos if esperado is not None)
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"{len(datos)} imágenes ({con_texto} con texto esperado), {options['procesos']} procesos"
+        ))
+        for preprocesar in (False, True):
+            self.medir(datos, preprocesar, options)
+
+    def esperado(self, imagen):
+        txt = imagen.with_suffix('.txt')
+        return txt.read_text(encoding='utf-8') if txt.exists() else None
+
+    def medir(self, datos, preprocesar, options):
+        opciones = opciones_ocr(preprocesar)
+
+        # Latencia de a una imagen, en este proceso
+        latencias = []
+        precisiones = []
+        for ruta, contenido, esperado in datos:
+            inicio = time.perf_counter()
+            texto = ocr_en_proceso(contenido, opciones)
+            latencias.append((time.perf_counter() - inicio) * 1000)
+            if esperado is not None:
+                precisiones.append(precision_caracteres(texto, esperado))
+                if options['verbose']:
+                    self.stdout.write(f"    {ruta.name}: {precisiones[-1]:.0%} {texto[:80]!r}")
+
+        # Rendimiento con todas las imágenes repartidas en el pool
+        with ProcessPoolExecutor(max_workers=options['procesos']) as pool:
+            list(pool.map(ocr_en_proceso, [datos[0][1]] * options['procesos'], [opciones] * options['procesos']))
+            inicio = time.perf_counter()
+            list(pool.map(ocr_en_proceso, [c for _, c, _ in datos], [opciones] * len(datos)))
+            duracion_pool = time.perf_counter() - inicio
+
+        self.stdout.write(f"  {'Con' if preprocesar else 'Sin'} preprocesado:")
+        self.stdout.write(
+            f"    Latencia:    p50 {percentil(latencias, .5):.0f} ms | p95 {percentil(latencias, .95):.0f} ms"
+        )
+        self.stdout.write(f"    Pool:        {len(datos) / duracion_pool:.2f} imágenes/s")
+        if precisiones:
+            self.stdout.write(f"    Precisión:   {sum(precisiones) / len(precisiones):.1%} por caracter (promedio)")
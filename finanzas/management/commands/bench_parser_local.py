@@ -0,0 +1,109 @@
+import json
+import time
+from decimal import Decimal
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from finanzas.utils.parser_local import extraer_transacciones_local
+
+CORPUS = Path(__file__).resolve().parents[2] / 'benchmarks' / 'corpus_parser.json'
+
+
+def _claves(transacciones):
+    claves = []
+    for t in transacciones:
+        try:
+            monto = Decimal(str(t.get('monto'))).quantize(Decimal('0.01'))
+        except Exception:
+            monto = None
+        claves.append((str(t.get('tipo', '')).lower(), monto, t.get('categoria') or 'Otros'))
+    return sorted(claves, key=str)
+
+
+def es_correcto(data, esperado):
+    obtenidas = (data or {}).get('transacciones') or []
+    return _claves(obtenidas) == _claves(esperado)
+
+
+def percentil(valores, p):
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * p))] if valores else 0
+
+
+class Command(BaseCommand):
+    help = 'Mide aciertos, precisión y latencia del parser local contra el corpus etiquetado (y opcionalmente la IA)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--corpus', default=str(CORPUS), help='JSON con [{"texto", "esperado": [...]}]')
+        parser.add_argument('--repeticiones', type=int, default=200, help='Repeticiones para medir el parser local')
+        parser.add_argument('--llm', action='store_true', help='Comparar también con extraer_transacciones_openai')
+        parser.add_argument('--verbose', action='store_true', help='Mostrar los casos que fallan')
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['corpus'], encoding='utf-8') as archivo:
+                corpus = json.load(archivo)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"No se pudo leer el corpus: {e}")
+
+        locales = self.medir_local(corpus, options)
+        if options['llm']:
+            if not settings.OPENAI_API_KEY:
+                raise CommandError("--llm necesita OPENAI_API_KEY (puede ser falsa si OPENAI_BASE_URL apunta a un stub)")
+            self.medir_llm(corpus, locales, options)
+
+    def medir_local(self, corpus, options):
+        resultados = []
+        latencias = []
+        for caso in corpus:
+            inicio = time.perf_counter()
+            for _ in range(options['repeticiones']):
+                data = extraer_transacciones_local([caso['texto']])
+            latencias.append((time.perf_counter() - inicio) * 1e6 / options['repeticiones'])
+            resultados.append(data)
+
+        aciertos = [(caso, data) for caso, data in zip(corpus, resultados) if data is not None]
+        correctos = sum(1 for caso, data in aciertos if es_correcto(data, caso['esperado']))
+        falsos = sum(1 for caso, _ in aciertos if not caso['esperado'])
+
+        self.stdout.write(self.style.MIGRATE_HEADING(f"Parser local ({len(corpus)} mensajes)"))
+        self.stdout.write(f"  Resueltos sin IA:  {len(aciertos)}/{len(corpus)} ({len(aciertos) / len(corpus):.0%})")
+        if aciertos:
+            self.stdout.write(f"  Precisión:         {correctos}/{len(aciertos)} ({correctos / len(aciertos):.0%})")
+        self.stdout.write(f"  No-transacciones tomadas como transacción: {falsos}")
+        self.stdout.write(f"  Latencia:          p50 {percentil(latencias, .5):.1f} µs | p95 {percentil(latencias, .95):.1f} µs")
+
+        if options['verbose']:
+            for caso, data in aciertos:
+                if not es_correcto(data, caso['esperado']):
+                    self.stdout.write(self.style.WARNING(f"  ✗ {caso['texto']!r}: {data['transacciones']}"))
+        return resultados
+
+    def medir_llm(self, corpus, locales, options):
+        from finanzas.views import extraer_transacciones_openai
+
+        correctos_llm = correctos_combinado = errores = 0
+        latencias = []
+        for caso, local in zip(corpus, locales):
+            inicio = time.perf_counter()
+            data, err = extraer_transacciones_openai([caso['texto']])
+            latencias.append((time.perf_counter() - inicio) * 1000)
+            if err:
+                errores += 1
+            correcto = es_correcto(data, caso['esperado'])
+            correctos_llm += correcto
+            # Camino real del bot: parser local y, si no encaja, la IA
+            correctos_combinado += es_correcto(local, caso['esperado']) if local is not None else correcto
+            if options['verbose'] and not correcto:
+                self.stdout.write(self.style.WARNING(f"  ✗ IA {caso['texto']!r}: {data}"))
+
+        total = len(corpus)
+        llamadas = sum(1 for local in locales if local is None)
+        self.stdout.write(self.style.MIGRATE_HEADING("IA"))
+        self.stdout.write(f"  Precisión:         {correctos_llm}/{total} ({correctos_llm / total:.0%}), {errores} errores")
+        self.stdout.write(f"  Latencia:          p50 {percentil(latencias, .5):.0f} ms | p95 {percentil(latencias, .95):.0f} ms")
+        self.stdout.write(self.style.MIGRATE_HEADING("Local + IA de respaldo"))
+        self.stdout.write(f"  Precisión:         {correctos_combinado}/{total} ({correctos_combinado / total:.0%})")
+        self.stdout.write(f"  Llamadas a la IA:  {llamadas}/{total} ({1 - llamadas / total:.0%} menos)")
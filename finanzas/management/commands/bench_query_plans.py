@@ -0,0 +1,124 @@
+import re
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.http import QueryDict
+
+from finanzas.benchmarks.datos import RollbackBenchmark, cargar_transacciones_sinteticas
+from finanzas.models import Transaccion
+from finanzas.utils.filtros import consulta_facetas, filtrar_transacciones
+from finanzas.utils.paginacion import aplicar_cursor, codificar_cursor
+
+
+def consultas_calientes(usuario):
+    """
+    Las consultas de las vistas que tienen que resolverse por índice.
+    Devuelve tuplas (nombre, queryset).
+    """
+    base = Transaccion.objects.filter(usuario=usuario).order_by('-fecha', '-id')
+    una_fecha = base.values_list('fecha', flat=True).first()
+    # Cursor a mitad del historial: tiene que costar lo mismo que la primera página
+    medio = base[base.count() // 2]
+    cursor = codificar_cursor(medio.fecha, medio.id)
+
+    def filtrado(querystring):
+        # Las mismas consultas que arman historial, api_transacciones y exportar
+        return aplicar_cursor(filtrar_transacciones(usuario, QueryDict(querystring)))
+
+    desde = una_fecha - timedelta(days=90)
+    rango = f'desde={desde}&hasta={una_fecha}'
+    return [
+        ('dashboard: movimientos recientes', base[:5]),
+        ('historial: últimos 20', base[:20]),
+        ('historial: página por cursor', aplicar_cursor(base, cursor)[:21]),
+        ('historial: filtro fecha', base.filter(fecha=una_fecha)[:20]),
+        ('historial: filtro categoría', base.filter(categoria='Comida')[:20]),
+        ('historial: rango de fechas', filtrado(rango)[:21]),
+        ('historial: varias categorías', filtrado('categoria=Comida&categoria=Servicios')[:21]),
+        ('historial: tipo', filtrado('tipo=ingreso')[:21]),
+        ('historial: rango de montos', filtrado('monto_min=1000&monto_max=5000')[:21]),
+        ('historial: categoría + rango + cursor', aplicar_cursor(filtrado(f'categoria=Comida&{rango}'), cursor)[:21]),
+        ('historial: facetas', consulta_facetas(filtrar_transacciones(usuario, QueryDict('')))),
+        ('historial: facetas con rango', consulta_facetas(filtrar_transacciones(usuario, QueryDict(rango)))),
+        ('totales por tipo', Transaccion.objects.filter(usuario=usuario, tipo='gasto').order_by().values_list('cantidad')),
+    ]
+
+
+# Ordenamientos inevitables: el rango de fechas usa el índice por fecha y el
+# GROUP BY de las facetas se arma aparte sobre esas filas (ya acotadas).
+TOLERADOS = {
+    'historial: facetas con rango': {'temp b-tree', 'sort explícito'},
+}
+
+
+def problemas_del_plan(plan):
+    """
+    Devuelve una lista de problemas detectados en el plan (vacía = OK).
+    """
+    problemas = []
+    if connection.vendor == 'postgresql':
+        if re.search(r'Seq Scan on finanzas_transaccion', plan):
+            problemas.append('seq scan')
+        if re.search(r'(^|->)\s*(Incremental )?Sort\b', plan, re.MULTILINE):
+            problemas.append('sort explícito')
+    else:
+        if re.search(r'SCAN finanzas_transaccion\b', plan):
+            problemas.append('scan completo')
+        if 'TEMP B-TREE' in plan:
+            problemas.append('temp b-tree')
+    return problemas
+
+
+class Command(BaseCommand):
+    help = (
+        'Carga un dataset sintético (en una transacción que se descarta) y verifica '
+        'con EXPLAIN que las consultas de las vistas usen índices'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuarios', type=int, default=20)
+        parser.add_argument('--filas', type=int, default=10000, help='Transacciones por usuario')
+        parser.add_argument('--repeticiones', type=int, default=20)
+        parser.add_argument('--mostrar-planes', action='store_true')
+
+    def handle(self, *args, **options):
+        if connection.vendor not in ('sqlite', 'postgresql'):
+            raise CommandError(f'Motor no soportado: {connection.vendor}')
+
+        fallas = []
+        try:
+            with transaction.atomic():
+                self.stdout.write(
+                    f"Cargando {options['usuarios']} x {options['filas']} transacciones..."
+                )
+                usuarios = cargar_transacciones_sinteticas(options['usuarios'], options['filas'])
+                fallas = self.revisar(usuarios[len(usuarios) // 2], options)
+                raise RollbackBenchmark
+        except RollbackBenchmark:
+            pass
+
+        if fallas:
+            raise CommandError(f'{len(fallas)} consultas no usan índice: {", ".join(fallas)}')
+        self.stdout.write(self.style.SUCCESS('Todas las consultas usan índice'))
+
+    def revisar(self, usuario, options):
+        fallas = []
+        for nombre, queryset in consultas_calientes(usuario):
+            plan = queryset.explain()
+            problemas = [p for p in problemas_del_plan(plan) if p not in TOLERADOS.get(nombre, ())]
+
+            inicio = time.perf_counter()
+            for _ in range(options['repeticiones']):
+                list(queryset.all())
+            ms = (time.perf_counter() - inicio) * 1000 / options['repeticiones']
+
+            if problemas:
+                fallas.append(nombre)
+                self.stdout.write(self.style.ERROR(f'✖ {nombre}: {", ".join(problemas)} ({ms:.2f} ms)'))
+            else:
+                self.stdout.write(f'✔ {nombre} ({ms:.2f} ms)')
+            if options['mostrar_planes'] or problemas:
+                self.stdout.write(plan)
+        return fallas
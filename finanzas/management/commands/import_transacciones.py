@@ -0,0 +1,45 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from finanzas.utils.importacion import (
+    BATCH_SIZE,
+    ErrorImportacion,
+    importar_transacciones,
+    lector_para,
+)
+
+
+class Command(BaseCommand):
+    help = 'Importa un extracto bancario (CSV u OFX) para un usuario, en lotes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help='Ruta del archivo CSV u OFX')
+        parser.add_argument('--usuario', required=True, help='Username destino')
+        parser.add_argument('--formato', choices=['csv', 'ofx'], help='Por defecto se deduce de la extensión')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--encoding', default='utf-8-sig')
+
+    def handle(self, *args, **options):
+        try:
+            usuario = User.objects.get(username=options['usuario'])
+        except User.DoesNotExist:
+            raise CommandError(f"No existe el usuario {options['usuario']}")
+
+        inicio = time.perf_counter()
+        try:
+            lector = lector_para(options['archivo'], options['formato'])
+            with open(options['archivo'], encoding=options['encoding'], errors='replace', newline='') as archivo:
+                creadas, omitidas, errores = importar_transacciones(
+                    usuario, lector(archivo), batch_size=options['batch_size']
+                )
+        except (ErrorImportacion, OSError) as e:
+            raise CommandError(str(e))
+
+        for numero, motivo in errores:
+            self.stdout.write(self.style.WARNING(f'Fila {numero}: {motivo}'))
+        segundos = time.perf_counter() - inicio
+        self.stdout.write(self.style.SUCCESS(
+            f'{creadas} transacciones importadas, {omitidas} omitidas ({segundos:.1f} s)'
+        ))
@@ -0,0 +1,41 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from finanzas.utils.resumenes import recalcular_resumen, verificar_resumen
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye (o verifica) los resúmenes de ingresos/gastos por usuario'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuario', help='Username a procesar (por defecto todos)')
+        parser.add_argument(
+            '--verificar',
+            action='store_true',
+            help='Solo compara contra la tabla de transacciones, sin modificar nada',
+        )
+
+    def handle(self, *args, **options):
+        usuarios = User.objects.order_by('id')
+        if options['usuario']:
+            usuarios = usuarios.filter(username=options['usuario'])
+
+        inconsistentes = 0
+        for usuario_id, username in usuarios.values_list('id', 'username').iterator():
+            if options['verificar']:
+                diferencias = verificar_resumen(usuario_id)
+                if diferencias:
+                    inconsistentes += 1
+                    self.stdout.write(self.style.WARNING(
+                        f'{username}: difiere en {", ".join(diferencias)}'
+                    ))
+            else:
+                recalcular_resumen(usuario_id)
+
+        if options['verificar']:
+            if inconsistentes:
+                self.stdout.write(self.style.ERROR(f'{inconsistentes} resúmenes inconsistentes'))
+            else:
+                self.stdout.write(self.style.SUCCESS('Todos los resúmenes coinciden'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Resúmenes recalculados: {usuarios.count()}'))
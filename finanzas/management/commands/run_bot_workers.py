@@ -0,0 +1,106 @@
+import logging
+import signal
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+
+from finanzas.utils.cola_bot import (
+    completar_trabajo,
+    estadisticas_cola,
+    fallar_trabajo,
+    limpiar_terminados,
+    limpiar_updates,
+    reclamar_lote,
+    recuperar_colgados,
+)
+from finanzas.utils.cache_ia import obtener_cache_ia
+from finanzas.views import procesar_updates
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Procesa la cola de updates de Telegram con un pool de workers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='Cantidad de workers (threads)')
+        parser.add_argument('--intervalo', type=float, default=0.5, help='Segundos de espera si la cola está vacía')
+        parser.add_argument('--intervalo-stats', type=float, default=60, help='Cada cuántos segundos loguear métricas')
+        parser.add_argument('--stats', action='store_true', help='Mostrar el estado de la cola y salir')
+        parser.add_argument('--vaciar', action='store_true', help='Procesar lo pendiente y salir')
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            self.mostrar_stats()
+            return
+
+        self.detener = threading.Event()
+        signal.signal(signal.SIGINT, lambda *_: self.detener.set())
+        signal.signal(signal.SIGTERM, lambda *_: self.detener.set())
+
+        recuperar_colgados()
+        workers = [
+            threading.Thread(target=self.worker, args=(options,), name=f'bot-worker-{i}', daemon=True)
+            for i in range(options['workers'])
+        ]
+        for worker in workers:
+            worker.start()
+        self.stdout.write(self.style.SUCCESS(f"{len(workers)} workers procesando la cola"))
+
+        ultimo_mantenimiento = 0
+        while any(w.is_alive() for w in workers) and not self.detener.is_set():
+            if time.monotonic() - ultimo_mantenimiento >= options['intervalo_stats']:
+                recuperar_colgados()
+                limpiar_terminados()
+                limpiar_updates()
+                self.mostrar_stats()
+                close_old_connections()
+                ultimo_mantenimiento = time.monotonic()
+            time.sleep(0.5)
+
+        self.detener.set()
+        for worker in workers:
+            worker.join()
+        self.mostrar_stats()
+
+    def worker(self, options):
+        try:
+            while not self.detener.is_set():
+                # Varios mensajes de texto seguidos del mismo chat vienen juntos
+                lote = reclamar_lote()
+                if not lote:
+                    if options['vaciar']:
+                        return
+                    self.detener.wait(options['intervalo'])
+                    continue
+
+                try:
+                    procesar_updates([trabajo.update for trabajo in lote])
+                except Exception as e:
+                    logger.exception(f"[Bot] Fallaron los trabajos {[t.id for t in lote]} (intento {lote[0].intentos})")
+                    for trabajo in lote:
+                        fallar_trabajo(trabajo, e)
+                else:
+                    for trabajo in lote:
+                        completar_trabajo(trabajo)
+        finally:
+            connection.close()
+
+    def mostrar_stats(self):
+        stats = estadisticas_cola()
+
+        def segundos(valor):
+            return '-' if valor is None else f'{valor:.2f}s'
+
+        self.stdout.write(
+            f"Cola: {stats['pendientes']} pendientes, {stats['procesando']} en proceso, "
+            f"{stats['errores']} con error | espera más vieja {segundos(stats['espera_mas_vieja'])} | "
+            f"latencia p50 {segundos(stats['latencia_p50'])} p95 {segundos(stats['latencia_p95'])}"
+        )
+        cache_ia = obtener_cache_ia().estadisticas()
+        self.stdout.write(
+            f"Cache IA: {cache_ia['entradas']} entradas, {cache_ia['aciertos']} aciertos, "
+            f"{cache_ia['fallos']} fallos ({cache_ia['ratio']:.0%})"
+        )
@@ -0,0 +1,233 @@
+import asyncio
+import logging
+import signal
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from finanzas.models import EstadoBot
+from finanzas.utils.cola_bot import MAX_AGRUPADOS, chat_id_de, es_texto_simple, marcar_update
+from finanzas.utils.telegram import ErrorTelegram, obtener_cliente
+from finanzas.views import procesar_updates
+
+logger = logging.getLogger(__name__)
+
+CLAVE_OFFSET = 'telegram_offset'
+
+
+def leer_offset():
+    estado = EstadoBot.objects.filter(clave=CLAVE_OFFSET).first()
+    return int(estado.valor) if estado else None
+
+
+def guardar_offset(offset):
+    EstadoBot.objects.update_or_create(clave=CLAVE_OFFSET, defaults={'valor': str(offset)})
+
+
+def agrupar_updates(updates, ventana):
+    """
+    Junta los textos simples consecutivos de un mismo chat enviados con menos
+    de `ventana` segundos entre el primero y el último (como reclamar_lote).
+    """
+    grupos = []
+    for update in updates:
+        if ventana and grupos and es_texto_simple(update):
+            grupo = grupos[-1]
+            primero = grupo[0]
+            if (
+                es_texto_simple(primero)
+                and chat_id_de(primero) == chat_id_de(update)
+                and len(grupo) < MAX_AGRUPADOS
+                and update['message'].get('date', 0) - primero['message'].get('date', 0) <= ventana
+            ):
+                grupo.append(update)
+                continue
+        grupos.append([update])
+    return grupos
+
+
+def en_thread_daemon(funcion, *args, **kwargs):
+    """
+    Corre la función en un thread daemon y devuelve un future del loop.
+    A diferencia de to_thread, si se abandona (al detener el bot en medio de
+    un long polling) nadie espera a que termine: ni el cierre del executor
+    de asyncio.run ni la salida del proceso.
+    """
+    loop = asyncio.get_running_loop()
+    futuro = loop.create_future()
+
+    def resolver(resultado, error):
+        if futuro.done():
+            return
+        if error is not None:
+            futuro.set_exception(error)
+        else:
+            futuro.set_result(resultado)
+
+    def correr():
+        resultado = error = None
+        try:
+            resultado = funcion(*args, **kwargs)
+        except Exception as e:
+            error = e
+        try:
+            loop.call_soon_threadsafe(resolver, resultado, error)
+        except RuntimeError:
+            # El loop ya se cerró: el resultado no le interesa a nadie
+            pass
+
+    threading.Thread(target=correr, daemon=True).start()
+    return futuro
+
+
+def procesar_en_thread(updates):
+    """
+    Lo mismo que hace el webhook sin cola: descartar reenvíos y procesar.
+    """
+    try:
+        nuevos = [u for u in updates if marcar_update(u.get('update_id'))]
+        if nuevos:
+            procesar_updates(nuevos)
+    finally:
+        close_old_connections()
+
+
+class Command(BaseCommand):
+    help = 'Corre el bot con long polling (getUpdates), sin webhook ni túnel'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrencia', type=int, default=settings.BOT_POLLING_CONCURRENCIA,
+                            help='Updates procesados en paralelo')
+        parser.add_argument('--limite', type=int, default=100, help='Updates por getUpdates (máx. 100)')
+        parser.add_argument('--timeout', type=int, default=settings.TELEGRAM_POLLING_TIMEOUT,
+                            help='Segundos de long polling por llamada')
+
+    def handle(self, *args, **options):
+        asyncio.run(self.correr(options))
+
+    async def correr(self, options):
+        loop = asyncio.get_running_loop()
+        # Un thread por update en proceso (el ORM y el cliente HTTP son síncronos)
+        loop.set_default_executor(ThreadPoolExecutor(max_workers=options['concurrencia'] + 1))
+
+        detener = asyncio.Event()
+        for senial in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(senial, detener.set)
+
+        cliente = obtener_cliente()
+        # Con un webhook activo Telegram rechaza getUpdates
+        await asyncio.to_thread(cliente.llamar, 'deleteWebhook')
+
+        offset = await asyncio.to_thread(leer_offset)
+        self.stdout.write(self.style.SUCCESS(f"Polling iniciado (offset {offset})"))
+
+        self.semaforo = asyncio.Semaphore(options['concurrencia'])
+        self.ultimo_por_chat = {}
+        # update_id despachados desde el offset confirmado y los que siguen en proceso
+        self.recibidos = set()
+        self.pendientes = set()
+        en_curso = set()
+        max_en_curso = options['concurrencia'] * 4
+
+        while not detener.is_set():
+            if len(en_curso) >= max_en_curso:
+                # Backpressure: no pedir más hasta que se libere lugar
+                await asyncio.wait(en_curso, return_when=asyncio.FIRST_COMPLETED)
+                continue
+
+            offset = await self.confirmar(offset)
+
+            # Fuera del executor: si se pide detener no hay que esperar el timeout
+            pedido = en_thread_daemon(
+                cliente.llamar, 'getUpdates',
+                timeout_http=options['timeout'] + 10,
+                offset=offset,
+                limit=options['limite'],
+                timeout=options['timeout'],
+                allowed_updates=['message'],
+            )
+            espera_detener = asyncio.ensure_future(detener.wait())
+            await asyncio.wait({pedido, espera_detener}, return_when=asyncio.FIRST_COMPLETED)
+            espera_detener.cancel()
+            if not pedido.done():
+                # Se pidió detener durante el long polling: no se toma este lote
+                # (sin confirmar, Telegram lo vuelve a mandar al reiniciar)
+                pedido.cancel()
+                break
+
+            try:
+                updates = pedido.result()['result']
+            except ErrorTelegram as e:
+                logger.error(f"[Polling] getUpdates falló: {e}")
+                await asyncio.sleep(5)
+                continue
+
+            # Telegram vuelve a mandar los que están en proceso (el offset no los confirmó)
+            nuevos = [u for u in updates if u['update_id'] not in self.recibidos]
+            if updates and not nuevos and en_curso:
+                # Solo volvieron los que siguen en proceso: esperar a que termine alguno
+                await asyncio.wait(en_curso, return_when=asyncio.FIRST_COMPLETED)
+                continue
+
+            for grupo in agrupar_updates(nuevos, settings.BOT_VENTANA_AGRUPACION):
+                ids = {u['update_id'] for u in grupo}
+                self.recibidos |= ids
+                self.pendientes |= ids
+                tarea = self.despachar(grupo)
+                en_curso.add(tarea)
+                tarea.add_done_callback(en_curso.discard)
+                tarea.add_done_callback(lambda t, ids=ids: self.pendientes.difference_update(ids))
+
+        if en_curso:
+            self.stdout.write(f"Esperando {len(en_curso)} updates en proceso...")
+            await asyncio.gather(*en_curso, return_exceptions=True)
+        await self.confirmar(offset)
+        self.stdout.write("Polling detenido")
+
+    async def confirmar(self, offset):
+        """
+        Offset hasta el primer update que no terminó de procesarse: es el que
+        se le pasa a getUpdates (confirma los anteriores) y el que se guarda.
+        Si el proceso se corta, los no terminados se vuelven a recibir y
+        marcar_update descarta los que ya se habían procesado.
+        """
+        if self.pendientes:
+            nuevo = min(self.pendientes)
+        elif self.recibidos:
+            nuevo = max(self.recibidos) + 1
+        else:
+            nuevo = offset
+        self.recibidos = {i for i in self.recibidos if i >= nuevo}
+        if nuevo != offset:
+            await asyncio.to_thread(guardar_offset, nuevo)
+        return nuevo
+
+    def despachar(self, updates):
+        """
+        Crea la tarea de un grupo de updates (de un mismo chat) encadenada a la
+        anterior del chat: chats distintos van en paralelo, cada chat en orden.
+        """
+        chat_id = chat_id_de(updates[0])
+        anterior = self.ultimo_por_chat.get(chat_id)
+        tarea = asyncio.ensure_future(self.procesar(updates, anterior))
+        self.ultimo_por_chat[chat_id] = tarea
+
+        def olvidar(t):
+            if self.ultimo_por_chat.get(chat_id) is t:
+                del self.ultimo_por_chat[chat_id]
+
+        tarea.add_done_callback(olvidar)
+        return tarea
+
+    async def procesar(self, updates, anterior):
+        if anterior is not None:
+            await asyncio.wait({anterior})
+        async with self.semaforo:
+            try:
+                await asyncio.to_thread(procesar_en_thread, updates)
+            except Exception:
+                ids = [u.get('update_id') for u in updates]
+                logger.exception(f"[Polling] Error procesando los updates {ids}")
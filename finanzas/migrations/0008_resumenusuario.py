@@ -0,0 +1,68 @@
+# Generated by Django 5.2.6 on 2026-10-18 10:56
+
+from decimal import Decimal
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def cargar_resumenes(apps, schema_editor):
+    """
+    Resumen inicial de los usuarios que ya tienen transacciones: sin él la
+    primera edición reconstruiría y sumaría el cambio dos veces.
+    """
+    Transaccion = apps.get_model('finanzas', 'Transaccion')
+    ResumenUsuario = apps.get_model('finanzas', 'ResumenUsuario')
+    centavo = Decimal('0.01')
+    totales = (
+        Transaccion.objects
+        .values('usuario_id')
+        .annotate(
+            ingresos=Sum('cantidad', filter=Q(tipo='ingreso')),
+            gastos=Sum('cantidad', filter=Q(tipo='gasto')),
+            cantidad=Count('id'),
+        )
+        .order_by()
+    )
+    resumenes = []
+    for fila in totales:
+        ingresos = Decimal(str(fila['ingresos'] or 0)).quantize(centavo)
+        gastos = Decimal(str(fila['gastos'] or 0)).quantize(centavo)
+        resumenes.append(ResumenUsuario(
+            usuario_id=fila['usuario_id'],
+            ingresos=ingresos,
+            gastos=gastos,
+            balance=ingresos - gastos,
+            cantidad_transacciones=fila['cantidad'],
+        ))
+    ResumenUsuario.objects.bulk_create(resumenes, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finanzas', '0007_perfil_bloqueo_ia_hasta_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenUsuario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ingresos', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('gastos', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('balance', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('cantidad_transacciones', models.PositiveIntegerField(default=0)),
+                ('actualizado', models.DateTimeField(auto_now=True)),
+                ('usuario', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='resumen', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Resumen de usuario',
+                'verbose_name_plural': 'Resúmenes de usuario',
+            },
+        ),
+        migrations.RunPython(cargar_resumenes, migrations.RunPython.noop),
+    ]
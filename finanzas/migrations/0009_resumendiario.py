@@ -0,0 +1,68 @@
+# Generated by Django 5.2.6 on 2026-10-18 10:57
+
+from decimal import Decimal
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def cargar_rollups(apps, schema_editor):
+    """
+    Rollups de las transacciones existentes (el gráfico de balance lee solo
+    de ResumenDiario). Es lo mismo que `manage.py backfill_resumen_diario`.
+    """
+    Transaccion = apps.get_model('finanzas', 'Transaccion')
+    ResumenDiario = apps.get_model('finanzas', 'ResumenDiario')
+    centavo = Decimal('0.01')
+    agrupado = (
+        Transaccion.objects
+        .values('usuario_id', 'fecha', 'tipo', 'categoria')
+        .annotate(total=Sum('cantidad'), cantidad=Count('id'))
+        .order_by('usuario_id', 'fecha', 'tipo', 'categoria')
+    )
+    lote = []
+    for fila in agrupado.iterator(chunk_size=1000):
+        lote.append(ResumenDiario(
+            usuario_id=fila['usuario_id'],
+            dia=fila['fecha'],
+            tipo=fila['tipo'],
+            categoria=fila['categoria'],
+            total=Decimal(str(fila['total'])).quantize(centavo),
+            cantidad=fila['cantidad'],
+        ))
+        if len(lote) >= 1000:
+            ResumenDiario.objects.bulk_create(lote)
+            lote = []
+    ResumenDiario.objects.bulk_create(lote)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finanzas', '0008_resumenusuario'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField()),
+                ('tipo', models.CharField(choices=[('ingreso', 'Ingreso'), ('gasto', 'Gasto')], max_length=10)),
+                ('categoria', models.CharField(choices=[('Comida', 'comida'), ('Salario', 'salario'), ('Compras', 'compras'), ('Transferencias', 'transferencias'), ('Servicios', 'servicios'), ('Ventas', 'ventas'), ('Otros', 'otros')], max_length=50)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('cantidad', models.PositiveIntegerField(default=0)),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Resumen diario',
+                'verbose_name_plural': 'Resúmenes diarios',
+                'ordering': ['dia'],
+                'constraints': [models.UniqueConstraint(fields=('usuario', 'dia', 'tipo', 'categoria'), name='resumen_diario_unico')],
+            },
+        ),
+        migrations.RunPython(cargar_rollups, migrations.RunPython.noop),
+    ]
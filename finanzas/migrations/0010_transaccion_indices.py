@@ -0,0 +1,27 @@
+# Generated by Django 5.2.6 on 2026-10-18 10:57
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finanzas', '0009_resumendiario'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transaccion',
+            index=models.Index(fields=['usuario', '-fecha', '-id'], name='transaccion_usuario_fecha'),
+        ),
+        migrations.AddIndex(
+            model_name='transaccion',
+            index=models.Index(fields=['usuario', 'tipo', 'cantidad'], name='transaccion_usuario_tipo'),
+        ),
+        migrations.AddIndex(
+            model_name='transaccion',
+            index=models.Index(fields=['usuario', 'categoria', '-fecha', '-id'], name='transaccion_usuario_cat'),
+        ),
+    ]
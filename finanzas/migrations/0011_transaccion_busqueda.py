@@ -0,0 +1,22 @@
+from django.db import migrations
+
+from finanzas.utils.busqueda import borrar_indice_busqueda, crear_indice_busqueda
+
+
+def crear(apps, schema_editor):
+    crear_indice_busqueda(schema_editor.connection)
+
+
+def borrar(apps, schema_editor):
+    borrar_indice_busqueda(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finanzas', '0010_transaccion_indices'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear, borrar),
+    ]
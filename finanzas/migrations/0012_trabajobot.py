@@ -0,0 +1,34 @@
+# Generated by Django 5.2.6 on 2026-10-18 11:12
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finanzas', '0011_transaccion_busqueda'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrabajoBot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('chat_id', models.CharField(max_length=50)),
+                ('update', models.JSONField()),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('procesando', 'Procesando'), ('hecho', 'Hecho'), ('error', 'Error')], default='pendiente', max_length=12)),
+                ('intentos', models.PositiveIntegerField(default=0)),
+                ('disponible_desde', models.DateTimeField(default=django.utils.timezone.now)),
+                ('creado', models.DateTimeField(auto_now_add=True)),
+                ('iniciado', models.DateTimeField(blank=True, null=True)),
+                ('finalizado', models.DateTimeField(blank=True, null=True)),
+                ('ultimo_error', models.TextField(blank=True)),
+            ],
+            options={
+                'verbose_name': 'Trabajo del bot',
+                'verbose_name_plural': 'Trabajos del bot',
+                'indexes': [models.Index(fields=['estado', 'id'], name='trabajobot_estado')],
+            },
+        ),
+    ]
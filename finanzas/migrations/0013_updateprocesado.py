@@ -0,0 +1,25 @@
+# Generated by Django 5.2.6 on 2026-10-18 11:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finanzas', '0012_trabajobot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UpdateProcesado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('update_id', models.BigIntegerField(unique=True)),
+                ('recibido', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'verbose_name': 'Update procesado',
+                'verbose_name_plural': 'Updates procesados',
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.6 on 2026-10-18 11:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finanzas', '0013_updateprocesado'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EstadoBot',
+            fields=[
+                ('clave', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('valor', models.CharField(max_length=200)),
+                ('actualizado', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
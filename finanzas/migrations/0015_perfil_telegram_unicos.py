@@ -0,0 +1,44 @@
+# Generated by Django 5.2.6 on 2026-10-18 11:18
+
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+
+def limpiar_valores(apps, schema_editor):
+    """
+    Antes de agregar unique: "" pasa a NULL (desvincular dejaba "") y si un
+    chat o código quedó repetido se conserva solo el perfil más reciente.
+    """
+    Perfil = apps.get_model('finanzas', 'Perfil')
+    for campo in ('telegram_chat_id', 'telegram_code'):
+        Perfil.objects.filter(**{campo: ''}).update(**{campo: None})
+        repetidos = (
+            Perfil.objects
+            .exclude(**{f'{campo}__isnull': True})
+            .values(campo)
+            .annotate(n=Count('id'), ultimo=Max('id'))
+            .filter(n__gt=1)
+        )
+        for fila in repetidos:
+            Perfil.objects.filter(**{campo: fila[campo]}).exclude(id=fila['ultimo']).update(**{campo: None})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finanzas', '0014_estadobot'),
+    ]
+
+    operations = [
+        migrations.RunPython(limpiar_valores, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='perfil',
+            name='telegram_chat_id',
+            field=models.CharField(blank=True, max_length=50, null=True, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='perfil',
+            name='telegram_code',
+            field=models.CharField(blank=True, max_length=10, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.6 on 2026-10-18 11:33
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finanzas', '0015_perfil_telegram_unicos'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResultadoOCR',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file_unique_id', models.CharField(blank=True, max_length=100)),
+                ('sha256', models.CharField(max_length=64)),
+                ('dhash', models.CharField(max_length=16)),
+                ('texto', models.TextField(blank=True)),
+                ('lineas', models.JSONField(default=list)),
+                ('recibo', models.JSONField(blank=True, null=True)),
+                ('registrado', models.DateTimeField(blank=True, null=True)),
+                ('creado', models.DateTimeField(auto_now_add=True)),
+                ('usado', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Resultado OCR',
+                'verbose_name_plural': 'Resultados OCR',
+                'indexes': [models.Index(fields=['file_unique_id'], name='resultadoocr_file'), models.Index(fields=['sha256'], name='resultadoocr_sha256')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-18 12:06
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finanzas', '0016_resultadoocr'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='transaccion',
+            name='transaccion_usuario_tipo',
+        ),
+        migrations.AddIndex(
+            model_name='transaccion',
+            index=models.Index(fields=['usuario', 'tipo', 'categoria', 'cantidad'], name='transaccion_usuario_tipo_cat'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-18 12:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finanzas', '0017_transaccion_indice_facetas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='perfil',
+            name='cupo_ia_actualizado',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='perfil',
+            name='cupo_ia_dia',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='perfil',
+            name='cupo_ia_minuto',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
 
 class Categoria(models.Model):
     nombre = models.CharField(max_length=50, unique=True)
@@ -38,13 +39,28 @@ class Transaccion(models.Model):
         verbose_name = "Transacción"
         verbose_name_plural = "Transacciones"
         ordering = ['-fecha', '-fecha_creacion']
+        indexes = [
+            # Listados: dashboard e historial ordenan por -fecha, -id
+            models.Index(fields=['usuario', '-fecha', '-id'], name='transaccion_usuario_fecha'),
+            # Totales por tipo y facetas del historial (GROUP BY tipo, categoria):
+            # cubre los SUM sin ir a la tabla y ya viene ordenado para agrupar
+            models.Index(fields=['usuario', 'tipo', 'categoria', 'cantidad'], name='transaccion_usuario_tipo_cat'),
+            # Filtro por categoría en el historial
+            models.Index(fields=['usuario', 'categoria', '-fecha', '-id'], name='transaccion_usuario_cat'),
+        ]
 
 class Perfil(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
-    telegram_code = models.CharField(max_length=10, null=True, blank=True)
-    telegram_chat_id = models.CharField(max_length=50, null=True, blank=True)
+    # Únicos (admiten varios NULL): el bot los busca en cada /vincular y mensaje
+    telegram_code = models.CharField(max_length=10, null=True, blank=True, unique=True)
+    telegram_chat_id = models.CharField(max_length=50, null=True, blank=True, unique=True)
     strikes_no_transaccion = models.PositiveIntegerField(default=0)
     bloqueo_ia_hasta = models.DateTimeField(null=True, blank=True)
+    # Cupo de llamadas a la IA cuando la cache no es atómica (ver control_ia):
+    # tokens en cada balde (NULL = lleno) y cuándo se actualizaron (epoch)
+    cupo_ia_minuto = models.FloatField(null=True, blank=True)
+    cupo_ia_dia = models.FloatField(null=True, blank=True)
+    cupo_ia_actualizado = models.FloatField(null=True, blank=True)
 
     def __str__(self):
         return self.user.username
@@ -56,3 +72,145 @@ class Notificacion(models.Model):
 
     def __str__(self):
         return self.texto
+
+class ResumenUsuario(models.Model):
+    """
+    Totales acumulados por usuario, mantenidos incrementalmente en cada
+    alta/baja de Transaccion para no recorrer todo el historial.
+    """
+    usuario = models.OneToOneField(User, on_delete=models.CASCADE, related_name='resumen')
+    ingresos = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    gastos = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    balance = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    cantidad_transacciones = models.PositiveIntegerField(default=0)
+    actualizado = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.usuario} - {self.balance}"
+
+    class Meta:
+        verbose_name = "Resumen de usuario"
+        verbose_name_plural = "Resúmenes de usuario"
+
+class ResumenDiario(models.Model):
+    """
+    Rollup por usuario, día, tipo y categoría. Los gráficos y reportes
+    leen de acá en lugar de reagrupar la tabla de transacciones.
+    """
+    usuario = models.ForeignKey(User, on_delete=models.CASCADE)
+    dia = models.DateField()
+    tipo = models.CharField(max_length=10, choices=Transaccion.TIPO_CHOICES)
+    categoria = models.CharField(max_length=50, choices=Transaccion.CATEGORIA_CHOICES)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    cantidad = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.usuario} {self.dia} {self.tipo} {self.categoria}: {self.total}"
+
+    class Meta:
+        verbose_name = "Resumen diario"
+        verbose_name_plural = "Resúmenes diarios"
+        ordering = ['dia']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['usuario', 'dia', 'tipo', 'categoria'],
+                name='resumen_diario_unico',
+            ),
+        ]
+
+class TrabajoBot(models.Model):
+    """
+    Update de Telegram pendiente de procesar. El webhook solo lo guarda;
+    lo procesan los workers de run_bot_workers.
+    """
+    PENDIENTE = 'pendiente'
+    PROCESANDO = 'procesando'
+    HECHO = 'hecho'
+    ERROR = 'error'
+    ESTADO_CHOICES = [
+        (PENDIENTE, 'Pendiente'),
+        (PROCESANDO, 'Procesando'),
+        (HECHO, 'Hecho'),
+        (ERROR, 'Error'),
+    ]
+
+    chat_id = models.CharField(max_length=50)
+    update = models.JSONField()
+    estado = models.CharField(max_length=12, choices=ESTADO_CHOICES, default=PENDIENTE)
+    intentos = models.PositiveIntegerField(default=0)
+    disponible_desde = models.DateTimeField(default=timezone.now)
+    creado = models.DateTimeField(auto_now_add=True)
+    iniciado = models.DateTimeField(null=True, blank=True)
+    finalizado = models.DateTimeField(null=True, blank=True)
+    ultimo_error = models.TextField(blank=True)
+
+    def __str__(self):
+        return f"{self.chat_id} #{self.id} ({self.estado})"
+
+    class Meta:
+        verbose_name = "Trabajo del bot"
+        verbose_name_plural = "Trabajos del bot"
+        indexes = [
+            # Los workers recorren los activos en orden de llegada
+            models.Index(fields=['estado', 'id'], name='trabajobot_estado'),
+        ]
+
+
+class UpdateProcesado(models.Model):
+    """
+    update_id de Telegram ya recibidos. Si Telegram reenvía un update
+    (por ejemplo porque el webhook tardó), se descarta sin procesarlo de nuevo.
+    """
+    update_id = models.BigIntegerField(unique=True)
+    recibido = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return str(self.update_id)
+
+    class Meta:
+        verbose_name = "Update procesado"
+        verbose_name_plural = "Updates procesados"
+
+
+class EstadoBot(models.Model):
+    """
+    Valores sueltos que el bot necesita conservar entre reinicios
+    (por ejemplo el offset de getUpdates).
+    """
+    clave = models.CharField(max_length=50, primary_key=True)
+    valor = models.CharField(max_length=200)
+    actualizado = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.clave}={self.valor}"
+
+
+class ResultadoOCR(models.Model):
+    """
+    OCR de una foto ya enviada por el usuario, por file_unique_id de Telegram,
+    sha256 de los bytes y dHash (huella perceptual). Si la reenvía no se
+    vuelve a descargar ni a leer, y si ya se registró se avisa que es repetida.
+    """
+    usuario = models.ForeignKey(User, on_delete=models.CASCADE)
+    file_unique_id = models.CharField(max_length=100, blank=True)
+    sha256 = models.CharField(max_length=64)
+    dhash = models.CharField(max_length=16)
+    texto = models.TextField(blank=True)
+    lineas = models.JSONField(default=list)
+    # Transacción que se sacó del ticket sin la IA (ver utils/recibos.py)
+    recibo = models.JSONField(null=True, blank=True)
+    registrado = models.DateTimeField(null=True, blank=True)
+    creado = models.DateTimeField(auto_now_add=True)
+    usado = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return f"{self.usuario_id} {self.file_unique_id or self.sha256[:12]}"
+
+    class Meta:
+        verbose_name = "Resultado OCR"
+        verbose_name_plural = "Resultados OCR"
+        indexes = [
+            # Sin usuario: una foto reenviada por otro también evita el OCR
+            models.Index(fields=['file_unique_id'], name='resultadoocr_file'),
+            models.Index(fields=['sha256'], name='resultadoocr_sha256'),
+        ]
@@ -0,0 +1,104 @@
+from django.contrib.auth.models import User
+from django.db import connections, transaction
+from django.db.migrations.recorder import MigrationRecorder
+from django.db.models.signals import post_delete, post_migrate, post_save, pre_save
+from django.dispatch import receiver
+
+from finanzas.models import Notificacion, Perfil, Transaccion
+from finanzas.utils import resumenes
+from finanzas.utils.busqueda import crear_indice_busqueda
+from finanzas.utils.cache import invalidar_notificaciones, invalidar_usuario
+from finanzas.utils.perfiles import actualizar_cache_chat, olvidar_chat
+
+
+@receiver(pre_save, sender=Transaccion)
+def guardar_valores_previos(sender, instance, **kwargs):
+    # Solo en ediciones (ej. admin): recordamos lo que había para restarlo.
+    # Todo lo que usan los resúmenes: un campo diferido se leería ya editado
+    instance._previa = None
+    if instance.pk:
+        instance._previa = (
+            Transaccion.objects
+            .filter(pk=instance.pk)
+            .only('usuario_id', 'tipo', 'cantidad', 'categoria', 'fecha')
+            .first()
+        )
+
+
+@receiver(post_save, sender=Transaccion)
+def actualizar_resumen_alta(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previa = getattr(instance, '_previa', None)
+    if previa is not None and not created:
+        resumenes.registrar_edicion(previa, instance)
+    else:
+        resumenes.registrar_alta(instance)
+
+
+@receiver(post_delete, sender=Transaccion)
+def actualizar_resumen_baja(sender, instance, origin=None, **kwargs):
+    # Al borrar el usuario sus resúmenes se borran con él: no hay que restar
+    if isinstance(origin, User):
+        return
+    resumenes.registrar_baja(instance)
+
+
+@receiver(post_save, sender=Transaccion)
+@receiver(post_delete, sender=Transaccion)
+def invalidar_cache_usuario(sender, instance, **kwargs):
+    # Después del commit: si se invalidara antes, otra request podría volver
+    # a cachear los datos viejos bajo la versión nueva
+    usuario_id = instance.usuario_id
+    transaction.on_commit(lambda: invalidar_usuario(usuario_id))
+    previa = getattr(instance, '_previa', None)
+    if previa is not None and previa.usuario_id != usuario_id:
+        transaction.on_commit(lambda: invalidar_usuario(previa.usuario_id))
+
+
+@receiver(post_save, sender=Notificacion)
+@receiver(post_delete, sender=Notificacion)
+def invalidar_cache_notificaciones(sender, **kwargs):
+    transaction.on_commit(invalidar_notificaciones)
+
+
+@receiver(pre_save, sender=Perfil)
+def guardar_chat_previo(sender, instance, update_fields=None, **kwargs):
+    # Solo si el chat puede cambiar (vincular/desvincular)
+    instance._chat_previo = None
+    if instance.pk and (update_fields is None or 'telegram_chat_id' in update_fields):
+        instance._chat_previo = (
+            Perfil.objects.filter(pk=instance.pk).values_list('telegram_chat_id', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Perfil)
+def actualizar_cache_perfil(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    chat_previo = getattr(instance, '_chat_previo', None)
+
+    def actualizar():
+        if chat_previo and chat_previo != instance.telegram_chat_id:
+            olvidar_chat(chat_previo)
+        actualizar_cache_chat(instance)
+
+    transaction.on_commit(actualizar)
+
+
+@receiver(post_delete, sender=Perfil)
+def olvidar_cache_perfil(sender, instance, **kwargs):
+    chat_id = instance.telegram_chat_id
+    transaction.on_commit(lambda: olvidar_chat(chat_id))
+
+
+@receiver(post_migrate)
+def asegurar_indice_busqueda(sender, using='default', **kwargs):
+    # En SQLite un ALTER sobre Transaccion recrea la tabla y se lleva los
+    # triggers del índice FTS: los volvemos a crear después de cada migrate
+    if sender.name != 'finanzas':
+        return
+    connection = connections[using]
+    aplicadas = MigrationRecorder(connection).applied_migrations()
+    if ('finanzas', '0011_transaccion_busqueda') in aplicadas:
+        crear_indice_busqueda(connection)
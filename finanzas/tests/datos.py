@@ -0,0 +1,19 @@
+from datetime import date
+from decimal import Decimal
+
+from finanzas.models import Transaccion
+
+# Cache en memoria: los tests no escriben en el directorio cache/
+CACHE_TESTS = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+def crear_transaccion(usuario, tipo='gasto', cantidad=100, categoria='Comida', fecha=None, **campos):
+    campos.setdefault('descripcion', 'test')
+    return Transaccion.objects.create(
+        usuario=usuario,
+        tipo=tipo,
+        cantidad=Decimal(cantidad),
+        categoria=categoria,
+        fecha=fecha or date(2025, 10, 24),
+        **campos,
+    )
@@ -0,0 +1,70 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from finanzas.models import Transaccion
+from finanzas.tests.datos import CACHE_TESTS, crear_transaccion
+from finanzas.utils.busqueda import borrar_indice_busqueda, crear_indice_busqueda, filtrar_por_texto
+
+
+@override_settings(CACHES=CACHE_TESTS)
+class BusquedaTests(TestCase):
+
+    def setUp(self):
+        self.usuario = User.objects.create_user('busca')
+        self.netflix = crear_transaccion(self.usuario, descripcion='Pago Netflix mensual')
+        self.cafe = crear_transaccion(self.usuario, descripcion='Café con Ana', destino='Cafetería Central')
+        self.super = crear_transaccion(self.usuario, descripcion='Supermercado', destino='Día')
+        crear_transaccion(User.objects.create_user('otro'), descripcion='Netflix del otro')
+
+    def buscar(self, texto):
+        return set(filtrar_por_texto(Transaccion.objects.filter(usuario=self.usuario), texto))
+
+    def test_prefijo_y_sin_acentos(self):
+        self.assertEqual(self.buscar('netfl'), {self.netflix})
+        self.assertEqual(self.buscar('cafe'), {self.cafe})
+        self.assertEqual(self.buscar('CAFÉ'), {self.cafe})
+
+    def test_busca_en_destino(self):
+        self.assertEqual(self.buscar('central'), {self.cafe})
+        self.assertEqual(self.buscar('dia'), {self.super})
+
+    def test_todas_las_palabras(self):
+        self.assertEqual(self.buscar('pago mensual'), {self.netflix})
+        self.assertEqual(self.buscar('pago ana'), set())
+
+    def test_texto_vacio_o_solo_signos(self):
+        todas = {self.netflix, self.cafe, self.super}
+        self.assertEqual(self.buscar(''), todas)
+        self.assertEqual(self.buscar('"*()'), todas)
+        # Las comillas no rompen la consulta FTS
+        self.assertEqual(self.buscar('"netflix'), {self.netflix})
+
+    def test_indice_sigue_a_la_tabla(self):
+        self.netflix.descripcion = 'Spotify'
+        self.netflix.save()
+        self.assertEqual(self.buscar('netflix'), set())
+        self.assertEqual(self.buscar('spotify'), {self.netflix})
+
+        self.cafe.delete()
+        self.assertEqual(self.buscar('cafe'), set())
+
+        nueva, = Transaccion.objects.bulk_create([Transaccion(
+            usuario=self.usuario, tipo='gasto', cantidad=1, categoria='Otros',
+            fecha=self.super.fecha, descripcion='Farmacia',
+        )])
+        self.assertEqual(self.buscar('farma'), {nueva})
+
+    def test_recrear_indice(self):
+        borrar_indice_busqueda(connection)
+        crear_indice_busqueda(connection)
+        # Reindexa lo que ya estaba en la tabla
+        self.assertEqual(self.buscar('netflix'), {self.netflix})
+        crear_indice_busqueda(connection)
+        self.assertEqual(self.buscar('netflix'), {self.netflix})
+
+    def test_historial_con_q(self):
+        self.client.force_login(self.usuario)
+        respuesta = self.client.get(reverse('historial_transacciones'), {'q': 'netflix'})
+        self.assertEqual(list(respuesta.context['transacciones']), [self.netflix])
@@ -0,0 +1,81 @@
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from finanzas.models import Notificacion
+from finanzas.tests.datos import CACHE_TESTS, crear_transaccion
+from finanzas.utils import cache
+from finanzas.utils.cache import cacheado, invalidar_usuario, version_notificaciones, version_usuario
+
+
+@override_settings(CACHES=CACHE_TESTS)
+class CacheVersionadaTests(TestCase):
+
+    def setUp(self):
+        cache.obtener_cache().clear()
+        self.usuario = User.objects.create_user('cache')
+        self.otro = User.objects.create_user('otro')
+
+    def test_version_estable_hasta_invalidar(self):
+        version = version_usuario(self.usuario.id)
+        self.assertEqual(version_usuario(self.usuario.id), version)
+        invalidar_usuario(self.usuario.id)
+        self.assertNotEqual(version_usuario(self.usuario.id), version)
+
+    def test_nunca_vuelve_a_una_version_usada(self):
+        vistas = {version_usuario(self.usuario.id)}
+        for _ in range(50):
+            invalidar_usuario(self.usuario.id)
+            vistas.add(version_usuario(self.usuario.id))
+        self.assertEqual(len(vistas), 51)
+        # Si la clave se pierde arranca en otra versión, no en una vieja
+        cache.obtener_cache().clear()
+        self.assertNotIn(version_usuario(self.usuario.id), vistas)
+
+    def test_cacheado(self):
+        llamadas = []
+
+        def calcular():
+            llamadas.append(1)
+            return len(llamadas)
+
+        version = version_usuario(self.usuario.id)
+        self.assertEqual(cacheado('prueba', version, calcular), 1)
+        self.assertEqual(cacheado('prueba', version, calcular), 1)
+        invalidar_usuario(self.usuario.id)
+        self.assertEqual(cacheado('prueba', version_usuario(self.usuario.id), calcular), 2)
+
+    def test_altas_bajas_y_ediciones_invalidan_solo_al_usuario(self):
+        version_otro = version_usuario(self.otro.id)
+
+        def cambia_la_version(cambio):
+            version = version_usuario(self.usuario.id)
+            with self.captureOnCommitCallbacks(execute=True):
+                cambio()
+            return version_usuario(self.usuario.id) != version
+
+        transaccion = crear_transaccion(self.usuario)
+        transaccion.cantidad = 5
+        self.assertTrue(cambia_la_version(lambda: crear_transaccion(self.usuario)))
+        self.assertTrue(cambia_la_version(transaccion.save))
+        self.assertTrue(cambia_la_version(transaccion.delete))
+        self.assertEqual(version_usuario(self.otro.id), version_otro)
+
+    def test_nueva_notificacion_invalida(self):
+        version = version_notificaciones()
+        with self.captureOnCommitCallbacks(execute=True):
+            Notificacion.objects.create(texto='hola')
+        self.assertNotEqual(version_notificaciones(), version)
+
+    def test_dashboard_desde_la_cache(self):
+        self.client.force_login(self.usuario)
+        crear_transaccion(self.usuario, descripcion='primera')
+        self.client.get(reverse('dashboard'))
+        # La segunda carga no recalcula movimientos, totales ni notificaciones
+        with self.assertNumQueries(2):  # sesión y usuario
+            respuesta = self.client.get(reverse('dashboard'))
+        self.assertContains(respuesta, 'primera')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            crear_transaccion(self.usuario, descripcion='segunda')
+        self.assertContains(self.client.get(reverse('dashboard')), 'segunda')
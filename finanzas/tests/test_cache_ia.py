@@ -0,0 +1,103 @@
+import json
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from finanzas import views
+from finanzas.utils import cache_ia
+from finanzas.utils.cache import CacheLRU
+from finanzas.utils.cache_ia import buscar_extraccion, guardar_extraccion, obtener_cache_ia, plantilla
+
+
+def respuesta_de(data):
+    mensaje = SimpleNamespace(content=json.dumps(data))
+    return SimpleNamespace(choices=[SimpleNamespace(message=mensaje)])
+
+
+def gasto(monto, mensaje=1, **campos):
+    return {'tipo': 'gasto', 'monto': monto, 'categoria': 'Servicios', 'mensaje': mensaje,
+            'descripcion': 'netflix', 'fecha': None, 'confidence': 0.9, **campos}
+
+
+@override_settings(BOT_CACHE_IA_TAMANIO=100, BOT_CACHE_IA_TTL=60)
+class CacheIATests(SimpleTestCase):
+
+    def setUp(self):
+        cache_ia._cache = None
+        self.addCleanup(setattr, cache_ia, '_cache', None)
+
+    def test_plantilla(self):
+        self.assertEqual(
+            plantilla('Gasté 2.000 en café el 24/10'), ('gaste <m0> en cafe el <f>', [Decimal(2000)]),
+        )
+        self.assertEqual(plantilla('pagué Netflix 4299')[0], plantilla('Pague netflix 4500')[0])
+
+    def test_acierto_con_los_importes_nuevos(self):
+        self.assertTrue(guardar_extraccion(['pagué netflix 4299'], {
+            'es_transaccion': True, 'transacciones': [gasto('4299')],
+        }))
+        data = buscar_extraccion(['Pagué Netflix 4500'])
+        self.assertEqual(data['transacciones'][0]['monto'], '4500')
+        # La descripción y la fecha se recalculan sobre el mensaje nuevo
+        self.assertEqual((data['transacciones'][0]['descripcion'], data['transacciones'][0]['fecha']), (None, None))
+        self.assertIsNone(buscar_extraccion(['pagué spotify 4500']))
+        self.assertEqual(obtener_cache_ia().estadisticas()['aciertos'], 1)
+
+    def test_varios_mensajes_e_importes(self):
+        textos = ['luz 10000 y gas 8000', 'cobré 5000']
+        guardar_extraccion(textos, {'es_transaccion': True, 'transacciones': [
+            gasto('8000'), gasto('10000'), {'tipo': 'ingreso', 'monto': '5000', 'mensaje': 2},
+        ]})
+        data = buscar_extraccion(['luz 11000 y gas 9000', 'cobré 7000'])
+        self.assertEqual([t['monto'] for t in data['transacciones']], ['9000', '11000', '7000'])
+
+    def test_no_guarda_lo_que_la_ia_interpreto(self):
+        # Un total que no figura en el texto
+        self.assertFalse(guardar_extraccion(['café 1500 y medialunas 900'], {
+            'es_transaccion': True, 'transacciones': [gasto('2400')],
+        }))
+        # Una fecha que el texto no dice
+        self.assertFalse(guardar_extraccion(['netflix 4299'], {
+            'es_transaccion': True, 'transacciones': [gasto('4299', fecha='2020-01-01')],
+        }))
+        self.assertEqual(obtener_cache_ia().estadisticas()['entradas'], 0)
+
+    def test_lo_cacheado_no_se_modifica(self):
+        guardar_extraccion(['netflix 4299'], {'es_transaccion': True, 'transacciones': [gasto('4299')]})
+        buscar_extraccion(['netflix 1'])['transacciones'][0]['categoria'] = 'Otra'
+        self.assertEqual(buscar_extraccion(['netflix 2'])['transacciones'][0]['categoria'], 'Servicios')
+
+    @override_settings(OPENAI_API_KEY='sk-test')
+    def test_la_ia_se_llama_una_vez(self):
+        data = {'es_transaccion': True, 'transacciones': [gasto(4299)]}
+        with mock.patch.object(views, 'completar_chat', return_value=respuesta_de(data)) as completar:
+            primera, _ = views.extraer_transacciones_openai(['pagué netflix 4299'])
+            segunda, _ = views.extraer_transacciones_openai(['pagué netflix 4500'])
+        completar.assert_called_once()
+        self.assertEqual(Decimal(str(primera['transacciones'][0]['monto'])), Decimal(4299))
+        self.assertEqual(segunda['transacciones'][0]['monto'], '4500')
+
+
+class CacheLRUTests(SimpleTestCase):
+
+    def test_descarta_lo_menos_usado(self):
+        lru = CacheLRU(2, 60)
+        lru.set('a', 1)
+        lru.set('b', 2)
+        lru.get('a')
+        lru.set('c', 3)
+        self.assertIsNone(lru.get('b'))
+        self.assertEqual((lru.get('a'), lru.get('c')), (1, 3))
+        self.assertEqual(lru.estadisticas(), {'entradas': 2, 'aciertos': 3, 'fallos': 1, 'ratio': 0.75})
+
+    def test_vencimiento(self):
+        lru = CacheLRU(10, 60)
+        with mock.patch('finanzas.utils.cache.time.monotonic', return_value=1000):
+            lru.set('a', 1)
+        with mock.patch('finanzas.utils.cache.time.monotonic', return_value=1059):
+            self.assertEqual(lru.get('a'), 1)
+        with mock.patch('finanzas.utils.cache.time.monotonic', return_value=1061):
+            self.assertIsNone(lru.get('a'))
+        self.assertEqual(lru.estadisticas()['entradas'], 0)
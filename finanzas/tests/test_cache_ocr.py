@@ -0,0 +1,88 @@
+from datetime import timedelta
+from io import BytesIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+
+from finanzas.models import ResultadoOCR
+from finanzas.tests.test_ocr import imagen_ticket
+from finanzas.utils.cache_ocr import buscar_repetido, marcar_registrado, obtener_resultado, podar_cache_ocr
+
+LECTURA = {'texto': 'KIOSCO\n28/10/25\nTOTAL 900', 'lineas': [
+    [('KIOSCO', 95.0)], [('28/10/25', 95.0)], [('TOTAL', 95.0), ('900', 95.0)],
+]}
+
+
+class CacheOCRTests(TestCase):
+
+    def setUp(self):
+        self.usuario = User.objects.create_user('ocr')
+        self.img, self.png = imagen_ticket()
+        # Tesseract no se prueba acá: solo cuántas veces se lee
+        parche = mock.patch('finanzas.utils.cache_ocr.leer_imagen_bytes', return_value=LECTURA)
+        self.leer = parche.start()
+        self.addCleanup(parche.stop)
+
+    def obtener(self, file_unique_id, contenido=None, usuario=None):
+        descargar = mock.Mock(return_value=contenido or self.png)
+        resultado, conocido = obtener_resultado((usuario or self.usuario).id, file_unique_id, descargar)
+        return resultado, conocido, descargar.called
+
+    def test_primera_vez_descarga_y_lee(self):
+        resultado, conocido, descargo = self.obtener('u1')
+        self.assertEqual((conocido, descargo, self.leer.call_count), (False, True, 1))
+        self.assertEqual((resultado.texto, resultado.recibo['monto']), (LECTURA['texto'], '900'))
+        self.assertEqual(len(resultado.dhash), 16)
+
+    def test_mismo_file_unique_id_sin_descargar(self):
+        primero, _, _ = self.obtener('u1')
+        resultado, conocido, descargo = self.obtener('u1')
+        self.assertEqual((resultado.id, conocido, descargo, self.leer.call_count), (primero.id, True, False, 1))
+
+    def test_misma_imagen_subida_de_nuevo(self):
+        primero, _, _ = self.obtener('u1')
+        resultado, conocido, descargo = self.obtener('u2')
+        self.assertEqual((resultado.id, conocido, descargo, self.leer.call_count), (primero.id, True, True, 1))
+
+    def test_lectura_de_otro_usuario(self):
+        primero, _, _ = self.obtener('u1')
+        otro = User.objects.create_user('otro')
+        resultado, conocido, descargo = self.obtener('u1', usuario=otro)
+        self.assertEqual((conocido, descargo, self.leer.call_count), (False, False, 1))
+        self.assertNotEqual(resultado.id, primero.id)
+        self.assertEqual((resultado.usuario_id, resultado.texto), (otro.id, primero.texto))
+
+    def test_repetido(self):
+        resultado, conocido, _ = self.obtener('u1')
+        self.assertIsNone(buscar_repetido(resultado, conocido))
+        marcar_registrado(resultado)
+        reenviado, conocido, _ = self.obtener('u1')
+        self.assertEqual(buscar_repetido(reenviado, conocido).id, resultado.id)
+
+        # Otra foto del mismo ticket (recomprimida) con el mismo total
+        jpg = BytesIO()
+        self.img.save(jpg, 'JPEG', quality=60)
+        parecida, conocido, _ = self.obtener('u3', jpg.getvalue())
+        self.assertFalse(conocido)
+        self.assertEqual(buscar_repetido(parecida, conocido).id, resultado.id)
+
+        # Parecida pero con otro total: los tickets en blanco se parecen entre sí
+        self.leer.return_value = {'texto': 'KIOSCO\nTOTAL 1500', 'lineas': [
+            [('KIOSCO', 95.0)], [('TOTAL', 95.0), ('1500', 95.0)],
+        ]}
+        jpg = BytesIO()
+        self.img.save(jpg, 'JPEG', quality=40)
+        otra, conocido, _ = self.obtener('u4', jpg.getvalue())
+        self.assertIsNone(buscar_repetido(otra, conocido))
+
+    def test_podar(self):
+        ahora = timezone.now()
+        for minutos in range(5):
+            ResultadoOCR.objects.create(
+                usuario=self.usuario, sha256=str(minutos), dhash='', usado=ahora - timedelta(minutes=minutos),
+            )
+        self.assertEqual(podar_cache_ocr(max_filas=3), 2)
+        self.assertEqual(sorted(ResultadoOCR.objects.values_list('sha256', flat=True)), ['0', '1', '2'])
+        self.assertEqual(podar_cache_ocr(max_filas=3), 0)
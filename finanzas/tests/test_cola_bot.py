@@ -0,0 +1,104 @@
+import json
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from finanzas.models import TrabajoBot
+from finanzas.tests.datos import CACHE_TESTS
+from finanzas.utils.cola_bot import (
+    completar_trabajo,
+    encolar_update,
+    fallar_trabajo,
+    limpiar_terminados,
+    reclamar_trabajo,
+    recuperar_colgados,
+)
+
+
+def update_de(chat_id, update_id, texto='hola'):
+    return {'update_id': update_id, 'message': {'chat': {'id': chat_id}, 'text': texto}}
+
+
+@override_settings(BOT_COLA_MAX_INTENTOS=3, BOT_COLA_BACKOFF_BASE=2, BOT_COLA_BACKOFF_MAX=300)
+class ColaBotTests(TestCase):
+
+    def test_un_trabajo_por_chat_y_en_orden(self):
+        primero = encolar_update(update_de(1, 1))
+        encolar_update(update_de(1, 2))
+        otro_chat = encolar_update(update_de(2, 3))
+
+        self.assertEqual(reclamar_trabajo().id, primero.id)
+        # El chat 1 tiene uno en proceso: se salta hasta el chat 2
+        self.assertEqual(reclamar_trabajo().id, otro_chat.id)
+        self.assertIsNone(reclamar_trabajo())
+
+        completar_trabajo(primero)
+        siguiente = reclamar_trabajo()
+        self.assertEqual(siguiente.update['update_id'], 2)
+        self.assertEqual(TrabajoBot.objects.get(id=primero.id).estado, TrabajoBot.HECHO)
+
+    def test_fallo_con_backoff(self):
+        encolar_update(update_de(1, 1))
+        encolar_update(update_de(1, 2))
+        ahora = timezone.now()
+
+        trabajo = reclamar_trabajo(ahora)
+        fallar_trabajo(trabajo, 'error 1')
+        trabajo.refresh_from_db()
+        self.assertEqual(trabajo.estado, TrabajoBot.PENDIENTE)
+        self.assertEqual(trabajo.ultimo_error, 'error 1')
+        self.assertAlmostEqual((trabajo.disponible_desde - ahora).total_seconds(), 2, delta=1)
+
+        # Mientras espera el reintento, los siguientes del chat también esperan
+        self.assertIsNone(reclamar_trabajo(ahora))
+        trabajo = reclamar_trabajo(ahora + timedelta(seconds=3))
+        self.assertEqual(trabajo.intentos, 2)
+
+        fallar_trabajo(trabajo, 'error 2')
+        trabajo.refresh_from_db()
+        self.assertAlmostEqual((trabajo.disponible_desde - ahora).total_seconds(), 4, delta=1)
+
+    def test_agota_los_intentos(self):
+        encolar_update(update_de(1, 1))
+        momento = timezone.now()
+        for _ in range(3):
+            momento += timedelta(minutes=10)
+            trabajo = reclamar_trabajo(momento)
+            fallar_trabajo(trabajo, 'sigue fallando')
+        trabajo.refresh_from_db()
+        self.assertEqual(trabajo.estado, TrabajoBot.ERROR)
+        self.assertIsNone(reclamar_trabajo(momento + timedelta(hours=1)))
+
+    def test_recuperar_colgados(self):
+        trabajo = encolar_update(update_de(1, 1))
+        reclamar_trabajo()
+        self.assertEqual(recuperar_colgados(timeout=300), 0)
+        TrabajoBot.objects.filter(id=trabajo.id).update(iniciado=timezone.now() - timedelta(minutes=10))
+        self.assertEqual(recuperar_colgados(timeout=300), 1)
+        self.assertEqual(reclamar_trabajo().id, trabajo.id)
+
+    def test_limpiar_terminados(self):
+        viejo = encolar_update(update_de(1, 1))
+        reciente = encolar_update(update_de(2, 2))
+        for trabajo in (reclamar_trabajo(), reclamar_trabajo()):
+            completar_trabajo(trabajo)
+        TrabajoBot.objects.filter(id=viejo.id).update(finalizado=timezone.now() - timedelta(days=8))
+        self.assertEqual(limpiar_terminados(dias=7), 1)
+        self.assertEqual(list(TrabajoBot.objects.values_list('id', flat=True)), [reciente.id])
+
+
+@override_settings(CACHES=CACHE_TESTS, TELEGRAM_WEBHOOK_ASINCRONO=True)
+class WebhookAsincronoTests(TestCase):
+
+    def test_encola_sin_procesar(self):
+        with mock.patch('finanzas.views.procesar_update') as procesar:
+            respuesta = self.client.post(
+                reverse('webhook'), json.dumps(update_de(5, 10)), content_type='application/json',
+            )
+        self.assertEqual(respuesta.json(), {'status': 'ok'})
+        procesar.assert_not_called()
+        trabajo = TrabajoBot.objects.get()
+        self.assertEqual((trabajo.chat_id, trabajo.estado), ('5', TrabajoBot.PENDIENTE))
@@ -0,0 +1,167 @@
+import shutil
+import tempfile
+import threading
+from datetime import datetime, timezone as tz
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import close_old_connections
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from finanzas.models import Perfil
+from finanzas.tests.datos import CACHE_TESTS
+from finanzas.utils import control_ia
+from finanzas.utils.cache import cache_atomica
+
+
+class _ControlIA:
+    """
+    Los mismos casos con el estado en la cache y en Perfil.
+    """
+
+    def setUp(self):
+        control_ia.obtener_cache().clear()
+        self.perfil = Perfil.objects.create(user=User.objects.create_user('ia'))
+        self.ahora = 1_700_000_000.0
+        # El reloj de la cache (time.time) y el de los bloqueos en Perfil (timezone.now)
+        for parche in (
+            mock.patch.object(control_ia.time, 'time', lambda: self.ahora),
+            mock.patch.object(control_ia.timezone, 'now', lambda: datetime.fromtimestamp(self.ahora, tz.utc)),
+        ):
+            parche.start()
+            self.addCleanup(parche.stop)
+
+    def consumir(self, veces):
+        return [control_ia.consumir_llamada_ia(self.perfil.user_id) for _ in range(veces)]
+
+    def test_cupo_por_minuto(self):
+        self.assertEqual(self.consumir(4), [True, True, True, False])
+        # En 20 segundos se recupera una llamada
+        self.ahora += 20
+        self.assertEqual(self.consumir(2), [True, False])
+
+    def test_cupo_por_dia(self):
+        self.assertEqual(self.consumir(3), [True] * 3)
+        self.ahora += 60
+        self.assertEqual(self.consumir(3), [True, True, False])
+        # El balde diario se rellena de a poco: en una hora no alcanza para otra
+        self.ahora += 3600
+        self.assertEqual(self.consumir(1), [False])
+        self.ahora += 86400
+        self.assertEqual(self.consumir(1), [True])
+
+    def test_cupos_independientes_por_usuario(self):
+        self.consumir(3)
+        otro = Perfil.objects.create(user=User.objects.create_user('ia2'))
+        self.assertTrue(control_ia.consumir_llamada_ia(otro.user_id))
+
+    def test_strikes_bloquean(self):
+        control_ia.registrar_no_transaccion(self.perfil)
+        self.assertFalse(control_ia.ia_bloqueada(self.perfil))
+        control_ia.registrar_no_transaccion(self.perfil)
+        self.assertTrue(control_ia.ia_bloqueada(self.perfil))
+        self.ahora += control_ia.TIEMPO_BLOQUEO.total_seconds() + 1
+        self.assertFalse(control_ia.ia_bloqueada(self.perfil))
+
+    def test_transaccion_valida_resetea_strikes(self):
+        control_ia.registrar_no_transaccion(self.perfil)
+        control_ia.registrar_transaccion_valida(self.perfil)
+        control_ia.registrar_no_transaccion(self.perfil)
+        self.assertFalse(control_ia.ia_bloqueada(self.perfil))
+
+
+@override_settings(CACHES=CACHE_TESTS, BOT_IA_LLAMADAS_POR_MINUTO=3, BOT_IA_LLAMADAS_POR_DIA=5)
+class ControlIACacheTests(_ControlIA, TestCase):
+
+    def test_mensaje_valido_no_escribe_en_la_base(self):
+        self.assertTrue(cache_atomica())
+        with self.assertNumQueries(0):
+            control_ia.registrar_transaccion_valida(self.perfil)
+            self.assertFalse(control_ia.ia_bloqueada(self.perfil))
+            self.assertTrue(control_ia.consumir_llamada_ia(self.perfil.user_id))
+
+    def test_llamadas_concurrentes(self):
+        resultados = []
+        lock = threading.Lock()
+
+        def consumir():
+            ok = control_ia.consumir_llamada_ia(self.perfil.user_id)
+            with lock:
+                resultados.append(ok)
+
+        threads = [threading.Thread(target=consumir) for _ in range(20)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(resultados.count(True), 3)
+
+
+class _CacheEnArchivos:
+    """
+    FileBasedCache (la de settings): add/incr no son atómicos y el estado va a Perfil.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directorio = tempfile.mkdtemp()
+        cls.ajustes = override_settings(
+            CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                'LOCATION': cls.directorio,
+            }},
+            BOT_IA_LLAMADAS_POR_MINUTO=3,
+            BOT_IA_LLAMADAS_POR_DIA=5,
+        )
+        cls.ajustes.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.ajustes.disable()
+        shutil.rmtree(cls.directorio, ignore_errors=True)
+
+
+class ControlIABaseDeDatosTests(_CacheEnArchivos, _ControlIA, TestCase):
+
+    def test_estado_en_perfil(self):
+        self.assertFalse(cache_atomica())
+        self.consumir(2)
+        control_ia.registrar_no_transaccion(self.perfil)
+        self.perfil.refresh_from_db()
+        self.assertEqual(self.perfil.cupo_ia_minuto, 1)
+        self.assertEqual(self.perfil.cupo_ia_dia, 3)
+        self.assertEqual(self.perfil.strikes_no_transaccion, 1)
+
+    def test_mensaje_valido_no_escribe_en_la_base(self):
+        # Sin strikes: solo la consulta del UPDATE condicional, que no toca filas
+        with self.assertNumQueries(1):
+            control_ia.registrar_transaccion_valida(self.perfil)
+
+
+class ControlIAConcurrenciaTests(_CacheEnArchivos, TransactionTestCase):
+
+    def test_llamadas_concurrentes_no_gastan_el_mismo_token(self):
+        perfil = Perfil.objects.create(user=User.objects.create_user('ia'))
+        resultados = []
+        lock = threading.Lock()
+        largada = threading.Barrier(16)
+
+        def consumir():
+            largada.wait()
+            try:
+                for _ in range(5):
+                    ok = control_ia.consumir_llamada_ia(perfil.user_id)
+                    with lock:
+                        resultados.append(ok)
+            finally:
+                close_old_connections()
+
+        threads = [threading.Thread(target=consumir) for _ in range(16)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(len(resultados), 80)
+        self.assertEqual(resultados.count(True), 3)
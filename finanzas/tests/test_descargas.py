@@ -0,0 +1,126 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from finanzas import views
+from finanzas.utils import telegram
+from finanzas.utils.telegram import ArchivoMuyGrande, ClienteTelegram, LimitadorEnvios, elegir_foto
+
+CONTENIDO = bytes(range(256)) * 1024  # 256 KB: más de una parte
+
+
+class _ArchivosFalsos(BaseHTTPRequestHandler):
+    """
+    Descargas de mentira: /file/bot<token>/<nombre> según el nombre.
+    """
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        nombre = self.path.rsplit('/', 1)[-1]
+        self.send_response(200)
+        if nombre == 'declarado_grande':
+            self.send_header('Content-Length', str(100 * 1024 * 1024))
+        elif nombre != 'sin_largo':
+            self.send_header('Content-Length', str(len(CONTENIDO)))
+        self.end_headers()
+        try:
+            self.wfile.write(CONTENIDO)
+        except OSError:
+            # El cliente cortó la descarga
+            pass
+
+
+def foto(lado, file_size=1000):
+    return {'file_id': f'f{lado}', 'width': lado, 'height': lado * 3 // 4, 'file_size': file_size}
+
+
+class ElegirFotoTests(SimpleTestCase):
+    fotos = [foto(90), foto(320), foto(800), foto(1280), foto(2560)]
+
+    def test_la_mas_chica_que_alcanza(self):
+        self.assertEqual(elegir_foto(self.fotos, 1000)['width'], 1280)
+        self.assertEqual(elegir_foto(list(reversed(self.fotos)), 300)['width'], 320)
+
+    def test_ninguna_alcanza(self):
+        self.assertEqual(elegir_foto(self.fotos[:3], 1000)['width'], 800)
+
+    def test_respeta_el_maximo_de_bytes(self):
+        fotos = [foto(800, 100), foto(1280, 5000), foto(2560, 9000)]
+        self.assertEqual(elegir_foto(fotos, 2000, max_bytes=6000)['width'], 1280)
+        # Si ninguna entra se elige igual (la descarga corta por tamaño)
+        self.assertEqual(elegir_foto(fotos, 2000, max_bytes=10)['width'], 2560)
+
+
+@override_settings(TELEGRAM_MAX_BYTES_DESCARGA=1024 * 1024, OCR_LADO_FOTO=1000)
+class ElegirArchivoTests(SimpleTestCase):
+
+    def test_foto(self):
+        archivo, motivo = views.elegir_archivo({'photo': [foto(800), foto(1280), foto(2560)]})
+        self.assertEqual((archivo['width'], motivo), (1280, None))
+
+    def test_documentos(self):
+        imagen = {'file_id': 'd1', 'mime_type': 'image/jpeg', 'file_size': 2000}
+        self.assertEqual(views.elegir_archivo({'document': imagen}), (imagen, None))
+        archivo, motivo = views.elegir_archivo({'document': {'mime_type': 'application/zip'}})
+        self.assertIsNone(archivo)
+        self.assertIn('fotos o PDFs', motivo)
+        archivo, motivo = views.elegir_archivo({'document': dict(imagen, file_size=2 * 1024 * 1024)})
+        self.assertEqual((archivo, motivo), (None, 'El archivo es demasiado grande 😕'))
+
+    def test_pdf_sin_pypdfium2(self):
+        with mock.patch.object(views, 'PDF_DISPONIBLE', False):
+            archivo, motivo = views.elegir_archivo({'document': {'mime_type': 'application/pdf'}})
+        self.assertIsNone(archivo)
+        self.assertIn('PDF', motivo)
+
+
+@override_settings(TELEGRAM_TIMEOUT_DESCARGA=5)
+class DescargaTests(SimpleTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.servidor = ThreadingHTTPServer(('127.0.0.1', 0), _ArchivosFalsos)
+        threading.Thread(target=cls.servidor.serve_forever, daemon=True).start()
+        cls.cliente = ClienteTelegram(
+            'TOKEN', f'http://127.0.0.1:{cls.servidor.server_port}', (1, 2), 0, 0, LimitadorEnvios(1000, 1000, 1000),
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.servidor.shutdown()
+        cls.servidor.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        telegram._descargas.buffer = None
+
+    def test_descarga_completa(self):
+        self.assertEqual(self.cliente.descargar('photos/ok.jpg'), CONTENIDO)
+        # Sin Content-Length el buffer crece por partes
+        telegram._descargas.buffer = None
+        self.assertEqual(self.cliente.descargar('sin_largo'), CONTENIDO)
+
+    def test_reusa_el_buffer(self):
+        self.cliente.descargar('ok.jpg')
+        buffer = telegram._descargas.buffer
+        self.assertEqual(self.cliente.descargar('ok.jpg'), CONTENIDO)
+        self.assertIs(telegram._descargas.buffer, buffer)
+
+    def test_tamanio_declarado_grande(self):
+        with self.assertRaises(ArchivoMuyGrande):
+            self.cliente.descargar('declarado_grande')
+        self.assertIsNone(telegram._descargas.buffer)
+
+    def test_corta_al_pasar_el_maximo(self):
+        with self.assertRaises(ArchivoMuyGrande):
+            self.cliente.descargar('sin_largo', max_bytes=100 * 1024)
+        self.assertLessEqual(len(telegram._descargas.buffer), 100 * 1024)
+
+    def test_timeout_total(self):
+        with self.assertRaisesMessage(telegram.ErrorTelegram, 'tardó demasiado'):
+            self.cliente.descargar('sin_largo', timeout_total=1e-6)
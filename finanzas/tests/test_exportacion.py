@@ -0,0 +1,71 @@
+import csv
+import io
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from openpyxl import load_workbook
+
+from finanzas.tests.datos import CACHE_TESTS, crear_transaccion
+from finanzas.utils.exportacion import COLUMNAS, celda_segura
+
+
+@override_settings(CACHES=CACHE_TESTS)
+class ExportacionTests(TestCase):
+
+    def setUp(self):
+        self.usuario = User.objects.create_user('exporta')
+        self.client.force_login(self.usuario)
+        crear_transaccion(self.usuario, 'gasto', 300, 'Comida', date(2025, 10, 10), descripcion='Súper')
+        crear_transaccion(self.usuario, 'ingreso', 1000, 'Salario', date(2025, 10, 1), destino='Banco')
+        crear_transaccion(User.objects.create_user('otro'), 'gasto', 50)
+
+    def exportar(self, querystring=''):
+        return self.client.get(reverse('exportar_transacciones') + querystring)
+
+    def leer_csv(self, respuesta):
+        texto = b''.join(respuesta.streaming_content).decode('utf-8')
+        self.assertTrue(texto.startswith('\ufeff'))
+        return list(csv.reader(io.StringIO(texto[1:])))
+
+    def test_csv_del_usuario_ordenado(self):
+        respuesta = self.exportar()
+        self.assertEqual(respuesta['Content-Type'], 'text/csv; charset=utf-8')
+        filas = self.leer_csv(respuesta)
+        self.assertEqual(filas[0], COLUMNAS)
+        self.assertEqual(filas[1:], [
+            ['2025-10-10', 'gasto', 'Comida', 'Súper', '', '300.00'],
+            ['2025-10-01', 'ingreso', 'Salario', 'test', 'Banco', '1000.00'],
+        ])
+
+    def test_csv_respeta_filtros(self):
+        filas = self.leer_csv(self.exportar('?tipo=ingreso'))
+        self.assertEqual([f[2] for f in filas[1:]], ['Salario'])
+
+    def test_csv_no_deja_formulas(self):
+        crear_transaccion(self.usuario, descripcion='=HYPERLINK("http://x")', destino='@SUM(A1)',
+                          fecha=date(2025, 10, 20))
+        fila = self.leer_csv(self.exportar())[1]
+        self.assertEqual(fila[3], '\'=HYPERLINK("http://x")')
+        self.assertEqual(fila[4], "'@SUM(A1)")
+
+    def test_celda_segura(self):
+        for valor in ('=1+1', '+1', '-1', '@A1', '\tx', '\rx'):
+            self.assertEqual(celda_segura(valor), "'" + valor)
+        self.assertEqual(celda_segura('Comida'), 'Comida')
+        self.assertEqual(celda_segura(Decimal('-5')), Decimal('-5'))
+        self.assertIsNone(celda_segura(None))
+
+    def test_xlsx(self):
+        crear_transaccion(self.usuario, descripcion='=1+1', fecha=date(2025, 10, 20))
+        respuesta = self.exportar('?formato=xlsx')
+        self.assertIn('.xlsx', respuesta['Content-Disposition'])
+        libro = load_workbook(io.BytesIO(b''.join(respuesta.streaming_content)))
+        filas = list(libro['Transacciones'].values)
+        self.assertEqual(list(filas[0]), COLUMNAS)
+        self.assertEqual(len(filas), 4)
+        # Queda como texto, no como fórmula
+        self.assertEqual(filas[1][3], "'=1+1")
+        self.assertEqual(filas[3][2], 'Salario')
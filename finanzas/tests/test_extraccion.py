@@ -0,0 +1,126 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from finanzas import views
+from finanzas.models import Perfil, TrabajoBot, Transaccion
+from finanzas.tests.datos import CACHE_TESTS
+from finanzas.utils.cache import obtener_cache
+from finanzas.utils.cola_bot import encolar_update, reclamar_lote
+
+
+def update_de(chat_id, update_id, texto='hola'):
+    return {'update_id': update_id, 'message': {'chat': {'id': chat_id}, 'text': texto}}
+
+
+@override_settings(BOT_VENTANA_AGRUPACION=5)
+class ReclamarLoteTests(TestCase):
+
+    def ids(self, lote):
+        return [t.update['update_id'] for t in lote]
+
+    def test_junta_textos_seguidos_del_chat(self):
+        for update_id, texto in ((1, 'café 1500'), (2, 'taxi 4000'), (3, '/saldo'), (4, 'super 20000')):
+            encolar_update(update_de(1, update_id, texto))
+        encolar_update(update_de(2, 5))
+        lote = reclamar_lote()
+        self.assertEqual(self.ids(lote), [1, 2])
+        self.assertEqual([t.intentos for t in lote], [1, 1])
+        self.assertEqual(
+            set(TrabajoBot.objects.filter(id__in=[t.id for t in lote]).values_list('estado', flat=True)),
+            {TrabajoBot.PROCESANDO},
+        )
+        # El comando corta el grupo; el otro chat va aparte
+        self.assertEqual(self.ids(reclamar_lote()), [5])
+        self.assertEqual(reclamar_lote(), [])
+
+    def test_fuera_de_la_ventana(self):
+        primero = encolar_update(update_de(1, 1))
+        tarde = encolar_update(update_de(1, 2))
+        TrabajoBot.objects.filter(id=tarde.id).update(creado=primero.creado + timedelta(seconds=6))
+        self.assertEqual(self.ids(reclamar_lote(timezone.now() + timedelta(seconds=10))), [1])
+
+    @override_settings(BOT_VENTANA_AGRUPACION=0)
+    def test_sin_ventana(self):
+        encolar_update(update_de(1, 1))
+        encolar_update(update_de(1, 2))
+        self.assertEqual(self.ids(reclamar_lote()), [1])
+
+
+@override_settings(CACHES=CACHE_TESTS, BOT_PARSER_LOCAL=False, OPENAI_API_KEY='sk-test')
+class ExtraccionEnLoteTests(TestCase):
+
+    def setUp(self):
+        obtener_cache().clear()
+        self.usuario = User.objects.create_user('lote')
+        Perfil.objects.create(user=self.usuario, telegram_chat_id='77')
+        self.enviados = []
+        parche = mock.patch.object(views, 'send_message', lambda chat_id, texto: self.enviados.append(texto))
+        parche.start()
+        self.addCleanup(parche.stop)
+
+    def procesar(self, textos, respuesta):
+        updates = [update_de(77, i, texto) for i, texto in enumerate(textos, start=1)]
+        with mock.patch.object(views, 'extraer_transacciones_openai', return_value=(respuesta, None)) as extraer:
+            views.procesar_updates(updates)
+        return extraer
+
+    def test_varios_mensajes_una_llamada(self):
+        extraer = self.procesar(['café 1500 y taxi 4000', 'ayer cobré 200000'], {
+            'es_transaccion': True,
+            'transacciones': [
+                {'tipo': 'gasto', 'monto': 1500, 'categoria': 'Comida', 'descripcion': 'café 1500', 'mensaje': 1, 'confidence': 0.9},
+                {'tipo': 'gasto', 'monto': 4000, 'categoria': 'Transporte', 'descripcion': 'taxi 4000', 'mensaje': 1, 'confidence': 0.9},
+                {'tipo': 'ingreso', 'monto': 200000, 'categoria': 'Salario', 'descripcion': 'cobré', 'mensaje': 2, 'confidence': 0.9},
+            ],
+        })
+        extraer.assert_called_once_with(['café 1500 y taxi 4000', 'ayer cobré 200000'], self.usuario.id)
+        registradas = Transaccion.objects.filter(usuario=self.usuario).order_by('cantidad')
+        self.assertEqual(
+            [(t.descripcion, t.categoria, t.cantidad) for t in registradas],
+            [('café 1500', 'Comida', Decimal(1500)), ('taxi 4000', 'Otros', Decimal(4000)),
+             ('cobré', 'Salario', Decimal(200000))],
+        )
+        # La fecha sale del mensaje de cada transacción
+        self.assertEqual(registradas[2].fecha, date.today() - timedelta(days=1))
+        self.assertEqual(registradas[0].fecha, date.today())
+        self.assertEqual(len(self.enviados), 1)
+        self.assertTrue(self.enviados[0].startswith('✅ Registré 3 transacciones'))
+
+    def test_errores_y_dudosas_no_frenan_a_las_validas(self):
+        self.procesar(['café 1500', 'algo raro', 'taxi?'], {
+            'es_transaccion': True,
+            'transacciones': [
+                {'tipo': 'gasto', 'monto': 1500, 'mensaje': 1, 'confidence': 0.9},
+                {'tipo': 'gasto', 'monto': -3, 'mensaje': 2, 'confidence': 0.9},
+                {'tipo': 'gasto', 'monto': 4000, 'mensaje': 3, 'confidence': 0.3},
+            ],
+        })
+        self.assertEqual(Transaccion.objects.filter(usuario=self.usuario).count(), 1)
+        self.assertEqual(self.enviados[0], '✅ Transacción registrada correctamente.')
+        self.assertTrue(self.enviados[1].startswith('Detecté esto, ¿confirmás?'))
+        self.assertEqual(self.enviados[2], 'El monto detectado no es válido.')
+
+    def test_pedido_numera_los_mensajes(self):
+        pedido = views._pedido_extraccion(['uno', 'dos'])
+        self.assertEqual(pedido['messages'][1]['content'], '[1] uno\n[2] dos')
+        self.assertEqual(views._pedido_extraccion(['uno'])['messages'][1]['content'], 'uno')
+
+    def test_normalizar_respuesta_ia(self):
+        self.assertEqual(
+            views.normalizar_respuesta_ia({'tipo': 'gasto', 'monto': 5}),
+            {'es_transaccion': True, 'transacciones': [{'tipo': 'gasto', 'monto': 5}]},
+        )
+        self.assertEqual(
+            views.normalizar_respuesta_ia({'es_transaccion': False, 'transacciones': []}),
+            {'es_transaccion': False, 'transacciones': []},
+        )
+        self.assertEqual(
+            views.normalizar_respuesta_ia({'transacciones': ['basura', {'monto': 1}]})['transacciones'],
+            [{'monto': 1}],
+        )
+        self.assertIsNone(views.normalizar_respuesta_ia(['no', 'es', 'un', 'objeto']))
@@ -0,0 +1,80 @@
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.http import QueryDict
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from finanzas.models import Transaccion
+from finanzas.tests.datos import CACHE_TESTS, crear_transaccion
+from finanzas.utils.filtros import calcular_facetas, filtrar_transacciones
+
+
+@override_settings(CACHES=CACHE_TESTS)
+class FiltrosTests(TestCase):
+
+    def setUp(self):
+        self.usuario = User.objects.create_user('filtros')
+        self.sueldo = crear_transaccion(self.usuario, 'ingreso', 1000, 'Salario', date(2025, 10, 1))
+        self.super = crear_transaccion(self.usuario, 'gasto', 300, 'Comida', date(2025, 10, 10))
+        self.luz = crear_transaccion(self.usuario, 'gasto', 50, 'Servicios', date(2025, 10, 20))
+        self.venta = crear_transaccion(self.usuario, 'ingreso', 80, 'Comida', date(2025, 10, 20))
+        # De otro usuario: nunca aparece
+        crear_transaccion(User.objects.create_user('otro'), 'gasto', 300)
+
+    def filtrar(self, querystring):
+        return set(filtrar_transacciones(self.usuario, QueryDict(querystring)))
+
+    def test_sin_filtros(self):
+        self.assertEqual(self.filtrar(''), {self.sueldo, self.super, self.luz, self.venta})
+
+    def test_rango_de_fechas(self):
+        self.assertEqual(self.filtrar('desde=2025-10-05&hasta=2025-10-15'), {self.super})
+        self.assertEqual(self.filtrar('fecha=2025-10-20'), {self.luz, self.venta})
+
+    def test_varias_categorias_y_tipo(self):
+        self.assertEqual(self.filtrar('categoria=Comida&categoria=Servicios'), {self.super, self.luz, self.venta})
+        self.assertEqual(self.filtrar('categoria=Comida&tipo=gasto'), {self.super})
+
+    def test_rango_de_montos(self):
+        self.assertEqual(self.filtrar('monto_min=60&monto_max=300'), {self.super, self.venta})
+        self.assertEqual(self.filtrar('monto_min=80,5'), {self.sueldo, self.super})
+
+    def test_valores_invalidos_se_ignoran(self):
+        todas = {self.sueldo, self.super, self.luz, self.venta}
+        for querystring in ['monto_min=NaN', 'monto_max=Infinity', 'monto_min=sNaN', 'monto_max=-inf',
+                            'monto_min=abc', 'desde=ayer', 'tipo=otro']:
+            with self.subTest(querystring=querystring):
+                self.assertEqual(self.filtrar(querystring), todas)
+
+    def test_facetas(self):
+        facetas = calcular_facetas(filtrar_transacciones(self.usuario, QueryDict('')))
+        self.assertEqual(facetas['por_tipo']['ingreso'], {'n': 2, 'total': Decimal('1080')})
+        self.assertEqual(facetas['por_tipo']['gasto'], {'n': 2, 'total': Decimal('350')})
+        # Ingresos y gastos de una categoría no se suman entre sí
+        self.assertEqual(
+            facetas['por_categoria']['Comida'],
+            {'n': 2, 'ingreso': Decimal('80'), 'gasto': Decimal('300')},
+        )
+
+    def test_facetas_con_tipo_desconocido(self):
+        Transaccion.objects.filter(id=self.luz.id).update(tipo='ajuste')
+        facetas = calcular_facetas(filtrar_transacciones(self.usuario, QueryDict('')))
+        self.assertEqual(facetas['por_categoria']['Servicios']['n'], 1)
+        self.assertEqual(facetas['por_tipo']['ajuste']['n'], 1)
+
+    def test_vistas_con_montos_no_finitos(self):
+        self.client.force_login(self.usuario)
+        for nombre in ('historial_transacciones', 'api_transacciones', 'exportar_transacciones'):
+            with self.subTest(vista=nombre):
+                respuesta = self.client.get(reverse(nombre), {'monto_min': 'NaN', 'monto_max': 'Infinity'})
+                self.assertEqual(respuesta.status_code, 200)
+
+    def test_historial_muestra_facetas(self):
+        self.client.force_login(self.usuario)
+        respuesta = self.client.get(reverse('historial_transacciones'), {'categoria': 'Comida'})
+        self.assertEqual(
+            [(f['valor'], f['n'], f['ingreso'], f['gasto']) for f in respuesta.context['facetas_categoria']],
+            [('Comida', 2, '80', '300')],
+        )
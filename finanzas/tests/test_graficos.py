@@ -0,0 +1,76 @@
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from finanzas.tests.datos import CACHE_TESTS, crear_transaccion
+from finanzas.utils.graficos import EPOCA, serie_balance
+
+
+@override_settings(CACHES=CACHE_TESTS)
+class SerieBalanceTests(TestCase):
+
+    def setUp(self):
+        self.usuario = User.objects.create_user('grafico')
+
+    def test_un_punto_por_dia(self):
+        crear_transaccion(self.usuario, 'ingreso', 1000, 'Salario', date(2025, 10, 1))
+        crear_transaccion(self.usuario, 'gasto', 300, fecha=date(2025, 10, 1))
+        crear_transaccion(self.usuario, 'gasto', 50, fecha=date(2025, 10, 3))
+        crear_transaccion(self.usuario, 'gasto', 25, fecha=date(2025, 10, 3))
+        primero = (date(2025, 10, 1) - EPOCA).days
+        self.assertEqual(serie_balance(self.usuario), {
+            'd': [primero, primero + 2], 'i': [1000.0, 0], 'g': [300.0, 75.0], 'w': 1,
+        })
+
+    def test_sin_datos(self):
+        self.assertEqual(serie_balance(self.usuario), {'d': [], 'i': [], 'g': [], 'w': 1})
+
+    def test_agrupa_si_hay_demasiados_dias(self):
+        inicio = date(2025, 1, 1)
+        for dia in range(30):
+            crear_transaccion(self.usuario, 'gasto', dia + 1, fecha=inicio + timedelta(days=dia))
+        serie = serie_balance(self.usuario, max_puntos=10)
+        self.assertEqual(serie['w'], 3)
+        self.assertEqual(len(serie['d']), 10)
+        self.assertEqual(serie['d'][1] - serie['d'][0], 3)
+        # Agrupar no cambia los totales
+        self.assertEqual(sum(serie['g']), sum(range(1, 31)))
+        self.assertEqual(serie['g'][0], 1 + 2 + 3)
+
+
+@override_settings(CACHES=CACHE_TESTS)
+class ApiGraficoTests(TestCase):
+
+    def setUp(self):
+        self.usuario = User.objects.create_user('grafico')
+        self.client.force_login(self.usuario)
+        crear_transaccion(self.usuario, 'gasto', 300)
+
+    def test_json_con_etag_y_304(self):
+        url = reverse('api_grafico_balance')
+        respuesta = self.client.get(url)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.json()['g'], [300.0])
+        etag = respuesta['ETag']
+
+        respuesta = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 304)
+        self.assertEqual(respuesta.content, b'')
+
+        # Otra cantidad de puntos es otro recurso
+        self.assertNotEqual(self.client.get(url, {'puntos': 50})['ETag'], etag)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            crear_transaccion(self.usuario, 'gasto', 20)
+        respuesta = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.json()['g'], [320.0])
+
+    def test_puntos_invalidos(self):
+        self.assertEqual(self.client.get(reverse('api_grafico_balance'), {'puntos': 'x'}).status_code, 200)
+
+    def test_requiere_login(self):
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse('api_grafico_balance')).status_code, 302)
@@ -0,0 +1,102 @@
+import io
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from finanzas.models import Transaccion
+from finanzas.tests.datos import CACHE_TESTS
+from finanzas.utils.importacion import (
+    ErrorImportacion, importar_transacciones, leer_csv, leer_ofx, lector_para, normalizar_fila,
+)
+from finanzas.utils.resumenes import obtener_resumen, verificar_resumen
+
+CSV_BANCO = (
+    'Fecha Operación;Concepto;Débito;Crédito;Comercio\n'
+    '24/10/2025;Compra súper;1.234,56;;Día\n'
+    '\n'
+    '25/10/2025;Sueldo;;500.000,00;\n'
+    'sin fecha;Roto;10;;\n'
+)
+
+OFX = """OFXHEADER:100
+<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>
+<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20251024120000<TRNAMT>-50.25<NAME>Netflix<MEMO>Suscripción
+</STMTTRN>
+<STMTTRN>
+<TRNTYPE>CREDIT</TRNTYPE>
+<DTPOSTED>20251026</DTPOSTED>
+<TRNAMT>1000.00</TRNAMT>
+<NAME>Transferencia</NAME>
+</STMTTRN>
+</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>
+"""
+
+
+@override_settings(CACHES=CACHE_TESTS)
+class ImportacionTests(TestCase):
+
+    def setUp(self):
+        self.usuario = User.objects.create_user('importa')
+
+    def test_leer_csv_con_debito_y_credito(self):
+        filas = list(leer_csv(io.StringIO(CSV_BANCO)))
+        self.assertEqual(len(filas), 3)
+        self.assertEqual(filas[0], {
+            'fecha': '24/10/2025', 'descripcion': 'Compra súper', 'debito': '1.234,56', 'credito': '', 'destino': 'Día',
+        })
+        self.assertEqual(normalizar_fila(filas[0])['cantidad'], Decimal('1234.56'))
+        self.assertEqual(normalizar_fila(filas[0])['tipo'], 'gasto')
+        self.assertEqual(normalizar_fila(filas[1])['tipo'], 'ingreso')
+
+    def test_csv_sin_columnas_necesarias(self):
+        with self.assertRaises(ErrorImportacion):
+            list(leer_csv(io.StringIO('nombre,apellido\nAna,Pérez\n')))
+
+    def test_leer_ofx(self):
+        filas = [normalizar_fila(f) for f in leer_ofx(io.StringIO(OFX))]
+        self.assertEqual([(f['fecha'], f['tipo'], f['cantidad'], f['descripcion'], f['destino']) for f in filas], [
+            (date(2025, 10, 24), 'gasto', Decimal('50.25'), 'Suscripción', 'Netflix'),
+            (date(2025, 10, 26), 'ingreso', Decimal('1000.00'), 'Transferencia', None),
+        ])
+
+    def test_normalizar_fila(self):
+        fila = normalizar_fila({'fecha': '2025-10-24', 'monto': '300', 'tipo': 'GASTO', 'categoria': 'comida'})
+        self.assertEqual((fila['tipo'], fila['categoria'], fila['descripcion']), ('gasto', 'Comida', 'Importado'))
+        self.assertEqual(normalizar_fila({'fecha': '2025-10-24', 'monto': '1', 'categoria': 'x'})['categoria'], 'Otros')
+        for mala in ({'fecha': '', 'monto': '1'}, {'fecha': '2025-10-24', 'monto': 'abc'},
+                     {'fecha': '2025-10-24', 'monto': '0'}, {'fecha': '2025-10-24', 'monto': '100000000'}):
+            with self.assertRaises(ErrorImportacion):
+                normalizar_fila(mala)
+
+    def test_importar_en_lotes_con_resumen(self):
+        filas = [{'fecha': '2025-10-24', 'monto': str(-i)} for i in range(1, 8)]
+        filas.insert(3, {'fecha': 'nunca', 'monto': '1'})
+        creadas, omitidas, errores = importar_transacciones(self.usuario, iter(filas), batch_size=3)
+        self.assertEqual((creadas, omitidas), (7, 1))
+        self.assertEqual(errores, [(4, "fecha inválida: 'nunca'")])
+        self.assertEqual(Transaccion.objects.filter(usuario=self.usuario).count(), 7)
+        self.assertEqual(obtener_resumen(self.usuario.id).gastos, Decimal(28))
+        self.assertEqual(verificar_resumen(self.usuario.id), [])
+
+    def test_lector_para(self):
+        self.assertIs(lector_para('extracto.OFX'), leer_ofx)
+        self.assertIs(lector_para('extracto.dat', 'csv'), leer_csv)
+        with self.assertRaises(ErrorImportacion):
+            lector_para('extracto.pdf')
+
+    def test_vista(self):
+        self.client.force_login(self.usuario)
+        archivo = SimpleUploadedFile('banco.csv', ('\ufeff' + CSV_BANCO).encode())
+        respuesta = self.client.post(reverse('importar_transacciones'), {'archivo': archivo}, follow=True)
+        self.assertRedirects(respuesta, reverse('historial_transacciones'))
+        mensajes = [str(m) for m in respuesta.context['messages']]
+        self.assertIn('Se importaron 2 transacciones.', mensajes)
+        self.assertTrue(any('fila 3' in m for m in mensajes))
+        self.assertEqual(
+            sorted(Transaccion.objects.filter(usuario=self.usuario).values_list('descripcion', flat=True)),
+            ['Compra súper', 'Sueldo'],
+        )
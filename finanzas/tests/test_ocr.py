@@ -0,0 +1,85 @@
+import multiprocessing
+import time
+from io import BytesIO
+
+from django.test import SimpleTestCase, override_settings
+from PIL import Image, ImageDraw
+
+from finanzas.utils import ocr
+from finanzas.utils.ocr import ErrorOCR, dhash, leer_imagen_bytes, preprocesar
+
+
+def imagen_ticket(ancho=800, alto=600, texto='TOTAL 1234', formato='PNG'):
+    img = Image.new('RGB', (ancho, alto), 'white')
+    dibujo = ImageDraw.Draw(img)
+    for fila in range(5):
+        dibujo.text((40, 40 + fila * 60), f'{texto} {fila}', fill='black')
+    contenido = BytesIO()
+    img.save(contenido, formato)
+    return img, contenido.getvalue()
+
+
+def distancia(hash_a, hash_b):
+    return bin(int(hash_a, 16) ^ int(hash_b, 16)).count('1')
+
+
+class PreprocesadoTests(SimpleTestCase):
+
+    def test_queda_binaria_y_reducida(self):
+        img, _ = imagen_ticket(3000, 1500)
+        resultado = preprocesar(img, max_lado=1000, max_angulo=0)
+        self.assertEqual(resultado.mode, 'L')
+        self.assertEqual(resultado.size, (1000, 500))
+        self.assertLessEqual(set(resultado.getdata()), {0, 255})
+
+    def test_endereza_texto_inclinado(self):
+        img, _ = imagen_ticket()
+        inclinada = img.rotate(3, expand=True, fillcolor='white')
+        sin_enderezar = preprocesar(inclinada, max_angulo=0)
+        enderezada = preprocesar(inclinada)
+        self.assertGreater(ocr._puntaje_renglones(enderezada), ocr._puntaje_renglones(sin_enderezar))
+
+    def test_dhash_de_fotos_parecidas(self):
+        img, png = imagen_ticket()
+        jpg = BytesIO()
+        img.save(jpg, 'JPEG', quality=60)
+        _, otro = imagen_ticket(texto='OTRO TICKET DISTINTO 99')
+        self.assertEqual(len(dhash(png)), 16)
+        self.assertLessEqual(distancia(dhash(png), dhash(jpg.getvalue())), 4)
+        self.assertGreater(distancia(dhash(png), dhash(otro)), 4)
+
+
+@override_settings(OCR_PROCESOS=0, TESSERACT_CMD='/no/existe/tesseract')
+class LecturaTests(SimpleTestCase):
+
+    def test_no_es_imagen(self):
+        with self.assertRaisesMessage(ErrorOCR, 'No es una imagen'):
+            leer_imagen_bytes(b'esto no es una foto')
+
+    def test_sin_tesseract(self):
+        _, png = imagen_ticket()
+        with self.assertRaises(ErrorOCR):
+            leer_imagen_bytes(png, preprocesar=False)
+
+
+@override_settings(OCR_PROCESOS=1)
+class PoolOCRTests(SimpleTestCase):
+
+    def test_descartar_pool_mata_el_proceso_colgado(self):
+        pool = ocr.obtener_pool()
+        self.addCleanup(pool.shutdown, wait=False, cancel_futures=True)
+        # Un trabajo que no termina solo
+        pool.submit(time.sleep, 60)
+        # Se espera a que el proceso arranque y se devuelve el PID para _descartar_pool
+        pid = pool.pids_ocr.get()
+        pool.pids_ocr.put(pid)
+
+        ocr._descartar_pool(pool, matar=True)
+        nuevo = ocr.obtener_pool()
+        self.assertIsNot(nuevo, pool)
+        ocr._descartar_pool(nuevo)
+
+        limite = time.monotonic() + 10
+        while pid in {p.pid for p in multiprocessing.active_children()}:
+            self.assertLess(time.monotonic(), limite, 'El proceso de OCR sigue vivo')
+            time.sleep(0.05)
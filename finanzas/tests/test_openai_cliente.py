@@ -0,0 +1,105 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from finanzas.utils import openai_cliente
+from finanzas.utils.openai_cliente import IASaturada, completar_chat, lugar_para_llamar, obtener_cliente
+
+
+class _OpenAIFalso(BaseHTTPRequestHandler):
+    """
+    /chat/completions de mentira que tarda un poco y cuenta cuántos pedidos
+    tiene en curso a la vez.
+    """
+
+    lock = threading.Lock()
+    en_curso = 0
+    maximo = 0
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        pedido = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        cls = type(self)
+        with cls.lock:
+            cls.en_curso += 1
+            cls.maximo = max(cls.maximo, cls.en_curso)
+        time.sleep(0.05)
+        with cls.lock:
+            cls.en_curso -= 1
+
+        cuerpo = json.dumps({
+            'id': 'x', 'object': 'chat.completion', 'created': 0, 'model': pedido['model'],
+            'choices': [{
+                'index': 0, 'finish_reason': 'stop',
+                'message': {'role': 'assistant', 'content': pedido['messages'][-1]['content']},
+            }],
+        }).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+
+class OpenAIClienteTests(SimpleTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.servidor = ThreadingHTTPServer(('127.0.0.1', 0), _OpenAIFalso)
+        threading.Thread(target=cls.servidor.serve_forever, daemon=True).start()
+        cls.ajustes = override_settings(
+            OPENAI_API_KEY='sk-test',
+            OPENAI_BASE_URL=f'http://127.0.0.1:{cls.servidor.server_port}/v1',
+            OPENAI_MODELO='modelo-test',
+            OPENAI_TIMEOUT=5,
+            OPENAI_MAX_RETRIES=0,
+            OPENAI_MAX_CONCURRENCIA=2,
+        )
+        cls.ajustes.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.ajustes.disable()
+        cls.servidor.shutdown()
+        cls.servidor.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        # Cliente y semáforo nuevos con los settings del test
+        for nombre in ('_cliente', '_semaforo'):
+            parche = mock.patch.object(openai_cliente, nombre, None)
+            parche.start()
+            self.addCleanup(parche.stop)
+        _OpenAIFalso.maximo = 0
+
+    def preguntar(self, texto):
+        respuesta = completar_chat(messages=[{'role': 'user', 'content': texto}])
+        return respuesta.choices[0].message.content
+
+    def test_un_cliente_por_proceso(self):
+        self.assertIs(obtener_cliente(), obtener_cliente())
+        self.assertEqual(self.preguntar('hola'), 'hola')
+
+    def test_tope_de_llamadas_simultaneas(self):
+        with ThreadPoolExecutor(max_workers=6) as pool:
+            respuestas = list(pool.map(self.preguntar, [str(i) for i in range(6)]))
+        self.assertEqual(respuestas, [str(i) for i in range(6)])
+        self.assertEqual(_OpenAIFalso.maximo, 2)
+
+    @override_settings(OPENAI_TIMEOUT=0.05)
+    def test_sin_lugar_lanza_ia_saturada(self):
+        with lugar_para_llamar(), lugar_para_llamar():
+            with self.assertRaises(IASaturada):
+                with lugar_para_llamar():
+                    pass
+        # Al salir se devolvieron los lugares
+        with lugar_para_llamar():
+            pass
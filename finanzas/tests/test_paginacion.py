@@ -0,0 +1,96 @@
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from finanzas.models import Transaccion
+from finanzas.tests.datos import CACHE_TESTS, crear_transaccion
+from finanzas.utils.paginacion import TAMANIO_PAGINA, codificar_cursor, decodificar_cursor, pagina_keyset
+
+
+@override_settings(CACHES=CACHE_TESTS)
+class PaginaKeysetTests(TestCase):
+
+    def setUp(self):
+        self.usuario = User.objects.create_user('pagina')
+        # Varias por día para probar los empates de fecha
+        for i in range(25):
+            crear_transaccion(self.usuario, cantidad=i + 1, fecha=date(2025, 10, 1) + timedelta(days=i // 4))
+        self.transacciones = Transaccion.objects.filter(usuario=self.usuario)
+        self.ordenadas = list(self.transacciones.order_by('-fecha', '-id').values_list('id', flat=True))
+
+    def recorrer(self, queryset, tamanio):
+        vistas, cursor, paginas = [], None, 0
+        while True:
+            filas, cursor = pagina_keyset(queryset, cursor, tamanio=tamanio)
+            vistas += [t['id'] if isinstance(t, dict) else t.id for t in filas]
+            paginas += 1
+            if cursor is None:
+                return vistas, paginas
+
+    def test_recorre_todo_sin_repetir(self):
+        vistas, paginas = self.recorrer(self.transacciones, 10)
+        self.assertEqual(paginas, 3)
+        self.assertEqual(vistas, self.ordenadas)
+
+    def test_con_values(self):
+        vistas, _ = self.recorrer(self.transacciones.values('id', 'fecha'), 7)
+        self.assertEqual(vistas, self.ordenadas)
+
+    def test_pagina_exacta_no_deja_cursor(self):
+        filas, cursor = pagina_keyset(self.transacciones, tamanio=25)
+        self.assertEqual(len(filas), 25)
+        self.assertIsNone(cursor)
+
+    def test_altas_entre_paginas_no_duplican(self):
+        filas, cursor = pagina_keyset(self.transacciones, tamanio=10)
+        # Una transacción nueva con la fecha más reciente queda antes del cursor
+        crear_transaccion(self.usuario, fecha=date(2025, 10, 7))
+        resto, _ = pagina_keyset(self.transacciones, cursor, tamanio=100)
+        self.assertEqual([t.id for t in filas + resto], self.ordenadas)
+
+    def test_cursor(self):
+        cursor = codificar_cursor(date(2025, 10, 24), 42)
+        self.assertEqual(decodificar_cursor(cursor), (date(2025, 10, 24), 42))
+        for invalido in ('no-es-un-cursor', '', '!!!'):
+            with self.subTest(cursor=invalido), self.assertRaises(ValueError):
+                decodificar_cursor(invalido)
+
+
+@override_settings(CACHES=CACHE_TESTS)
+class ApiTransaccionesTests(TestCase):
+
+    def setUp(self):
+        self.usuario = User.objects.create_user('api')
+        for i in range(TAMANIO_PAGINA + 5):
+            crear_transaccion(self.usuario, cantidad=i + 1, fecha=date(2025, 10, 1) + timedelta(days=i))
+        crear_transaccion(User.objects.create_user('otro'))
+        self.client.force_login(self.usuario)
+
+    def test_paginas_json(self):
+        url = reverse('api_transacciones')
+        primera = self.client.get(url).json()
+        self.assertEqual(len(primera['transacciones']), TAMANIO_PAGINA)
+        self.assertEqual(primera['transacciones'][0]['fecha'], '25-10-25')
+        segunda = self.client.get(url, {'cursor': primera['siguiente']}).json()
+        self.assertEqual(len(segunda['transacciones']), 5)
+        self.assertIsNone(segunda['siguiente'])
+
+    def test_conserva_los_filtros(self):
+        datos = self.client.get(reverse('api_transacciones'), {'monto_max': '3'}).json()
+        self.assertEqual([t['cantidad'] for t in datos['transacciones']], ['3,00', '2,00', '1,00'])
+
+    def test_cursor_invalido(self):
+        respuesta = self.client.get(reverse('api_transacciones'), {'cursor': 'basura'})
+        self.assertEqual(respuesta.status_code, 400)
+
+    def test_requiere_login(self):
+        self.client.logout()
+        respuesta = self.client.get(reverse('api_transacciones'))
+        self.assertEqual(respuesta.status_code, 302)
+
+    def test_historial_enlaza_la_pagina_siguiente(self):
+        respuesta = self.client.get(reverse('historial_transacciones'))
+        self.assertEqual(len(respuesta.context['transacciones']), TAMANIO_PAGINA)
+        self.assertIn('cursor=', respuesta.context['siguiente_query'])
@@ -0,0 +1,94 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from finanzas import views
+from finanzas.models import Perfil, Transaccion
+from finanzas.tests.datos import CACHE_TESTS
+from finanzas.utils.cache import obtener_cache
+from finanzas.utils.parser_local import categoria_de, extraer_transacciones_local
+
+
+class ParserLocalTests(SimpleTestCase):
+
+    def transacciones(self, texto):
+        data = extraer_transacciones_local([texto])
+        if data is None:
+            return None
+        return [(t['tipo'], Decimal(t['monto']), t['categoria']) for t in data['transacciones']]
+
+    def test_gasto_e_ingreso(self):
+        self.assertEqual(self.transacciones('gasté 20000 en comida'), [('gasto', Decimal('20000'), 'Comida')])
+        self.assertEqual(self.transacciones('cobré el sueldo 850.000'), [('ingreso', Decimal('850000'), 'Salario')])
+
+    def test_fecha_no_es_importe(self):
+        self.assertEqual(
+            self.transacciones('gasté 20000 en comida el 24-10-25'),
+            [('gasto', Decimal('20000'), 'Comida')],
+        )
+
+    def test_lista_con_verbo(self):
+        self.assertEqual(
+            self.transacciones('pagué luz 10000, gas 8000 y agua 5000'),
+            [('gasto', Decimal('10000'), 'Servicios'),
+             ('gasto', Decimal('8000'), 'Servicios'),
+             ('gasto', Decimal('5000'), 'Servicios')],
+        )
+
+    def test_lista_sin_verbo(self):
+        self.assertEqual(
+            self.transacciones('café 1500, taxi 4000, super 23000'),
+            [('gasto', Decimal('1500'), 'Comida'),
+             ('gasto', Decimal('4000'), 'Otros'),
+             ('gasto', Decimal('23000'), 'Comida')],
+        )
+
+    def test_casos_para_la_ia(self):
+        for texto in ['voy a gastar 20000 en ropa', 'cuánto gasté este mes?', 'hola',
+                      'sueldo 850000, taxi 4000', 'taxi 4000']:
+            with self.subTest(texto=texto):
+                self.assertIsNone(self.transacciones(texto))
+
+    def test_varios_mensajes_numerados(self):
+        data = extraer_transacciones_local(['gasté 1500 en café', 'cobré el sueldo 850.000'])
+        self.assertEqual([t['mensaje'] for t in data['transacciones']], [1, 2])
+        # Si uno no encaja, todo el grupo va a la IA
+        self.assertIsNone(extraer_transacciones_local(['gasté 1500 en café', 'hola']))
+
+    def test_categoria_ambigua(self):
+        self.assertEqual(categoria_de('sin palabras conocidas'), 'Otros')
+        self.assertIsNone(categoria_de('sueldo y super'))
+
+
+@override_settings(CACHES=CACHE_TESTS, BOT_PARSER_LOCAL=True, OPENAI_API_KEY='sk-test')
+class BotParserLocalTests(TestCase):
+
+    def setUp(self):
+        obtener_cache().clear()
+        self.usuario = User.objects.create_user('local')
+        Perfil.objects.create(user=self.usuario, telegram_chat_id='88')
+        self.enviados = []
+        parche = mock.patch.object(views, 'send_message', lambda chat_id, texto: self.enviados.append(texto))
+        parche.start()
+        self.addCleanup(parche.stop)
+
+    def test_frase_comun_sin_llamar_a_la_ia(self):
+        with mock.patch.object(views, 'extraer_transacciones_openai') as extraer:
+            views.procesar_textos(88, ['ayer gasté 20000 en comida'])
+        extraer.assert_not_called()
+        transaccion = Transaccion.objects.get(usuario=self.usuario)
+        self.assertEqual(
+            (transaccion.tipo, transaccion.cantidad, transaccion.categoria, transaccion.fecha),
+            ('gasto', Decimal(20000), 'Comida', date.today() - timedelta(days=1)),
+        )
+        self.assertEqual(self.enviados, ['✅ Transacción registrada correctamente.'])
+
+    def test_lo_demas_va_a_la_ia(self):
+        respuesta = {'es_transaccion': False, 'transacciones': []}
+        with mock.patch.object(views, 'extraer_transacciones_openai', return_value=(respuesta, None)) as extraer:
+            views.procesar_textos(88, ['voy a gastar 20000 en ropa'])
+        extraer.assert_called_once_with(['voy a gastar 20000 en ropa'], self.usuario.id)
+        self.assertFalse(Transaccion.objects.exists())
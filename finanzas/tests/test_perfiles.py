@@ -0,0 +1,60 @@
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+
+from finanzas.models import Perfil
+from finanzas.tests.datos import CACHE_TESTS
+from finanzas.utils.cache import obtener_cache
+from finanzas.utils.perfiles import perfil_por_chat
+
+
+@override_settings(CACHES=CACHE_TESTS)
+class PerfilPorChatTests(TestCase):
+
+    def setUp(self):
+        obtener_cache().clear()
+        self.usuario = User.objects.create_user('chat')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.perfil = Perfil.objects.create(user=self.usuario, telegram_chat_id='100')
+        obtener_cache().clear()
+
+    def test_una_consulta_y_despues_de_la_cache(self):
+        with self.assertNumQueries(1):
+            perfil = perfil_por_chat(100)
+        self.assertEqual((perfil.id, perfil.user_id, perfil.telegram_chat_id), (self.perfil.id, self.usuario.id, '100'))
+        with self.assertNumQueries(0):
+            self.assertEqual(perfil_por_chat('100').id, self.perfil.id)
+
+    def test_chat_no_vinculado_tambien_se_cachea(self):
+        with self.assertNumQueries(1):
+            self.assertIsNone(perfil_por_chat(999))
+        with self.assertNumQueries(0):
+            self.assertIsNone(perfil_por_chat(999))
+
+    def test_vincular_y_desvincular(self):
+        self.assertIsNone(perfil_por_chat(200))
+        otro = Perfil.objects.create(user=User.objects.create_user('otro'))
+        with self.captureOnCommitCallbacks(execute=True):
+            otro.telegram_chat_id = '200'
+            otro.save(update_fields=['telegram_chat_id'])
+        with self.assertNumQueries(0):
+            self.assertEqual(perfil_por_chat(200).id, otro.id)
+
+        # Cambiar de chat olvida el anterior
+        with self.captureOnCommitCallbacks(execute=True):
+            otro.telegram_chat_id = '300'
+            otro.save(update_fields=['telegram_chat_id'])
+        self.assertIsNone(perfil_por_chat(200))
+        self.assertEqual(perfil_por_chat(300).id, otro.id)
+
+    def test_borrar_perfil(self):
+        perfil_por_chat(100)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.perfil.delete()
+        self.assertIsNone(perfil_por_chat(100))
+
+    def test_se_puede_guardar_con_update_fields(self):
+        perfil = perfil_por_chat(100)
+        perfil.telegram_code = 'ABC123'
+        perfil.save(update_fields=['telegram_code'])
+        self.perfil.refresh_from_db()
+        self.assertEqual((self.perfil.telegram_code, self.perfil.telegram_chat_id), ('ABC123', '100'))
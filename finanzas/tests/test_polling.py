@@ -0,0 +1,126 @@
+import asyncio
+import os
+import signal
+import threading
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from finanzas.management.commands import run_telegram_polling as polling
+
+
+def update(update_id, chat_id, texto='hola', fecha=None):
+    return {
+        'update_id': update_id,
+        'message': {'chat': {'id': chat_id}, 'text': texto, 'date': update_id if fecha is None else fecha},
+    }
+
+
+class _ClienteFalso:
+    """
+    getUpdates de mentira: entrega `updates` hasta que el offset los confirma
+    y, si `colgar` está activo, se queda en el long polling hasta que se libere.
+    """
+
+    def __init__(self, updates, colgar=False):
+        self.updates = updates
+        self.colgar = colgar
+        self.offsets = []
+        self.en_polling = threading.Event()
+        self.liberar = threading.Event()
+
+    def llamar(self, metodo, **params):
+        if metodo != 'getUpdates':
+            return {'ok': True}
+        self.offsets.append(params['offset'])
+        offset = params['offset'] or 0
+        pendientes = [u for u in self.updates if u['update_id'] >= offset]
+        if not pendientes:
+            self.en_polling.set()
+            if self.colgar:
+                self.liberar.wait(30)
+            else:
+                time.sleep(0.01)
+        return {'result': pendientes}
+
+
+@override_settings(BOT_VENTANA_AGRUPACION=0)
+class PollingTests(SimpleTestCase):
+
+    def setUp(self):
+        self.procesados = []
+        self.guardados = []
+
+    def procesar(self, updates):
+        if updates[0]['update_id'] == 1:
+            # El primero tarda: los demás chats no lo esperan
+            time.sleep(0.2)
+        self.procesados.append([u['update_id'] for u in updates])
+
+    def correr(self, cliente):
+        """
+        Corre el comando hasta que el cliente queda en el long polling sin
+        updates nuevos y entonces le manda SIGTERM. Devuelve cuánto tardó en parar.
+        """
+        comando = polling.Command(stdout=mock.MagicMock())
+        opciones = {'concurrencia': 4, 'limite': 100, 'timeout': 30}
+
+        async def correr_y_detener():
+            tarea = asyncio.ensure_future(comando.correr(opciones))
+            await asyncio.to_thread(cliente.en_polling.wait, 5)
+            # Los handlers de señales ya están instalados (se ponen antes del primer getUpdates)
+            os.kill(os.getpid(), signal.SIGTERM)
+            inicio = time.monotonic()
+            await tarea
+            return inicio
+
+        with mock.patch.object(polling, 'obtener_cliente', return_value=cliente), \
+                mock.patch.object(polling, 'leer_offset', return_value=None), \
+                mock.patch.object(polling, 'guardar_offset', self.guardados.append), \
+                mock.patch.object(polling, 'procesar_en_thread', self.procesar):
+            try:
+                inicio = asyncio.run(correr_y_detener())
+            finally:
+                cliente.liberar.set()
+        return time.monotonic() - inicio
+
+    def test_procesa_y_confirma_el_offset(self):
+        cliente = _ClienteFalso([update(1, 10), update(2, 20), update(3, 30)])
+        self.correr(cliente)
+        self.assertCountEqual(self.procesados, [[1], [2], [3]])
+        self.assertEqual(self.procesados[-1], [1])
+        self.assertEqual(cliente.offsets[0], None)
+        self.assertEqual(self.guardados[-1], 4)
+        # El offset nunca pasa de un update que todavía está en proceso
+        self.assertEqual(cliente.offsets[-1], 4)
+        self.assertEqual(self.guardados, sorted(self.guardados))
+
+    def test_mismo_chat_en_orden(self):
+        cliente = _ClienteFalso([update(1, 10), update(2, 10, '/ayuda'), update(3, 20)])
+        self.correr(cliente)
+        orden_chat = [ids for ids in self.procesados if ids[0] in (1, 2)]
+        self.assertEqual(orden_chat, [[1], [2]])
+
+    def test_detener_no_espera_el_long_polling(self):
+        cliente = _ClienteFalso([update(1, 10)], colgar=True)
+        demora = self.correr(cliente)
+        # El getUpdates en curso sigue colgado 30 s: no se espera
+        self.assertLess(demora, 5)
+        self.assertEqual(self.procesados, [[1]])
+        self.assertEqual(self.guardados[-1], 2)
+
+
+class AgruparUpdatesTests(SimpleTestCase):
+
+    def test_agrupa_textos_seguidos_del_mismo_chat(self):
+        updates = [
+            update(1, 10, fecha=100), update(2, 10, fecha=102), update(3, 20, fecha=103),
+            update(4, 10, fecha=104), update(5, 10, '/ayuda', fecha=105), update(6, 10, fecha=200),
+        ]
+        grupos = polling.agrupar_updates(updates, ventana=5)
+        self.assertEqual([[u['update_id'] for u in g] for g in grupos], [[1, 2], [3], [4], [5], [6]])
+
+    def test_sin_ventana_no_agrupa(self):
+        grupos = polling.agrupar_updates([update(1, 10), update(2, 10)], ventana=0)
+        self.assertEqual(len(grupos), 2)
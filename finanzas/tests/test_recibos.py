@@ -0,0 +1,107 @@
+from datetime import date
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from finanzas import views
+from finanzas.models import Perfil, ResultadoOCR, Transaccion
+from finanzas.tests.datos import CACHE_TESTS
+from finanzas.utils.cache import obtener_cache
+from finanzas.utils.recibos import analizar_recibo
+
+
+def renglones(*textos, confianza=95.0):
+    return [[(palabra, confianza) for palabra in texto.split()] for texto in textos]
+
+
+class RecibosTests(SimpleTestCase):
+    hoy = date(2025, 10, 30)
+
+    def test_ticket_completo(self):
+        recibo = analizar_recibo(renglones(
+            'PANADERIA LA ESPIGA',
+            'CUIT 30-12345678-9',
+            'Fecha 24/10/2025',
+            'SUBTOTAL 4.000,00',
+            'TOTAL A PAGAR 4.500,00',
+        ), hoy=self.hoy)
+        self.assertEqual(Decimal(recibo['monto']), Decimal('4500'))
+        self.assertEqual(recibo['fecha'], '2025-10-24')
+        self.assertEqual(recibo['destino'], 'PANADERIA LA ESPIGA')
+        self.assertEqual(recibo['categoria'], 'Comida')
+        self.assertGreaterEqual(recibo['confidence'], 0.9)
+
+    def test_total_en_el_renglon_siguiente(self):
+        recibo = analizar_recibo(renglones('KIOSCO', 'TOTAL', '$ 1.250'), hoy=self.hoy)
+        self.assertEqual(Decimal(recibo['monto']), Decimal('1250'))
+
+    def test_sin_fecha_baja_la_confianza(self):
+        con_fecha = analizar_recibo(renglones('KIOSCO', '28/10/25', 'TOTAL 900'), hoy=self.hoy)
+        sin_fecha = analizar_recibo(renglones('KIOSCO', 'TOTAL 900'), hoy=self.hoy)
+        self.assertIsNone(sin_fecha['fecha'])
+        self.assertLess(sin_fecha['confidence'], con_fecha['confidence'])
+
+    def test_fecha_futura_se_ignora(self):
+        recibo = analizar_recibo(renglones('KIOSCO', '15/11/2025', 'TOTAL 900'), hoy=self.hoy)
+        self.assertIsNone(recibo['fecha'])
+
+    def test_lectura_dudosa_baja_la_confianza(self):
+        recibo = analizar_recibo(renglones('KIOSCO', '28/10/25', 'TOTAL 900', confianza=40.0), hoy=self.hoy)
+        self.assertLess(recibo['confidence'], 0.5)
+
+    def test_sin_total(self):
+        self.assertIsNone(analizar_recibo(renglones('KIOSCO', 'GRACIAS POR SU COMPRA'), hoy=self.hoy))
+
+
+@override_settings(CACHES=CACHE_TESTS, OCR_RECIBO_CONFIANZA=0.85)
+class ImagenReciboTests(TestCase):
+    mensaje = {
+        'chat': {'id': 99},
+        'photo': [{'file_id': 'f1', 'file_unique_id': 'u1', 'width': 1280, 'height': 960, 'file_size': 1000}],
+    }
+
+    def setUp(self):
+        obtener_cache().clear()
+        self.usuario = User.objects.create_user('recibo')
+        Perfil.objects.create(user=self.usuario, telegram_chat_id='99')
+        self.enviados = []
+        parche = mock.patch.object(views, 'send_message', lambda chat_id, texto: self.enviados.append(texto))
+        parche.start()
+        self.addCleanup(parche.stop)
+
+    def procesar(self, recibo):
+        resultado = ResultadoOCR.objects.create(
+            usuario=self.usuario, file_unique_id='u1', sha256='0' * 64, dhash='0' * 16,
+            texto='PANADERIA LA ESPIGA\nTOTAL 4.500', recibo=recibo,
+        )
+        with mock.patch.object(views, 'obtener_resultado', return_value=(resultado, False)), \
+                mock.patch.object(views, 'procesar_mensaje_usuario', return_value=[]) as ia:
+            views.procesar_imagen(self.mensaje)
+        resultado.refresh_from_db()
+        return resultado, ia
+
+    def test_ticket_legible_sin_ia(self):
+        recibo = analizar_recibo(renglones('PANADERIA LA ESPIGA', 'Fecha 24/10/2025', 'TOTAL A PAGAR 4.500,00'))
+        resultado, ia = self.procesar(recibo)
+        ia.assert_not_called()
+        transaccion = Transaccion.objects.get(usuario=self.usuario)
+        self.assertEqual(
+            (transaccion.cantidad, transaccion.fecha, transaccion.categoria, transaccion.destino),
+            (Decimal(4500), date(2025, 10, 24), 'Comida', 'PANADERIA LA ESPIGA'),
+        )
+        self.assertEqual(self.enviados, ['✅ Transacción registrada correctamente.'])
+        self.assertIsNotNone(resultado.registrado)
+
+    def test_ticket_dudoso_va_a_la_ia(self):
+        recibo = analizar_recibo(renglones('KIOSCO', '28/10/25', 'TOTAL 900', confianza=40.0))
+        resultado, ia = self.procesar(recibo)
+        ia.assert_called_once_with(99, 'PANADERIA LA ESPIGA\nTOTAL 4.500', mock.ANY)
+        self.assertFalse(Transaccion.objects.exists())
+        self.assertIsNone(resultado.registrado)
+
+    def test_sin_fecha_va_a_la_ia(self):
+        recibo = analizar_recibo(renglones('PANADERIA LA ESPIGA', 'TOTAL A PAGAR 4.500,00'))
+        _, ia = self.procesar(recibo)
+        ia.assert_called_once()
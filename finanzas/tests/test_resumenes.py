@@ -0,0 +1,81 @@
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+
+from finanzas.models import ResumenDiario, ResumenUsuario, Transaccion
+from finanzas.tests.datos import CACHE_TESTS, crear_transaccion
+from finanzas.utils.resumenes import obtener_resumen, recalcular_resumen, verificar_resumen
+
+
+@override_settings(CACHES=CACHE_TESTS)
+class ResumenUsuarioTests(TestCase):
+
+    def setUp(self):
+        self.usuario = User.objects.create_user('resumen', password='x')
+
+    def sin_resumen(self):
+        ResumenUsuario.objects.filter(usuario=self.usuario).delete()
+
+    def test_alta_edicion_y_baja(self):
+        ingreso = crear_transaccion(self.usuario, 'ingreso', 1000, 'Salario')
+        gasto = crear_transaccion(self.usuario, 'gasto', 300)
+        self.assertEqual(verificar_resumen(self.usuario.id), [])
+        resumen = obtener_resumen(self.usuario.id)
+        self.assertEqual(resumen.balance, Decimal('700'))
+        self.assertEqual(resumen.cantidad_transacciones, 2)
+
+        gasto.cantidad = Decimal('450')
+        gasto.save()
+        self.assertEqual(verificar_resumen(self.usuario.id), [])
+
+        ingreso.delete()
+        self.assertEqual(verificar_resumen(self.usuario.id), [])
+        self.assertEqual(obtener_resumen(self.usuario.id).balance, Decimal('-450'))
+
+    def test_edicion_de_tipo(self):
+        transaccion = crear_transaccion(self.usuario, 'gasto', 500)
+        transaccion.tipo = 'ingreso'
+        transaccion.save()
+        resumen = obtener_resumen(self.usuario.id)
+        self.assertEqual((resumen.ingresos, resumen.gastos), (Decimal('500'), Decimal('0')))
+
+    def test_alta_sin_resumen_lo_reconstruye(self):
+        crear_transaccion(self.usuario, 'ingreso', 100, 'Salario')
+        self.sin_resumen()
+        crear_transaccion(self.usuario, 'gasto', 40)
+        self.assertEqual(verificar_resumen(self.usuario.id), [])
+
+    def test_edicion_sin_resumen_no_cuenta_doble(self):
+        transaccion = crear_transaccion(self.usuario, 'gasto', 200)
+        self.sin_resumen()
+        transaccion.cantidad = Decimal('250')
+        transaccion.save()
+        self.assertEqual(verificar_resumen(self.usuario.id), [])
+        self.assertEqual(obtener_resumen(self.usuario.id).gastos, Decimal('250'))
+
+    def test_baja_sin_resumen(self):
+        crear_transaccion(self.usuario, 'ingreso', 100, 'Salario')
+        transaccion = crear_transaccion(self.usuario, 'gasto', 40)
+        self.sin_resumen()
+        transaccion.delete()
+        # La lectura lo reconstruye con lo que quedó
+        self.assertEqual(obtener_resumen(self.usuario.id).balance, Decimal('100'))
+
+    def test_recalcular_corrige_un_resumen_desviado(self):
+        crear_transaccion(self.usuario, 'gasto', 75)
+        ResumenUsuario.objects.filter(usuario=self.usuario).update(gastos=Decimal('1'))
+        self.assertIn('gastos', verificar_resumen(self.usuario.id))
+        recalcular_resumen(self.usuario.id)
+        self.assertEqual(verificar_resumen(self.usuario.id), [])
+
+    def test_borrar_usuario_con_transacciones(self):
+        for cantidad in (1, 3):
+            with self.subTest(transacciones=cantidad):
+                usuario = User.objects.create_user(f'borrado{cantidad}', password='x')
+                for _ in range(cantidad):
+                    crear_transaccion(usuario, 'gasto', 10)
+                usuario.delete()
+                self.assertFalse(Transaccion.objects.filter(usuario_id=usuario.id).exists())
+                self.assertFalse(ResumenUsuario.objects.filter(usuario_id=usuario.id).exists())
+                self.assertFalse(ResumenDiario.objects.filter(usuario_id=usuario.id).exists())
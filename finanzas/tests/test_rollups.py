@@ -0,0 +1,119 @@
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db.models import Count, Sum
+from django.test import TestCase, override_settings
+
+from finanzas.models import ResumenDiario, Transaccion
+from finanzas.tests.datos import CACHE_TESTS, crear_transaccion
+from finanzas.utils.resumenes import aplicar_lote, reconstruir_resumen_diario, resumen_mensual
+
+
+@override_settings(CACHES=CACHE_TESTS)
+class ResumenDiarioTests(TestCase):
+
+    def setUp(self):
+        self.usuario = User.objects.create_user('rollup')
+
+    def guardado(self):
+        return set(
+            ResumenDiario.objects.filter(usuario=self.usuario)
+            .values_list('dia', 'tipo', 'categoria', 'total', 'cantidad')
+        )
+
+    def esperado(self):
+        grupos = (
+            Transaccion.objects.filter(usuario=self.usuario)
+            .values('fecha', 'tipo', 'categoria')
+            .annotate(total=Sum('cantidad'), n=Count('id'))
+        )
+        return {
+            (g['fecha'], g['tipo'], g['categoria'], Decimal(g['total']).quantize(Decimal('0.01')), g['n'])
+            for g in grupos
+        }
+
+    def assertRollupsCorrectos(self):
+        self.assertEqual(self.guardado(), self.esperado())
+
+    def test_alta_y_baja(self):
+        primera = crear_transaccion(self.usuario, 'gasto', 100)
+        crear_transaccion(self.usuario, 'gasto', 50)
+        crear_transaccion(self.usuario, 'ingreso', 900, 'Salario')
+        self.assertRollupsCorrectos()
+        self.assertEqual(ResumenDiario.objects.filter(usuario=self.usuario).count(), 2)
+
+        primera.delete()
+        self.assertRollupsCorrectos()
+
+    def test_la_fila_vacia_se_borra(self):
+        crear_transaccion(self.usuario).delete()
+        self.assertFalse(ResumenDiario.objects.filter(usuario=self.usuario).exists())
+
+    def test_edicion_de_categoria_y_fecha(self):
+        transaccion = crear_transaccion(self.usuario, 'gasto', 500)
+        transaccion.tipo = 'ingreso'
+        transaccion.categoria = 'Ventas'
+        transaccion.fecha = date(2025, 10, 20)
+        transaccion.save()
+        self.assertRollupsCorrectos()
+        self.assertEqual(len(self.guardado()), 1)
+
+    def test_edicion_sin_fila_no_cuenta_doble(self):
+        transaccion = crear_transaccion(self.usuario, 'gasto', 200)
+        ResumenDiario.objects.filter(usuario=self.usuario).delete()
+        transaccion.cantidad = Decimal('250')
+        transaccion.save()
+        self.assertRollupsCorrectos()
+
+    def test_baja_sin_fila_reconstruye_el_dia(self):
+        crear_transaccion(self.usuario, 'gasto', 10)
+        transaccion = crear_transaccion(self.usuario, 'gasto', 40)
+        ResumenDiario.objects.filter(usuario=self.usuario).delete()
+        transaccion.delete()
+        self.assertRollupsCorrectos()
+
+    def test_lote(self):
+        crear_transaccion(self.usuario, 'gasto', 5)
+        lote = Transaccion.objects.bulk_create([
+            Transaccion(usuario=self.usuario, tipo='gasto', cantidad=Decimal('1.10'),
+                        categoria='Comida', fecha=date(2025, 10, 24), descripcion='a'),
+            Transaccion(usuario=self.usuario, tipo='gasto', cantidad=Decimal('2.20'),
+                        categoria='Comida', fecha=date(2025, 10, 25), descripcion='b'),
+        ])
+        aplicar_lote(self.usuario.id, lote)
+        self.assertRollupsCorrectos()
+
+    def test_reconstruir(self):
+        for dia in range(1, 6):
+            crear_transaccion(self.usuario, 'gasto', dia, fecha=date(2025, 10, dia))
+        ResumenDiario.objects.filter(usuario=self.usuario).update(total=0)
+        self.assertEqual(reconstruir_resumen_diario(self.usuario.id, batch_size=2), 5)
+        self.assertRollupsCorrectos()
+
+    def test_comando_backfill(self):
+        crear_transaccion(self.usuario, 'gasto', 30)
+        ResumenDiario.objects.all().delete()
+        call_command('backfill_resumen_diario', stdout=StringIO())
+        self.assertRollupsCorrectos()
+
+    def test_resumen_mensual(self):
+        crear_transaccion(self.usuario, 'gasto', 100, 'Comida', date(2025, 9, 30))
+        crear_transaccion(self.usuario, 'gasto', 20, 'Servicios', date(2025, 10, 1))
+        crear_transaccion(self.usuario, 'gasto', 30, 'Comida', date(2025, 10, 15))
+        crear_transaccion(self.usuario, 'ingreso', 500, 'Salario', date(2025, 10, 2))
+
+        meses = [(f['mes'], f['tipo'], f['total'], f['cantidad']) for f in resumen_mensual(self.usuario.id)]
+        self.assertEqual(meses, [
+            (date(2025, 9, 1), 'gasto', Decimal('100'), 1),
+            (date(2025, 10, 1), 'gasto', Decimal('50'), 2),
+            (date(2025, 10, 1), 'ingreso', Decimal('500'), 1),
+        ])
+
+        octubre = resumen_mensual(self.usuario.id, desde=date(2025, 10, 1), por_categoria=True)
+        self.assertEqual(
+            [(f['categoria'], f['total']) for f in octubre if f['tipo'] == 'gasto'],
+            [('Comida', Decimal('30')), ('Servicios', Decimal('20'))],
+        )
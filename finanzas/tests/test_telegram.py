@@ -0,0 +1,162 @@
+import json
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from finanzas.utils import telegram
+from finanzas.utils.telegram import (
+    MAX_LARGO_MENSAJE, ClienteTelegram, ErrorTelegram, LimitadorEnvios, agrupar_envios, agrupar_mensajes,
+)
+
+
+class _TelegramFalso(BaseHTTPRequestHandler):
+    """
+    Bot API de mentira: responde según `modo` y anota cada pedido.
+    """
+
+    modo = 'ok'
+    pedidos = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        cuerpo = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        self.pedidos.append((self.path.rsplit('/', 1)[-1], cuerpo))
+        if self.modo == 'lento':
+            time.sleep(0.5)
+        if self.modo == 'ok':
+            self.responder(200, {'ok': True, 'result': {}})
+        elif self.modo == 429:
+            self.responder(429, {'ok': False, 'parameters': {'retry_after': 0}})
+        else:
+            self.responder(500, {'ok': False})
+
+    def responder(self, codigo, data):
+        cuerpo = json.dumps(data).encode()
+        try:
+            self.send_response(codigo)
+            self.send_header('Content-Length', str(len(cuerpo)))
+            self.end_headers()
+            self.wfile.write(cuerpo)
+        except OSError:
+            # El cliente ya cortó por timeout
+            pass
+
+
+def url_puerto_cerrado():
+    """
+    URL a un puerto local donde no escucha nadie.
+    """
+    with socket.socket() as libre:
+        libre.bind(('127.0.0.1', 0))
+        return f'http://127.0.0.1:{libre.getsockname()[1]}'
+
+
+class ClienteTelegramTests(SimpleTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.servidor = ThreadingHTTPServer(('127.0.0.1', 0), _TelegramFalso)
+        threading.Thread(target=cls.servidor.serve_forever, daemon=True).start()
+        cls.url = f'http://127.0.0.1:{cls.servidor.server_port}'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.servidor.shutdown()
+        cls.servidor.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        _TelegramFalso.modo = 'ok'
+        _TelegramFalso.pedidos = []
+        self.cliente = self.crear_cliente(self.url)
+
+    def crear_cliente(self, url):
+        # Dos reintentos sin esperas entre uno y otro
+        return ClienteTelegram('TOKEN', url, (1, 0.2), 2, 0, LimitadorEnvios(1000, 1000, 1000))
+
+    def metodos_pedidos(self):
+        return [metodo for metodo, _ in _TelegramFalso.pedidos]
+
+    def test_ok(self):
+        self.assertTrue(self.cliente.llamar('getMe')['ok'])
+        self.assertEqual(self.metodos_pedidos(), ['getMe'])
+
+    def test_error_5xx_solo_reintenta_lo_idempotente(self):
+        _TelegramFalso.modo = 500
+        with self.assertRaises(ErrorTelegram):
+            self.cliente.llamar('sendMessage', chat_id=1, text='hola')
+        self.assertEqual(self.metodos_pedidos(), ['sendMessage'])
+
+        _TelegramFalso.pedidos = []
+        with self.assertRaises(ErrorTelegram):
+            self.cliente.obtener_archivo('abc')
+        self.assertEqual(self.metodos_pedidos(), ['getFile'] * 3)
+
+    def test_429_se_reintenta_siempre(self):
+        _TelegramFalso.modo = 429
+        with self.assertRaises(ErrorTelegram):
+            self.cliente.llamar('sendMessage', chat_id=1, text='hola')
+        self.assertEqual(self.metodos_pedidos(), ['sendMessage'] * 3)
+
+    def test_timeout_de_lectura_no_reenvia_mensajes(self):
+        _TelegramFalso.modo = 'lento'
+        with self.assertRaises(ErrorTelegram):
+            self.cliente.llamar('sendMessage', chat_id=1, text='hola')
+        with self.assertRaises(ErrorTelegram):
+            self.cliente.obtener_archivo('abc')
+        self.assertEqual(self.metodos_pedidos(), ['sendMessage'] + ['getFile'] * 3)
+
+    def test_sin_conectar_se_reintenta(self):
+        # Un puerto cerrado: la conexión se rechaza y el mensaje nunca salió
+        cliente = self.crear_cliente(url_puerto_cerrado())
+        with mock.patch.object(cliente.session, 'request', wraps=cliente.session.request) as request:
+            with self.assertRaises(ErrorTelegram):
+                cliente.llamar('sendMessage', chat_id=1, text='hola')
+        self.assertEqual(request.call_count, 3)
+
+    def test_agrupar_envios_manda_un_mensaje_por_chat(self):
+        with mock.patch.object(telegram, 'obtener_cliente', return_value=self.cliente):
+            with agrupar_envios():
+                self.cliente.enviar_mensaje(1, 'uno')
+                self.cliente.enviar_mensaje(1, 'dos')
+                self.cliente.enviar_mensaje(2, 'otro chat')
+                self.assertEqual(_TelegramFalso.pedidos, [])
+        self.assertEqual(_TelegramFalso.pedidos, [
+            ('sendMessage', {'chat_id': 1, 'text': 'uno\n\ndos'}),
+            ('sendMessage', {'chat_id': 2, 'text': 'otro chat'}),
+        ])
+
+    def test_agrupar_envios_descarta_si_falla(self):
+        with mock.patch.object(telegram, 'obtener_cliente', return_value=self.cliente):
+            with self.assertRaises(ValueError), agrupar_envios():
+                self.cliente.enviar_mensaje(1, 'a medias')
+                raise ValueError
+            # El buffer no queda tomado: el próximo envío sale directo
+            self.cliente.enviar_mensaje(1, 'después')
+        self.assertEqual(_TelegramFalso.pedidos, [('sendMessage', {'chat_id': 1, 'text': 'después'})])
+
+    def test_agrupar_mensajes_respeta_el_largo(self):
+        largo = 'x' * (MAX_LARGO_MENSAJE - 3)
+        self.assertEqual(
+            agrupar_mensajes([(1, largo), (1, 'sigue'), (1, 'más'), (2, 'a'), (1, 'b')]),
+            [(1, largo), (1, 'sigue\n\nmás'), (2, 'a'), (1, 'b')],
+        )
+
+
+class LimitadorEnviosTests(SimpleTestCase):
+
+    def test_espera_por_chat(self):
+        limitador = LimitadorEnvios(tasa_global=1000, tasa_chat=1)
+        with mock.patch.object(telegram.time, 'sleep'):
+            self.assertLess(limitador.esperar('1'), 0.01)
+            self.assertLess(limitador.esperar('2'), 0.01)
+            # Segundo mensaje al mismo chat: espera ~1 s
+            self.assertGreater(limitador.esperar('1'), 0.9)
+
@@ -0,0 +1,75 @@
+import json
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from finanzas.models import TrabajoBot, UpdateProcesado
+from finanzas.tests.datos import CACHE_TESTS
+from finanzas.utils.cola_bot import limpiar_updates, marcar_update
+
+
+def update_de(chat_id, update_id, texto='hola'):
+    return {'update_id': update_id, 'message': {'chat': {'id': chat_id}, 'text': texto}}
+
+
+class MarcarUpdateTests(TestCase):
+
+    def test_una_sola_vez(self):
+        self.assertTrue(marcar_update(7))
+        self.assertFalse(marcar_update(7))
+        self.assertTrue(marcar_update(8))
+        # Sin update_id no se puede deduplicar: se procesa
+        self.assertTrue(marcar_update(None))
+        self.assertTrue(marcar_update(None))
+
+    def test_repetido_no_rompe_la_transaccion(self):
+        marcar_update(7)
+        # El IntegrityError queda en un savepoint: se puede seguir usando la conexión
+        self.assertFalse(marcar_update(7))
+        self.assertEqual(UpdateProcesado.objects.count(), 1)
+
+    @override_settings(BOT_UPDATES_TTL_HORAS=48)
+    def test_limpiar_updates(self):
+        marcar_update(1)
+        marcar_update(2)
+        UpdateProcesado.objects.filter(update_id=1).update(recibido=timezone.now() - timedelta(hours=49))
+        self.assertEqual(limpiar_updates(), 1)
+        self.assertEqual(list(UpdateProcesado.objects.values_list('update_id', flat=True)), [2])
+
+
+@override_settings(CACHES=CACHE_TESTS)
+class WebhookIdempotenteTests(TestCase):
+
+    def enviar(self, update):
+        return self.client.post(reverse('webhook'), json.dumps(update), content_type='application/json')
+
+    @override_settings(TELEGRAM_WEBHOOK_ASINCRONO=True)
+    def test_reenvio_no_se_encola_dos_veces(self):
+        for _ in range(3):
+            self.assertEqual(self.enviar(update_de(5, 10)).json(), {'status': 'ok'})
+        self.enviar(update_de(5, 11))
+        self.assertEqual(
+            sorted(u['update_id'] for u in TrabajoBot.objects.values_list('update', flat=True)), [10, 11],
+        )
+
+    @override_settings(TELEGRAM_WEBHOOK_ASINCRONO=True)
+    def test_si_falla_el_encolado_no_queda_marcado(self):
+        with mock.patch('finanzas.views.encolar_update', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError), self.assertLogs('django.request', 'ERROR'):
+                self.enviar(update_de(5, 10))
+        # Telegram lo reenvía y esta vez entra
+        self.enviar(update_de(5, 10))
+        self.assertEqual(TrabajoBot.objects.count(), 1)
+
+    @override_settings(TELEGRAM_WEBHOOK_ASINCRONO=False)
+    def test_sin_cola_procesa_una_vez(self):
+        with mock.patch('finanzas.views.procesar_update') as procesar:
+            self.enviar(update_de(5, 10))
+            self.enviar(update_de(5, 10))
+        procesar.assert_called_once_with(update_de(5, 10))
+
+    def test_otro_metodo(self):
+        self.assertEqual(self.client.get(reverse('webhook')).json(), {'status': 'invalid method'})
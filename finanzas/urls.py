@@ -5,9 +5,13 @@ urlpatterns = [
     path('', views.login_view, name='login'),
     path('register/', views.register_view, name='register'),
     path('dashboard/', views.dashboard, name='dashboard'),
+    path('api/grafico-balance/', views.api_grafico_balance, name='api_grafico_balance'),
     path('logout/', views.logout_view, name='logout'),  # Changed to use custom view
     path('nuevo-registro/', views.nuevo_registro, name='nuevo_registro'),
     path('historial-transacciones/', views.historial_transacciones, name='historial_transacciones'),
+    path('api/transacciones/', views.api_transacciones, name='api_transacciones'),
+    path('importar/', views.importar, name='importar_transacciones'),
+    path('exportar/', views.exportar, name='exportar_transacciones'),
     path('webhook/telegram/', views.webhook, name='webhook'),
     path('telegramBot/', views.vincular_telegram, name='vincularConBot'),
     path('desvincular-telegram/', views.desvincular_telegram, name='desvincular_telegram'),
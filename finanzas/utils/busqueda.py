@@ -0,0 +1,133 @@
+import re
+
+from django.db import connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+# SQLite: tabla FTS5 "external content" sobre finanzas_transaccion,
+# sincronizada por triggers (cubre ORM, bulk_create y SQL directo).
+SQLITE_TABLA_FTS = "finanzas_transaccion_fts"
+
+SQLITE_CREAR = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {SQLITE_TABLA_FTS} USING fts5(
+        descripcion, destino,
+        content='finanzas_transaccion', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {SQLITE_TABLA_FTS}_ai AFTER INSERT ON finanzas_transaccion BEGIN
+        INSERT INTO {SQLITE_TABLA_FTS}(rowid, descripcion, destino)
+        VALUES (new.id, new.descripcion, new.destino);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {SQLITE_TABLA_FTS}_ad AFTER DELETE ON finanzas_transaccion BEGIN
+        INSERT INTO {SQLITE_TABLA_FTS}({SQLITE_TABLA_FTS}, rowid, descripcion, destino)
+        VALUES ('delete', old.id, old.descripcion, old.destino);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {SQLITE_TABLA_FTS}_au AFTER UPDATE ON finanzas_transaccion BEGIN
+        INSERT INTO {SQLITE_TABLA_FTS}({SQLITE_TABLA_FTS}, rowid, descripcion, destino)
+        VALUES ('delete', old.id, old.descripcion, old.destino);
+        INSERT INTO {SQLITE_TABLA_FTS}(rowid, descripcion, destino)
+        VALUES (new.id, new.descripcion, new.destino);
+    END
+    """,
+]
+
+SQLITE_BORRAR = [
+    f"DROP TRIGGER IF EXISTS {SQLITE_TABLA_FTS}_ai",
+    f"DROP TRIGGER IF EXISTS {SQLITE_TABLA_FTS}_ad",
+    f"DROP TRIGGER IF EXISTS {SQLITE_TABLA_FTS}_au",
+    f"DROP TABLE IF EXISTS {SQLITE_TABLA_FTS}",
+]
+
+# PostgreSQL: índice GIN de expresión. La consulta tiene que usar
+# exactamente la misma expresión para que el planificador lo elija.
+POSTGRES_VECTOR = (
+    "to_tsvector('spanish', coalesce(descripcion, '') || ' ' || coalesce(destino, ''))"
+)
+POSTGRES_CREAR = [
+    "CREATE INDEX IF NOT EXISTS transaccion_busqueda_gin "
+    f"ON finanzas_transaccion USING GIN ({POSTGRES_VECTOR})",
+]
+POSTGRES_BORRAR = ["DROP INDEX IF EXISTS transaccion_busqueda_gin"]
+
+
+def _ejecutar(connection, sentencias):
+    with connection.cursor() as cursor:
+        for sql in sentencias:
+            cursor.execute(sql)
+
+
+def _triggers_sqlite(connection):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT count(*) FROM sqlite_master WHERE type = 'trigger' AND name LIKE %s",
+            [f"{SQLITE_TABLA_FTS}_%"],
+        )
+        return cursor.fetchone()[0]
+
+
+def crear_indice_busqueda(connection):
+    """
+    Crea el índice de texto completo según el motor (idempotente).
+    """
+    if connection.vendor == "sqlite":
+        existian = _triggers_sqlite(connection) == 3
+        _ejecutar(connection, SQLITE_CREAR)
+        if not existian:
+            # Tabla nueva o triggers perdidos (SQLite reconstruye la tabla
+            # en algunos ALTER): reindexar desde finanzas_transaccion
+            _ejecutar(connection, [
+                f"INSERT INTO {SQLITE_TABLA_FTS}({SQLITE_TABLA_FTS}) VALUES ('rebuild')"
+            ])
+    elif connection.vendor == "postgresql":
+        _ejecutar(connection, POSTGRES_CREAR)
+
+
+def borrar_indice_busqueda(connection):
+    if connection.vendor == "sqlite":
+        _ejecutar(connection, SQLITE_BORRAR)
+    elif connection.vendor == "postgresql":
+        _ejecutar(connection, POSTGRES_BORRAR)
+
+
+def _terminos(texto):
+    return re.findall(r"\w+", texto or "")
+
+
+def filtrar_por_texto(queryset, texto):
+    """
+    Filtra por descripcion/destino usando el índice de texto completo.
+    Cada palabra se busca como prefijo ("netfl" encuentra "Netflix").
+    """
+    terminos = _terminos(texto)
+    if not terminos:
+        return queryset
+
+    vendor = connections[queryset.db].vendor
+
+    if vendor == "sqlite":
+        consulta = " ".join(f'"{t}"*' for t in terminos)
+        return queryset.filter(id__in=RawSQL(
+            f"SELECT rowid FROM {SQLITE_TABLA_FTS} WHERE {SQLITE_TABLA_FTS} MATCH %s",
+            [consulta],
+        ))
+
+    if vendor == "postgresql":
+        consulta = " & ".join(f"{t}:*" for t in terminos)
+        return queryset.extra(
+            where=[f"{POSTGRES_VECTOR} @@ to_tsquery('spanish', %s)"],
+            params=[consulta],
+        )
+
+    # Otros motores: sin índice, LIKE por cada término
+    for termino in terminos:
+        queryset = queryset.filter(
+            Q(descripcion__icontains=termino) | Q(destino__icontains=termino)
+        )
+    return queryset
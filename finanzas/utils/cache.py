@@ -0,0 +1,144 @@
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.cache.backends.memcached import BaseMemcachedCache
+from django.core.cache.backends.redis import RedisCache
+
+VERSION_NOTIFICACIONES = "finanzas:version:notificaciones"
+
+# Backends con add e incr atómicos: Redis y Memcached entre procesos y
+# LocMemCache dentro del proceso. FileBasedCache y DatabaseCache leen y
+# escriben por separado (dos incr a la vez pueden dar el mismo valor).
+BACKENDS_ATOMICOS = (RedisCache, BaseMemcachedCache, LocMemCache)
+
+
+def obtener_cache():
+    return caches[getattr(settings, "FINANZAS_CACHE_ALIAS", "default")]
+
+
+def cache_atomica():
+    """
+    True si se puede contar con add/incr atómicos en la cache configurada.
+    """
+    return isinstance(obtener_cache(), BACKENDS_ATOMICOS)
+
+
+def _clave_version(usuario_id):
+    return f"finanzas:version:usuario:{usuario_id}"
+
+
+def _nueva_version():
+    """
+    Valor que no se repite entre procesos: la hora en ns más un sufijo al azar.
+    """
+    return f"{time.time_ns():x}{secrets.token_hex(3)}"
+
+
+def _version(clave):
+    cache = obtener_cache()
+    version = cache.get(clave)
+    if version is None:
+        # Arranca en un valor nuevo: si la clave se desalojó, no vuelve a
+        # una versión vieja cuyos datos puedan seguir en la cache
+        cache.add(clave, _nueva_version(), None)
+        version = cache.get(clave)
+    return version
+
+
+def _incrementar(clave):
+    """
+    Cambia la versión por una que nunca se usó. Un set alcanza en cualquier
+    backend: con un incr no atómico (FileBasedCache) dos cambios a la vez
+    podían dejar un valor que alguien ya había leído para cachear datos viejos.
+    """
+    obtener_cache().set(clave, _nueva_version(), None)
+
+
+def version_usuario(usuario_id):
+    """
+    Versión de los datos del usuario; cambia con cada alta/baja de transacciones.
+    """
+    return _version(_clave_version(usuario_id))
+
+
+def invalidar_usuario(usuario_id):
+    _incrementar(_clave_version(usuario_id))
+
+
+def version_notificaciones():
+    return _version(VERSION_NOTIFICACIONES)
+
+
+def invalidar_notificaciones():
+    _incrementar(VERSION_NOTIFICACIONES)
+
+
+def cacheado(nombre, version, calcular, timeout=None):
+    """
+    Devuelve el valor cacheado para (nombre, version) o lo calcula y lo guarda.
+    Al cambiar la versión las entradas viejas quedan huérfanas y expiran solas.
+    """
+    cache = obtener_cache()
+    clave = f"finanzas:{nombre}:v{version}"
+    valor = cache.get(clave)
+    if valor is None:
+        valor = calcular()
+        if timeout is None:
+            timeout = getattr(settings, "DASHBOARD_CACHE_TIMEOUT", 300)
+        cache.set(clave, valor, timeout)
+    return valor
+
+
+class CacheLRU:
+    """
+    Cache en memoria del proceso, con vencimiento (ttl en segundos) y
+    tamaño máximo: al llenarse se descarta lo usado hace más tiempo.
+    Cuenta aciertos y fallos. Es thread-safe.
+    """
+
+    def __init__(self, tamanio, ttl):
+        self.tamanio = tamanio
+        self.ttl = ttl
+        self.datos = OrderedDict()
+        self.lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def get(self, clave):
+        with self.lock:
+            entrada = self.datos.get(clave)
+            if entrada is None or entrada[0] < time.monotonic():
+                if entrada is not None:
+                    del self.datos[clave]
+                self.fallos += 1
+                return None
+            self.datos.move_to_end(clave)
+            self.aciertos += 1
+            return entrada[1]
+
+    def set(self, clave, valor):
+        with self.lock:
+            self.datos[clave] = (time.monotonic() + self.ttl, valor)
+            self.datos.move_to_end(clave)
+            while len(self.datos) > self.tamanio:
+                self.datos.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.datos.clear()
+            self.aciertos = self.fallos = 0
+
+    def estadisticas(self):
+        with self.lock:
+            total = self.aciertos + self.fallos
+            return {
+                "entradas": len(self.datos),
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "ratio": self.aciertos / total if total else 0,
+            }
@@ -0,0 +1,90 @@
+import copy
+import re
+from decimal import Decimal
+
+from django.conf import settings
+
+from finanzas.utils.cache import CacheLRU
+from finanzas.utils.fechas import resolver_fecha
+from finanzas.utils.formatos import montos_en_texto, normalizar_texto
+from finanzas.utils.parser_local import FECHAS
+
+# Resultados de la IA por texto normalizado. Importes y fechas se reemplazan
+# por marcadores: "pagué netflix 4299" y "Pagué Netflix 4500" comparten la
+# entrada y el importe se vuelve a tomar del mensaje nuevo.
+
+_cache = None
+
+
+def obtener_cache_ia():
+    global _cache
+    if _cache is None:
+        _cache = CacheLRU(settings.BOT_CACHE_IA_TAMANIO, settings.BOT_CACHE_IA_TTL)
+    return _cache
+
+
+def plantilla(texto):
+    """
+    Devuelve (texto con marcadores, importes en orden de aparición).
+    Ej: "Gasté 2.000 en café el 24/10" -> ("gaste <m0> en cafe el <f>", [2000])
+    """
+    normal = FECHAS.sub("<f>", normalizar_texto(texto))
+    partes, montos, ultimo = [], [], 0
+    for i, (monto, inicio, fin) in enumerate(montos_en_texto(normal)):
+        partes.append(normal[ultimo:inicio])
+        partes.append(f" <m{i}> ")
+        montos.append(monto)
+        ultimo = fin
+    partes.append(normal[ultimo:])
+    return re.sub(r"\s+", " ", "".join(partes)).strip(), montos
+
+
+def _clave(plantillas):
+    return "\n".join(f"[{i}] {p}" for i, p in enumerate(plantillas, start=1))
+
+
+def buscar_extraccion(textos):
+    """
+    Resultado cacheado para estos mensajes con los importes actuales, o None.
+    """
+    plantillas, montos = zip(*(plantilla(t) for t in textos))
+    guardado = obtener_cache_ia().get(_clave(plantillas))
+    if guardado is None:
+        return None
+
+    data = copy.deepcopy(guardado)
+    for item in data["transacciones"]:
+        mensaje, indice = item.pop("_monto")
+        try:
+            item["monto"] = str(montos[mensaje][indice])
+        except IndexError:
+            return None
+    return data
+
+
+def guardar_extraccion(textos, data):
+    """
+    Guarda el resultado de la IA si cada importe devuelto aparece tal cual en
+    su mensaje (si la IA sumó o interpretó algo, no se puede reutilizar).
+    """
+    plantillas, montos = zip(*(plantilla(t) for t in textos))
+
+    guardado = {"es_transaccion": data["es_transaccion"], "transacciones": []}
+    for item in data["transacciones"]:
+        try:
+            mensaje = max(int(item.get("mensaje") or 1) - 1, 0)
+            monto = Decimal(str(item.get("monto")))
+            indice = montos[mensaje].index(monto)
+        except Exception:
+            return False
+        if item.get("fecha") and str(resolver_fecha(textos[mensaje])) != item["fecha"]:
+            return False  # fecha que la IA dedujo y el texto no dice explícitamente
+        item = dict(item)
+        item.pop("monto")
+        # La fecha se vuelve a resolver sobre el texto nuevo y la
+        # descripción puede tener el importe viejo
+        item.update(fecha=None, descripcion=None, _monto=(mensaje, indice))
+        guardado["transacciones"].append(item)
+
+    obtener_cache_ia().set(_clave(plantillas), guardado)
+    return True
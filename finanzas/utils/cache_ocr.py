@@ -0,0 +1,140 @@
+import hashlib
+
+from django.conf import settings
+from django.utils import timezone
+
+from finanzas.models import ResultadoOCR
+from finanzas.utils.ocr import dhash, es_pdf, leer_imagen_bytes
+from finanzas.utils.recibos import analizar_recibo
+
+# Los resultados se buscan primero por file_unique_id (sin descargar la
+# foto), después por sha256 de los bytes (la misma imagen subida de nuevo)
+# y por último, para marcar repetidos, por dHash (otra foto del mismo ticket).
+
+PODAR_CADA = 100
+
+
+def distancia_dhash(a, b):
+    return bin(int(a, 16) ^ int(b, 16)).count("1")
+
+
+def _buscar(usuario_id, **filtro):
+    """
+    (resultado del usuario, resultado de otro usuario) con ese filtro.
+    """
+    ajeno = None
+    for resultado in ResultadoOCR.objects.filter(**filtro).order_by('-usado')[:20]:
+        if resultado.usuario_id == usuario_id:
+            return resultado, None
+        ajeno = ajeno or resultado
+    return None, ajeno
+
+
+def _usar(resultado, **campos):
+    campos['usado'] = timezone.now()
+    ResultadoOCR.objects.filter(id=resultado.id).update(**campos)
+    for campo, valor in campos.items():
+        setattr(resultado, campo, valor)
+    return resultado
+
+
+def _guardar(usuario_id, file_unique_id, sha256, huella, texto, lineas, recibo):
+    resultado = ResultadoOCR.objects.create(
+        usuario_id=usuario_id,
+        file_unique_id=file_unique_id or '',
+        sha256=sha256,
+        dhash=huella,
+        texto=texto,
+        lineas=lineas,
+        recibo=recibo,
+    )
+    if resultado.id % PODAR_CADA == 0:
+        podar_cache_ocr()
+    return resultado
+
+
+def _copiar(ajeno, usuario_id, file_unique_id):
+    # La lectura de otro usuario sirve; el registro no (cada uno tiene el suyo)
+    return _guardar(
+        usuario_id, file_unique_id or ajeno.file_unique_id, ajeno.sha256, ajeno.dhash,
+        ajeno.texto, ajeno.lineas, ajeno.recibo,
+    )
+
+
+def obtener_resultado(usuario_id, file_unique_id, descargar):
+    """
+    ResultadoOCR de la foto para el usuario. `descargar` devuelve los bytes
+    y solo se llama si la foto no se conoce por su file_unique_id; el OCR
+    solo corre si tampoco se conoce por su contenido.
+    Devuelve (resultado, conocido): conocido indica que el usuario ya la había enviado.
+    """
+    if file_unique_id:
+        propio, ajeno = _buscar(usuario_id, file_unique_id=file_unique_id)
+        if propio:
+            return _usar(propio), True
+        if ajeno:
+            return _copiar(ajeno, usuario_id, file_unique_id), False
+
+    img_bytes = descargar()
+    sha256 = hashlib.sha256(img_bytes).hexdigest()
+    propio, ajeno = _buscar(usuario_id, sha256=sha256)
+    if propio:
+        # Misma imagen con otro file_unique_id (la subió de nuevo)
+        return _usar(propio), True
+    if ajeno:
+        return _copiar(ajeno, usuario_id, file_unique_id), False
+
+    lectura = leer_imagen_bytes(img_bytes)
+    recibo = analizar_recibo(lectura["lineas"]) if lectura["texto"] else None
+    # Los PDF no tienen huella perceptual: se comparan solo por sha256
+    huella = '' if es_pdf(img_bytes) else dhash(img_bytes)
+    return _guardar(
+        usuario_id, file_unique_id, sha256, huella,
+        lectura["texto"], lectura["lineas"], recibo,
+    ), False
+
+
+def buscar_repetido(resultado, conocido):
+    """
+    Resultado anterior ya registrado de la misma foto o, por dHash, de otra
+    foto muy parecida con el mismo total (los tickets en blanco se parecen
+    mucho entre sí: el dHash solo no alcanza). None si no hay.
+    """
+    if conocido:
+        return resultado if resultado.registrado else None
+    if not resultado.recibo or not resultado.dhash:
+        return None
+
+    anteriores = (
+        ResultadoOCR.objects
+        .filter(usuario_id=resultado.usuario_id, registrado__isnull=False)
+        .exclude(id=resultado.id)
+        .exclude(dhash='')
+        .order_by('-registrado')[:settings.OCR_CACHE_PARECIDOS]
+    )
+    for anterior in anteriores:
+        if (
+            distancia_dhash(anterior.dhash, resultado.dhash) <= settings.OCR_DHASH_DISTANCIA
+            and (anterior.recibo or {}).get("monto") == resultado.recibo["monto"]
+        ):
+            return anterior
+    return None
+
+
+def marcar_registrado(resultado):
+    _usar(resultado, registrado=timezone.now())
+
+
+def podar_cache_ocr(max_filas=None):
+    """
+    Deja los OCR_CACHE_MAX_FILAS resultados usados más recientemente.
+    """
+    max_filas = max_filas or settings.OCR_CACHE_MAX_FILAS
+    corte = (
+        ResultadoOCR.objects.order_by('-usado')
+        .values_list('usado', flat=True)[max_filas:max_filas + 1]
+    )
+    if not corte:
+        return 0
+    borrados, _ = ResultadoOCR.objects.filter(usado__lte=corte[0]).delete()
+    return borrados
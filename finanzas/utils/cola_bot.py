@@ -0,0 +1,233 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from finanzas.models import TrabajoBot, UpdateProcesado
+
+# Cuántos trabajos activos se miran por vuelta al buscar uno libre
+VENTANA_RECLAMO = 500
+# Máximo de mensajes de un chat que se procesan juntos
+MAX_AGRUPADOS = 20
+
+
+def chat_id_de(update):
+    mensaje = update.get("message") or update.get("edited_message") or {}
+    return str(mensaje.get("chat", {}).get("id", ""))
+
+
+def es_texto_simple(update):
+    """
+    Mensaje de texto que no es comando ni foto: se puede agrupar con los
+    siguientes del mismo chat en una sola extracción.
+    """
+    mensaje = update.get("message") or {}
+    texto = mensaje.get("text") or ""
+    return bool(texto.strip()) and not texto.startswith("/") and "photo" not in mensaje
+
+
+def marcar_update(update_id):
+    """
+    Registra el update_id y devuelve False si ya se había recibido.
+    La unicidad la garantiza el índice: un único INSERT, sin lecturas previas.
+    """
+    if update_id is None:
+        return True
+    try:
+        with transaction.atomic():
+            UpdateProcesado.objects.create(update_id=update_id)
+    except IntegrityError:
+        return False
+    return True
+
+
+def limpiar_updates(horas=None):
+    """
+    Borra los update_id más viejos que BOT_UPDATES_TTL_HORAS
+    (Telegram no reenvía updates de más de 24 h).
+    """
+    horas = horas or settings.BOT_UPDATES_TTL_HORAS
+    limite = timezone.now() - timedelta(hours=horas)
+    borrados, _ = UpdateProcesado.objects.filter(recibido__lt=limite).delete()
+    return borrados
+
+
+def encolar_update(update):
+    """
+    Guarda el update para procesarlo después. Es un único INSERT.
+    """
+    return TrabajoBot.objects.create(chat_id=chat_id_de(update), update=update)
+
+
+def reclamar_trabajo(ahora=None):
+    """
+    Toma el próximo trabajo respetando el orden por chat: de cada chat solo
+    puede tomarse el más viejo, y solo si no hay otro de ese chat en proceso
+    o esperando un reintento. Devuelve None si no hay nada disponible.
+
+    El cambio a 'procesando' es un UPDATE condicionado al estado, así que
+    dos workers nunca se quedan con el mismo trabajo.
+    """
+    ahora = ahora or timezone.now()
+    activos = (
+        TrabajoBot.objects
+        .filter(estado__in=[TrabajoBot.PENDIENTE, TrabajoBot.PROCESANDO])
+        .order_by('id')
+        .values('id', 'chat_id', 'estado', 'disponible_desde')[:VENTANA_RECLAMO]
+    )
+
+    vistos = set()
+    for trabajo in activos:
+        if trabajo['chat_id'] in vistos:
+            continue
+        vistos.add(trabajo['chat_id'])
+
+        if trabajo['estado'] == TrabajoBot.PROCESANDO or trabajo['disponible_desde'] > ahora:
+            continue
+
+        tomado = TrabajoBot.objects.filter(id=trabajo['id'], estado=TrabajoBot.PENDIENTE).update(
+            estado=TrabajoBot.PROCESANDO,
+            iniciado=ahora,
+            intentos=F('intentos') + 1,
+        )
+        if tomado:
+            return TrabajoBot.objects.get(id=trabajo['id'])
+    return None
+
+
+def reclamar_lote(ahora=None):
+    """
+    Como reclamar_trabajo, pero si el trabajo es un texto simple también toma
+    los textos siguientes del mismo chat llegados dentro de
+    BOT_VENTANA_AGRUPACION segundos. Devuelve una lista (vacía si no hay nada).
+    """
+    ahora = ahora or timezone.now()
+    trabajo = reclamar_trabajo(ahora)
+    if trabajo is None:
+        return []
+
+    lote = [trabajo]
+    ventana = settings.BOT_VENTANA_AGRUPACION
+    if not ventana or not es_texto_simple(trabajo.update):
+        return lote
+
+    siguientes = (
+        TrabajoBot.objects
+        .filter(
+            chat_id=trabajo.chat_id,
+            estado=TrabajoBot.PENDIENTE,
+            id__gt=trabajo.id,
+            creado__lte=trabajo.creado + timedelta(seconds=ventana),
+            disponible_desde__lte=ahora,
+        )
+        .order_by('id')[:MAX_AGRUPADOS - 1]
+    )
+    for siguiente in siguientes:
+        # Solo los consecutivos: un comando o una foto corta el grupo
+        if not es_texto_simple(siguiente.update):
+            break
+        tomado = TrabajoBot.objects.filter(id=siguiente.id, estado=TrabajoBot.PENDIENTE).update(
+            estado=TrabajoBot.PROCESANDO,
+            iniciado=ahora,
+            intentos=F('intentos') + 1,
+        )
+        if not tomado:
+            break
+        siguiente.intentos += 1
+        lote.append(siguiente)
+    return lote
+
+
+def completar_trabajo(trabajo):
+    TrabajoBot.objects.filter(id=trabajo.id).update(
+        estado=TrabajoBot.HECHO,
+        finalizado=timezone.now(),
+        ultimo_error='',
+    )
+
+
+def fallar_trabajo(trabajo, error):
+    """
+    Reintenta con backoff exponencial hasta BOT_COLA_MAX_INTENTOS.
+    Mientras espera, los siguientes mensajes del mismo chat también esperan.
+    """
+    if trabajo.intentos >= settings.BOT_COLA_MAX_INTENTOS:
+        TrabajoBot.objects.filter(id=trabajo.id).update(
+            estado=TrabajoBot.ERROR,
+            finalizado=timezone.now(),
+            ultimo_error=str(error)[:2000],
+        )
+        return
+
+    espera = min(
+        settings.BOT_COLA_BACKOFF_BASE * 2 ** (trabajo.intentos - 1),
+        settings.BOT_COLA_BACKOFF_MAX,
+    )
+    TrabajoBot.objects.filter(id=trabajo.id).update(
+        estado=TrabajoBot.PENDIENTE,
+        disponible_desde=timezone.now() + timedelta(seconds=espera),
+        ultimo_error=str(error)[:2000],
+    )
+
+
+def recuperar_colgados(timeout=300):
+    """
+    Devuelve a la cola los trabajos que quedaron 'procesando' por un worker
+    que murió a mitad de camino.
+    """
+    limite = timezone.now() - timedelta(seconds=timeout)
+    return TrabajoBot.objects.filter(
+        estado=TrabajoBot.PROCESANDO, iniciado__lt=limite
+    ).update(estado=TrabajoBot.PENDIENTE)
+
+
+def limpiar_terminados(dias=7):
+    limite = timezone.now() - timedelta(days=dias)
+    borrados, _ = TrabajoBot.objects.filter(
+        estado=TrabajoBot.HECHO, finalizado__lt=limite
+    ).delete()
+    return borrados
+
+
+def estadisticas_cola(muestra=500):
+    """
+    Profundidad de la cola y latencias (segundos) de los últimos trabajos.
+    """
+    ahora = timezone.now()
+    por_estado = dict(
+        TrabajoBot.objects.order_by().values_list('estado').annotate(n=Count('id'))
+    )
+
+    mas_viejo = (
+        TrabajoBot.objects
+        .filter(estado=TrabajoBot.PENDIENTE)
+        .order_by('id')
+        .values_list('creado', flat=True)
+        .first()
+    )
+
+    latencias = sorted(
+        (finalizado - creado).total_seconds()
+        for creado, finalizado in (
+            TrabajoBot.objects
+            .filter(estado=TrabajoBot.HECHO)
+            .order_by('-id')
+            .values_list('creado', 'finalizado')[:muestra]
+        )
+    )
+
+    def percentil(p):
+        if not latencias:
+            return None
+        return latencias[min(len(latencias) - 1, int(len(latencias) * p))]
+
+    return {
+        'pendientes': por_estado.get(TrabajoBot.PENDIENTE, 0),
+        'procesando': por_estado.get(TrabajoBot.PROCESANDO, 0),
+        'errores': por_estado.get(TrabajoBot.ERROR, 0),
+        'espera_mas_vieja': (ahora - mas_viejo).total_seconds() if mas_viejo else 0,
+        'latencia_p50': percentil(0.50),
+        'latencia_p95': percentil(0.95),
+    }
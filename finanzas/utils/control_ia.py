@@ -1,26 +1,162 @@
-from django.utils import timezone
+import logging
+import time
 from datetime import timedelta
 
+from django.conf import settings
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce, Least
+from django.db.models.lookups import GreaterThanOrEqual
+from django.utils import timezone
+
+from finanzas.models import Perfil
+from finanzas.utils.cache import cache_atomica, obtener_cache
+
+logger = logging.getLogger(__name__)
+
 MAX_STRIKES = 2
 TIEMPO_BLOQUEO = timedelta(minutes=15)
+# Los strikes sin un bloqueo se olvidan después de este tiempo
+VENTANA_STRIKES = 24 * 3600
+
+# El estado vive en la cache compartida (strikes, bloqueo y cupo de llamadas
+# a la IA por usuario): un mensaje válido no escribe en la base. Hace falta
+# una cache con add/incr atómicos (Redis, Memcached o LocMemCache con un solo
+# proceso); con otra, o si la cache falla, se usan los campos de Perfil con
+# updates atómicos.
+
+# Lock con cache.add para leer y escribir el cupo sin pisarse
+ESPERA_LOCK = 0.5  # segundos
+TIMEOUT_LOCK = 5
+
+
+class CacheNoDisponible(Exception):
+    pass
+
+
+def _clave(usuario_id, que):
+    return f"finanzas:ia:{que}:{usuario_id}"
+
+
+def _cache(operacion, *args, **kwargs):
+    try:
+        return getattr(obtener_cache(), operacion)(*args, **kwargs)
+    except ValueError:
+        raise  # incr de una clave que no existe
+    except Exception as e:
+        logger.warning(f"[IA] Cache no disponible ({operacion}): {e}")
+        raise CacheNoDisponible from e
+
 
 def ia_bloqueada(perfil):
-    if perfil.bloqueo_ia_hasta and timezone.now() < perfil.bloqueo_ia_hasta:
-        return True
-    return False
+    if cache_atomica():
+        try:
+            hasta = _cache("get", _clave(perfil.user_id, "bloqueo"))
+            return hasta is not None and time.time() < hasta
+        except CacheNoDisponible:
+            pass
+    return Perfil.objects.filter(id=perfil.id, bloqueo_ia_hasta__gt=timezone.now()).exists()
 
 
 def registrar_no_transaccion(perfil):
-    perfil.strikes_no_transaccion += 1
+    if not cache_atomica():
+        return _registrar_no_transaccion_db(perfil)
+    clave = _clave(perfil.user_id, "strikes")
+    try:
+        _cache("add", clave, 0, VENTANA_STRIKES)
+        try:
+            strikes = _cache("incr", clave)
+        except ValueError:
+            # Expiró entre el add y el incr
+            _cache("add", clave, 1, VENTANA_STRIKES)
+            strikes = 1
+        if strikes >= MAX_STRIKES:
+            segundos = TIEMPO_BLOQUEO.total_seconds()
+            _cache("set", _clave(perfil.user_id, "bloqueo"), time.time() + segundos, segundos)
+            _cache("delete", clave)  # reset luego del bloqueo
+    except CacheNoDisponible:
+        _registrar_no_transaccion_db(perfil)
 
-    if perfil.strikes_no_transaccion >= MAX_STRIKES:
-        perfil.bloqueo_ia_hasta = timezone.now() + TIEMPO_BLOQUEO
-        perfil.strikes_no_transaccion = 0  # reset luego del bloqueo
 
-    perfil.save()
+def _registrar_no_transaccion_db(perfil):
+    Perfil.objects.filter(id=perfil.id).update(strikes_no_transaccion=F('strikes_no_transaccion') + 1)
+    Perfil.objects.filter(id=perfil.id, strikes_no_transaccion__gte=MAX_STRIKES).update(
+        strikes_no_transaccion=0,
+        bloqueo_ia_hasta=timezone.now() + TIEMPO_BLOQUEO,
+    )
 
 
 def registrar_transaccion_valida(perfil):
-    perfil.strikes_no_transaccion = 0
-    perfil.bloqueo_ia_hasta = None
-    perfil.save()
\ No newline at end of file
+    if cache_atomica():
+        try:
+            if _cache("get", _clave(perfil.user_id, "strikes")):
+                _cache("delete", _clave(perfil.user_id, "strikes"))
+            return
+        except CacheNoDisponible:
+            pass
+    # Solo escribe si había strikes
+    Perfil.objects.filter(id=perfil.id, strikes_no_transaccion__gt=0).update(strikes_no_transaccion=0)
+
+
+def _con_lock(clave, funcion):
+    lock = f"{clave}:lock"
+    limite = time.monotonic() + ESPERA_LOCK
+    while not _cache("add", lock, 1, TIMEOUT_LOCK):
+        if time.monotonic() > limite:
+            raise CacheNoDisponible(f"No se liberó {lock}")
+        time.sleep(0.005)
+    try:
+        return funcion()
+    finally:
+        _cache("delete", lock)
+
+
+def consumir_llamada_ia(usuario_id):
+    """
+    Descuenta una llamada a la IA del cupo del usuario: un balde de tokens
+    por minuto y otro por día (BOT_IA_LLAMADAS_POR_MINUTO / _POR_DIA).
+    Devuelve False si alguno está vacío.
+    """
+    por_minuto = settings.BOT_IA_LLAMADAS_POR_MINUTO
+    por_dia = settings.BOT_IA_LLAMADAS_POR_DIA
+    if not por_minuto and not por_dia:
+        return True
+    if not cache_atomica():
+        return _consumir_llamada_ia_db(usuario_id, por_minuto, por_dia)
+    clave = _clave(usuario_id, "cupo")
+
+    def descontar():
+        ahora = time.time()
+        minuto, dia, ultimo = _cache("get", clave) or (por_minuto, por_dia, ahora)
+        # Se rellenan en proporción al tiempo que pasó
+        minuto = min(por_minuto, minuto + (ahora - ultimo) * por_minuto / 60)
+        dia = min(por_dia, dia + (ahora - ultimo) * por_dia / 86400)
+        hay_cupo = (not por_minuto or minuto >= 1) and (not por_dia or dia >= 1)
+        if hay_cupo:
+            minuto, dia = minuto - 1, dia - 1
+        # Pasado un día los dos baldes están llenos: da igual que la clave expire
+        _cache("set", clave, (minuto, dia, ahora), 86400)
+        return hay_cupo
+
+    try:
+        return _con_lock(clave, descontar)
+    except CacheNoDisponible:
+        return _consumir_llamada_ia_db(usuario_id, por_minuto, por_dia)
+
+
+def _consumir_llamada_ia_db(usuario_id, por_minuto, por_dia):
+    """
+    Los mismos baldes en los campos cupo_ia_* de Perfil (NULL = lleno), con
+    un solo UPDATE condicional: rellena, verifica y descuenta en la base, sin
+    leer antes, así dos llamadas a la vez no pueden usar el mismo token.
+    """
+    ahora = time.time()
+    transcurrido = Value(ahora) - Coalesce(F("cupo_ia_actualizado"), Value(ahora))
+    cambios = {"cupo_ia_actualizado": Value(ahora)}
+    condiciones = []
+    for campo, cupo, periodo in (("cupo_ia_minuto", por_minuto, 60), ("cupo_ia_dia", por_dia, 86400)):
+        if not cupo:
+            continue
+        disponible = Least(Value(float(cupo)), Coalesce(F(campo), Value(float(cupo))) + transcurrido * (cupo / periodo))
+        cambios[campo] = disponible - 1
+        condiciones.append(GreaterThanOrEqual(disponible, 1))
+    return bool(Perfil.objects.filter(*condiciones, user_id=usuario_id).update(**cambios))
@@ -0,0 +1,84 @@
+import csv
+import tempfile
+
+try:
+    # Opcional: solo para exportar en Excel
+    from openpyxl import Workbook
+except ImportError:
+    Workbook = None
+
+COLUMNAS = ["fecha", "tipo", "categoria", "descripcion", "destino", "cantidad"]
+CHUNK_SIZE = 2000
+# Excel/LibreOffice toman como fórmula una celda que empieza con estos caracteres
+INICIO_FORMULA = ("=", "+", "-", "@", "\t", "\r")
+
+
+class _Eco:
+    """
+    Pseudo-archivo para csv.writer: devuelve la línea en lugar de guardarla.
+    """
+
+    def write(self, valor):
+        return valor
+
+
+def filas_exportables(transacciones):
+    """
+    Recorre el queryset con un cursor del servidor (iterator) en bloques de
+    CHUNK_SIZE, sin materializar el historial completo.
+    """
+    return (
+        transacciones
+        .order_by("-fecha", "-id")
+        .values_list(*COLUMNAS)
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+
+
+def celda_segura(valor):
+    """
+    Antepone ' a los textos que una planilla interpretaría como fórmula
+    (inyección de fórmulas en CSV). Los números se dejan como están.
+    """
+    if isinstance(valor, str) and valor.startswith(INICIO_FORMULA):
+        return "'" + valor
+    return valor
+
+
+def generar_csv(transacciones):
+    escritor = csv.writer(_Eco())
+    yield "\ufeff"  # BOM para que Excel detecte UTF-8
+    yield escritor.writerow(COLUMNAS)
+    for fecha, tipo, categoria, descripcion, destino, cantidad in filas_exportables(transacciones):
+        yield escritor.writerow([
+            fecha.isoformat(), tipo, celda_segura(categoria), celda_segura(descripcion),
+            celda_segura(destino or ""), cantidad,
+        ])
+
+
+def generar_xlsx(transacciones):
+    """
+    Escribe el Excel en modo write_only (las filas van a disco a medida que se
+    agregan) y devuelve el archivo temporal posicionado al inicio.
+
+    No es streaming: el libro se arma completo en el archivo temporal antes de
+    enviar el primer byte. La memoria queda acotada, pero el tiempo hasta la
+    respuesta y el disco usado crecen con el historial.
+    """
+    if Workbook is None:
+        raise RuntimeError("Para exportar a Excel hay que instalar openpyxl")
+
+    libro = Workbook(write_only=True)
+    hoja = libro.create_sheet("Transacciones")
+    hoja.append(COLUMNAS)
+    for fecha, tipo, categoria, descripcion, destino, cantidad in filas_exportables(transacciones):
+        # openpyxl también guarda como fórmula un texto que empieza con "="
+        hoja.append([
+            fecha, tipo, celda_segura(categoria), celda_segura(descripcion),
+            celda_segura(destino), cantidad,
+        ])
+
+    archivo = tempfile.TemporaryFile()
+    libro.save(archivo)
+    archivo.seek(0)
+    return archivo
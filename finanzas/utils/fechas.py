@@ -103,4 +103,29 @@ def detectar_fecha_numerica(texto, hoy):
             fecha = date(año - 1, mes, dia)
         return fecha
     except ValueError:
-        return None
\ No newline at end of file
+        return None
+
+def parsear_fecha(valor, hoy=None):
+    """
+    Fecha de un extracto bancario: ISO (2025-10-24), OFX (20251024[120000])
+    o numérica día/mes/año (24/10/25, 24-10-2025).
+    Devuelve None si no se reconoce.
+    """
+    texto = (valor or "").strip()
+    hoy = hoy or date.today()
+
+    match = re.match(r'^(\d{4})-(\d{2})-(\d{2})', texto)
+    if match:
+        try:
+            return date(*map(int, match.groups()))
+        except ValueError:
+            return None
+
+    match = re.match(r'^(\d{4})(\d{2})(\d{2})', texto)
+    if match:
+        try:
+            return date(*map(int, match.groups()))
+        except ValueError:
+            return None
+
+    return detectar_fecha_numerica(texto, hoy)
\ No newline at end of file
@@ -0,0 +1,116 @@
+from datetime import date
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import Count, Sum
+
+from finanzas.models import Transaccion
+from finanzas.utils.busqueda import filtrar_por_texto
+
+
+def _lista(params, clave):
+    # QueryDict (request.GET) o dict común
+    if hasattr(params, 'getlist'):
+        valores = params.getlist(clave)
+    else:
+        valores = params.get(clave) or []
+        if isinstance(valores, str):
+            valores = [valores]
+    return [v for v in valores if v]
+
+
+def _fecha(valor):
+    try:
+        return date.fromisoformat(valor) if valor else None
+    except ValueError:
+        return None
+
+
+def _monto(valor):
+    try:
+        monto = Decimal(valor.replace(',', '.')) if valor else None
+    except InvalidOperation:
+        return None
+    # NaN e Infinity también son Decimal válidos
+    if monto is None or not monto.is_finite():
+        return None
+    return monto
+
+
+def filtrar_transacciones(usuario, params):
+    """
+    Aplica los filtros del historial (querystring) a las transacciones del usuario.
+    Lo comparten la vista HTML, el endpoint JSON y la exportación.
+
+    Filtros: fecha (exacta), desde/hasta, categoria (repetible), tipo,
+    monto_min/monto_max y q (texto).
+    """
+    transacciones = Transaccion.objects.filter(usuario=usuario)
+
+    fecha_filtro = _fecha(params.get('fecha'))
+    desde = _fecha(params.get('desde'))
+    hasta = _fecha(params.get('hasta'))
+    categorias = _lista(params, 'categoria')
+    tipo = params.get('tipo')
+    monto_min = _monto(params.get('monto_min'))
+    monto_max = _monto(params.get('monto_max'))
+
+    if fecha_filtro:
+        transacciones = transacciones.filter(fecha=fecha_filtro)
+    if desde:
+        transacciones = transacciones.filter(fecha__gte=desde)
+    if hasta:
+        transacciones = transacciones.filter(fecha__lte=hasta)
+    if len(categorias) == 1:
+        transacciones = transacciones.filter(categoria=categorias[0])
+    elif categorias:
+        transacciones = transacciones.filter(categoria__in=categorias)
+    if tipo in ('ingreso', 'gasto'):
+        transacciones = transacciones.filter(tipo=tipo)
+    if monto_min is not None:
+        transacciones = transacciones.filter(cantidad__gte=monto_min)
+    if monto_max is not None:
+        transacciones = transacciones.filter(cantidad__lte=monto_max)
+
+    # Búsqueda por texto en descripción/destino (índice FTS)
+    transacciones = filtrar_por_texto(transacciones, params.get('q'))
+
+    return transacciones
+
+
+def consulta_facetas(transacciones):
+    """
+    La consulta agrupada de calcular_facetas (la revisa bench_query_plans).
+    """
+    return (
+        transacciones
+        .order_by()
+        .values('tipo', 'categoria')
+        .annotate(n=Count('id'), total=Sum('cantidad'))
+    )
+
+
+def calcular_facetas(transacciones):
+    """
+    Cantidad y total por tipo y, por categoría, la cantidad y un total de
+    ingresos y otro de gastos (no se suman entre sí). Resueltos en una
+    única consulta agrupada por (categoria, tipo).
+    """
+    grupos = consulta_facetas(transacciones)
+
+    por_categoria = {}
+    por_tipo = {}
+    for grupo in grupos:
+        total = grupo['total'] or 0
+        faceta = por_tipo.setdefault(grupo['tipo'], {'n': 0, 'total': Decimal('0')})
+        faceta['n'] += grupo['n']
+        faceta['total'] += total
+
+        faceta = por_categoria.setdefault(
+            grupo['categoria'], {'n': 0, 'ingreso': Decimal('0'), 'gasto': Decimal('0')}
+        )
+        faceta['n'] += grupo['n']
+        # El campo no restringe el tipo: otros valores solo cuentan en por_tipo
+        if grupo['tipo'] in ('ingreso', 'gasto'):
+            faceta[grupo['tipo']] += total
+
+    return {'por_categoria': por_categoria, 'por_tipo': por_tipo}
@@ -1,4 +1,6 @@
-from decimal import Decimal
+import re
+import unicodedata
+from decimal import Decimal, InvalidOperation
 
 def formatear_pesos(valor, decimales=0):
     """
@@ -21,4 +23,92 @@ def formatear_pesos(valor, decimales=0):
             .replace(",", "X")
             .replace(".", ",")
             .replace("X", ".")
-        )
\ No newline at end of file
+        )
+
+
+def parsear_monto(valor):
+    """
+    Convierte un importe escrito a mano o exportado por un banco a Decimal.
+    Acepta formato argentino y anglosajón.
+    Ej:
+    "244.000" -> 244000
+    "$ 1.234,56" -> 1234.56
+    "-1,234.56" -> -1234.56
+    "(500)" -> -500
+    Lanza ValueError si no es un número.
+    """
+    if valor is None:
+        raise ValueError("monto vacío")
+
+    texto = str(valor).strip().replace("$", "").replace(" ", "").replace("\xa0", "")
+    negativo = texto.startswith("-") or (texto.startswith("(") and texto.endswith(")"))
+    texto = texto.strip("-+()")
+
+    if "," in texto and "." in texto:
+        # El último separador es el decimal
+        if texto.rfind(",") > texto.rfind("."):
+            texto = texto.replace(".", "").replace(",", ".")
+        else:
+            texto = texto.replace(",", "")
+    elif "," in texto:
+        # "1500,5" decimal; "1,500" o "1,500,000" miles
+        if re.fullmatch(r"\d{1,3}(,\d{3})+", texto):
+            texto = texto.replace(",", "")
+        else:
+            texto = texto.replace(",", ".")
+    elif "." in texto:
+        # "20.000" o "1.500.000" son miles; "20.5" es decimal
+        if re.fullmatch(r"\d{1,3}(\.\d{3})+", texto):
+            texto = texto.replace(".", "")
+
+    try:
+        monto = Decimal(texto)
+    except InvalidOperation:
+        raise ValueError(f"monto inválido: {valor!r}")
+    if not monto.is_finite():
+        raise ValueError(f"monto inválido: {valor!r}")
+    return -monto if negativo else monto
+
+# Importes dentro de un mensaje: "20000", "20.000", "1.500,50", "$ 300",
+# "20k", "20 mil", "3 lucas", "1,5 palos". No toma números pegados a / o -
+# (fechas como 24/10 o 24-10-25).
+MONTO_EN_TEXTO = re.compile(
+    r"(?<![\w/.,-])\$?\s?"
+    r"(\d{1,3}(?:\.\d{3})+(?:,\d{1,2})?|\d+(?:[.,]\d{1,2})?)"
+    r"(?:\s?(k|mil|lucas?|palos?|millones?|millón|millon)\b)?"
+    r"(?![\w/-]|[.,]\d)",
+    re.IGNORECASE,
+)
+
+MULTIPLICADORES = {
+    "k": 1000, "mil": 1000, "luca": 1000, "lucas": 1000,
+    "palo": 1000000, "palos": 1000000,
+    "millon": 1000000, "millón": 1000000, "millones": 1000000,
+}
+
+
+def montos_en_texto(texto):
+    """
+    Importes que aparecen en un texto libre, como lista de (Decimal, inicio, fin).
+    Ej: "gasté 20.000 en comida" -> [(20000, 6, 12)]
+        "2 lucas de nafta" -> [(2000, 0, 7)]
+    """
+    montos = []
+    for match in MONTO_EN_TEXTO.finditer(texto or ""):
+        try:
+            monto = parsear_monto(match.group(1))
+        except ValueError:
+            continue
+        multiplicador = match.group(2)
+        if multiplicador:
+            monto *= MULTIPLICADORES[multiplicador.lower()]
+        montos.append((monto, match.start(), match.end()))
+    return montos
+
+
+def normalizar_texto(texto):
+    """
+    Minúsculas y sin tildes: "Pagué el Café" -> "pague el cafe".
+    """
+    texto = unicodedata.normalize("NFKD", (texto or "").lower())
+    return "".join(c for c in texto if not unicodedata.combining(c))
@@ -1,45 +1,63 @@
-import pandas as pd
-import plotly.graph_objects as go
-from plotly.offline import plot
-from django.db.models.functions import TruncDay
+from datetime import date
+
 from django.db.models import Sum
 
+from finanzas.models import ResumenDiario
+
+EPOCA = date(1970, 1, 1)
+MAX_PUNTOS = 120
+
 
-def generar_grafico_balance(usuario):
-    data = (
-        usuario.transaccion_set
-        .annotate(dia=TruncDay("fecha"))
-        .values("dia")
-        .annotate(total=Sum("cantidad"))
+def serie_diaria(usuario):
+    """
+    Totales por día separados en ingresos y gastos, leídos del rollup.
+    """
+    filas = (
+        ResumenDiario.objects
+        .filter(usuario=usuario)
+        .values("dia", "tipo")
+        .annotate(total=Sum("total"))
         .order_by("dia")
     )
 
-    if data:
-        df = pd.DataFrame(data)
-        df["dia"] = pd.to_datetime(df["dia"])
-    else:
-        df = pd.DataFrame({"dia": [], "total": []})
-
-    fig = go.Figure()
-
-    fig.add_trace(go.Scatter(
-        x=df["dia"],
-        y=df["total"],
-        mode="lines",
-        line=dict(width=3, color="#d4af37"),
-        fill="tozeroy",
-        fillcolor="rgba(212,175,55,0.15)",
-        hovertemplate="%{x|%d-%m-%Y}<br>$%{y:,.0f}<extra></extra>"
-    ))
-
-    fig.update_layout(
-        margin=dict(l=0, r=0, t=10, b=0),
-        height=200,
-        showlegend=False,
-        plot_bgcolor="rgba(0,0,0,0)",
-        paper_bgcolor="rgba(0,0,0,0)",
-        xaxis=dict(showgrid=False, zeroline=False, tickformat="%b %d", color="#aaa"),
-        yaxis=dict(showgrid=False, zeroline=False, visible=False)
-    )
+    dias, ingresos, gastos = [], [], []
+    for fila in filas:
+        if not dias or dias[-1] != fila["dia"]:
+            dias.append(fila["dia"])
+            ingresos.append(0)
+            gastos.append(0)
+        if fila["tipo"] == "ingreso":
+            ingresos[-1] = float(fila["total"])
+        else:
+            gastos[-1] = float(fila["total"])
+    return dias, ingresos, gastos
+
+
+def serie_balance(usuario, max_puntos=MAX_PUNTOS):
+    """
+    Serie compacta para el gráfico del dashboard:
+    {"d": [días desde 1970-01-01], "i": [ingresos], "g": [gastos], "w": días por punto}
+
+    Si hay más días que max_puntos se agrupan en intervalos de igual ancho
+    (sumando), así los totales no cambian y el payload queda acotado.
+    """
+    dias, ingresos, gastos = serie_diaria(usuario)
+    numeros = [(dia - EPOCA).days for dia in dias]
+
+    ancho = 1
+    if len(numeros) > max_puntos:
+        ancho = -(-(numeros[-1] - numeros[0] + 1) // max_puntos)
+
+    if ancho > 1:
+        inicio = numeros[0]
+        agrupados = {}
+        for numero, ingreso, gasto in zip(numeros, ingresos, gastos):
+            balde = inicio + (numero - inicio) // ancho * ancho
+            acumulado = agrupados.setdefault(balde, [0, 0])
+            acumulado[0] += ingreso
+            acumulado[1] += gasto
+        numeros = list(agrupados)
+        ingresos = [round(i, 2) for i, _ in agrupados.values()]
+        gastos = [round(g, 2) for _, g in agrupados.values()]
 
-    return plot(fig, output_type="div", include_plotlyjs=False)
+    return {"d": numeros, "i": ingresos, "g": gastos, "w": ancho}
@@ -0,0 +1,186 @@
+import csv
+import re
+import unicodedata
+
+from django.db import transaction
+
+from finanzas.models import Transaccion
+from finanzas.utils.cache import invalidar_usuario
+from finanzas.utils.fechas import parsear_fecha
+from finanzas.utils.formatos import parsear_monto
+from finanzas.utils.resumenes import aplicar_lote
+
+BATCH_SIZE = 1000
+MAX_ERRORES_REPORTADOS = 20
+# Transaccion.cantidad es DecimalField(max_digits=10, decimal_places=2)
+MONTO_MAXIMO = 10 ** 8
+
+CATEGORIAS_VALIDAS = {valor for valor, _ in Transaccion.CATEGORIA_CHOICES}
+
+# Nombres de columna habituales en los CSV de los bancos → campo interno
+COLUMNAS = {
+    "fecha": "fecha", "fecha operacion": "fecha", "fecha de operacion": "fecha",
+    "fecha movimiento": "fecha", "date": "fecha",
+    "descripcion": "descripcion", "concepto": "descripcion", "detalle": "descripcion",
+    "movimiento": "descripcion", "description": "descripcion",
+    "monto": "monto", "importe": "monto", "cantidad": "monto", "amount": "monto",
+    "debito": "debito", "debitos": "debito",
+    "credito": "credito", "creditos": "credito",
+    "tipo": "tipo",
+    "categoria": "categoria",
+    "destino": "destino", "comercio": "destino", "beneficiario": "destino",
+}
+
+
+class ErrorImportacion(ValueError):
+    pass
+
+
+def _normalizar_columna(nombre):
+    nombre = unicodedata.normalize("NFKD", nombre or "")
+    nombre = "".join(c for c in nombre if not unicodedata.combining(c))
+    return re.sub(r"\s+", " ", nombre.strip().lower())
+
+
+def leer_csv(archivo):
+    """
+    Recorre un CSV fila por fila (sin cargarlo entero) y devuelve dicts con
+    los campos internos. El separador (, ; o tab) se detecta en la cabecera.
+    """
+    cabecera = archivo.readline()
+    if not cabecera:
+        return
+
+    separador = max(",;\t", key=cabecera.count)
+    campos = [COLUMNAS.get(_normalizar_columna(c)) for c in next(csv.reader([cabecera], delimiter=separador))]
+    if "fecha" not in campos or not ({"monto", "debito", "credito"} & set(campos)):
+        raise ErrorImportacion("El CSV necesita columnas de fecha y monto (o débito/crédito)")
+
+    for valores in csv.reader(archivo, delimiter=separador):
+        if not any(v.strip() for v in valores):
+            continue
+        yield {campo: valor.strip() for campo, valor in zip(campos, valores) if campo}
+
+
+def leer_ofx(archivo):
+    """
+    Recorre un OFX (SGML v1 o XML v2) línea por línea y devuelve un dict por
+    cada <STMTTRN>, sin construir el documento completo en memoria.
+    """
+    actual = None
+    for linea in archivo:
+        for cierre, etiqueta, valor in re.findall(r"<(/?)([A-Za-z0-9.]+)>([^<]*)", linea):
+            etiqueta = etiqueta.upper()
+            if etiqueta == "STMTTRN":
+                if cierre and actual is not None:
+                    yield {
+                        "fecha": actual.get("DTPOSTED", ""),
+                        "monto": actual.get("TRNAMT", ""),
+                        "descripcion": actual.get("MEMO") or actual.get("NAME", ""),
+                        "destino": actual.get("NAME") if actual.get("MEMO") else None,
+                    }
+                    actual = None
+                elif not cierre:
+                    actual = {}
+            elif actual is not None and not cierre and valor.strip():
+                actual[etiqueta] = valor.strip()
+
+
+def normalizar_fila(fila):
+    """
+    Convierte una fila cruda en los campos de Transaccion.
+    Lanza ErrorImportacion si falta algo imprescindible.
+    """
+    fecha = parsear_fecha(fila.get("fecha"))
+    if not fecha:
+        raise ErrorImportacion(f"fecha inválida: {fila.get('fecha')!r}")
+
+    try:
+        if fila.get("monto"):
+            monto = parsear_monto(fila["monto"])
+        else:
+            # Extractos con columnas separadas de débito y crédito
+            debito = parsear_monto(fila["debito"]) if fila.get("debito") else 0
+            credito = parsear_monto(fila["credito"]) if fila.get("credito") else 0
+            monto = credito - abs(debito)
+    except ValueError as e:
+        raise ErrorImportacion(str(e))
+    if not monto or abs(monto) >= MONTO_MAXIMO:
+        raise ErrorImportacion(f"monto fuera de rango: {monto}")
+
+    tipo = (fila.get("tipo") or "").lower()
+    if tipo not in {"ingreso", "gasto"}:
+        tipo = "gasto" if monto < 0 else "ingreso"
+
+    categoria = (fila.get("categoria") or "").capitalize()
+    if categoria not in CATEGORIAS_VALIDAS:
+        categoria = "Otros"
+
+    descripcion = (fila.get("descripcion") or "").strip() or "Importado"
+    destino = (fila.get("destino") or "").strip() or None
+
+    return {
+        "fecha": fecha,
+        "tipo": tipo,
+        "cantidad": abs(monto),
+        "categoria": categoria,
+        "descripcion": descripcion[:200],
+        "destino": destino[:200] if destino else None,
+    }
+
+
+def guardar_lote(usuario_id, lote):
+    """
+    bulk_create de transacciones de un usuario con sus resúmenes al día.
+    bulk_create no dispara señales: resúmenes y cache se actualizan acá.
+    """
+    with transaction.atomic():
+        Transaccion.objects.bulk_create(lote)
+        aplicar_lote(usuario_id, lote)
+        transaction.on_commit(lambda: invalidar_usuario(usuario_id))
+
+
+def importar_transacciones(usuario, filas, batch_size=BATCH_SIZE):
+    """
+    Inserta las filas con bulk_create en lotes de batch_size, todo dentro de
+    una transacción. Los resúmenes se actualizan una vez por lote.
+
+    Devuelve (creadas, omitidas, errores) donde errores es una lista de
+    (numero_de_fila, motivo) con los primeros MAX_ERRORES_REPORTADOS.
+    """
+    creadas = omitidas = 0
+    errores = []
+    lote = []
+
+    with transaction.atomic():
+        for numero, fila in enumerate(filas, start=1):
+            try:
+                lote.append(Transaccion(usuario_id=usuario.id, **normalizar_fila(fila)))
+            except ErrorImportacion as e:
+                omitidas += 1
+                if len(errores) < MAX_ERRORES_REPORTADOS:
+                    errores.append((numero, str(e)))
+                continue
+
+            if len(lote) >= batch_size:
+                guardar_lote(usuario.id, lote)
+                creadas += len(lote)
+                lote = []
+
+        if lote:
+            guardar_lote(usuario.id, lote)
+            creadas += len(lote)
+
+    return creadas, omitidas, errores
+
+
+def lector_para(nombre_archivo, formato=None):
+    """
+    Elige el lector según el formato indicado o la extensión del archivo.
+    """
+    formato = (formato or nombre_archivo.rsplit(".", 1)[-1]).lower()
+    if formato in {"ofx", "qfx"}:
+        return leer_ofx
+    if formato in {"csv", "txt"}:
+        return leer_csv
+    raise ErrorImportacion(f"Formato no soportado: {formato}")
@@ -1,13 +1,288 @@
-import pytesseract
-from PIL import Image
+import multiprocessing
+import os
+import signal
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as TimeoutFuturo
+from concurrent.futures.process import BrokenProcessPool
 from io import BytesIO
 
-pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
+import pytesseract
+from django.conf import settings
+from PIL import Image, ImageChops, ImageFilter, ImageOps
+
+try:
+    # Opcional: solo para leer tickets en PDF
+    import pypdfium2
+except ImportError:
+    pypdfium2 = None
+
+# El OCR corre en un pool de procesos: Tesseract y el preprocesado usan CPU
+# y no deben frenar a los threads que atienden el webhook o la cola.
+# Lo que corre en el pool no lee settings: todo llega por parámetro.
+
 
-def extraer_texto_imagen_bytes(img_bytes: bytes) -> str:
+class ErrorOCR(Exception):
     """
-    Extrae texto OCR desde una imagen en memoria (bytes).
+    Falló Tesseract (no está instalado o no pudo leer la imagen).
+    """
+
+
+PDF_DISPONIBLE = pypdfium2 is not None
+MAX_PAGINAS_PDF = 3
+
+
+def es_pdf(contenido):
+    return contenido[:5] == b"%PDF-"
+
+
+def _reducir(img, max_lado):
+    """
+    Reduce la imagen para que su lado mayor no pase de max_lado píxeles.
+    Las fotos del celular no traen un DPI confiable: se limita por tamaño.
+    """
+    lado = max(img.size)
+    if max_lado and lado > max_lado:
+        escala = max_lado / lado
+        img = img.resize((round(img.width * escala), round(img.height * escala)), Image.LANCZOS)
+    return img
+
+
+def _umbral_adaptativo(gris, radio, margen):
+    """
+    Binariza comparando cada píxel con el promedio de su vecindario: tolera
+    sombras y luz despareja mejor que un umbral fijo.
+    """
+    promedio = gris.filter(ImageFilter.BoxBlur(radio))
+    # Cuánto más oscuro que su entorno es cada píxel
+    diferencia = ImageChops.subtract(promedio, gris)
+    return diferencia.point(lambda v: 0 if v > margen else 255)
+
+
+def _puntaje_renglones(binaria):
+    # Con el texto derecho los renglones quedan bien separados: la
+    # oscuridad por fila varía mucho más que con el texto inclinado
+    filas = binaria.resize((1, binaria.height), Image.BOX).tobytes()
+    media = sum(filas) / len(filas)
+    return sum((f - media) ** 2 for f in filas)
+
+
+def _enderezar(binaria, max_angulo, paso):
+    """
+    Busca el ángulo (entre ±max_angulo grados) que mejor alinea los renglones
+    sobre una copia chica y rota la imagen completa.
+    """
+    if not max_angulo:
+        return binaria
+    muestra = _reducir(binaria, 600)
+    angulos = [i * paso for i in range(-int(max_angulo / paso), int(max_angulo / paso) + 1)]
+    mejor = max(angulos, key=lambda a: _puntaje_renglones(
+        muestra.rotate(a, resample=Image.BILINEAR, expand=True, fillcolor=255)
+    ))
+    if mejor == 0:
+        return binaria
+    return binaria.rotate(mejor, resample=Image.BICUBIC, expand=True, fillcolor=255)
+
+
+def preprocesar(img, max_lado=2000, radio_umbral=15, margen_umbral=10, max_angulo=5, paso_angulo=0.5):
+    """
+    Orientación EXIF, escala de grises, reducción, umbral adaptativo y enderezado.
+    """
+    img = ImageOps.exif_transpose(img)
+    gris = _reducir(img.convert("L"), max_lado)
+    binaria = _umbral_adaptativo(gris, radio_umbral, margen_umbral)
+    return _enderezar(binaria, max_angulo, paso_angulo)
+
+
+def dhash(img_bytes):
+    """
+    Huella perceptual de 64 bits (en hex): compara el brillo de píxeles
+    vecinos en una miniatura de 9x8. Fotos casi iguales difieren en pocos bits.
     """
     img = Image.open(BytesIO(img_bytes))
-    texto = pytesseract.image_to_string(img, lang="spa")
-    return " ".join(texto.split())
\ No newline at end of file
+    img.draft("L", (64, 64))  # los JPEG se decodifican ya reducidos
+    pixeles = ImageOps.exif_transpose(img).convert("L").resize((9, 8), Image.LANCZOS).tobytes()
+    bits = 0
+    for fila in range(8):
+        for col in range(8):
+            bits = (bits << 1) | (pixeles[fila * 9 + col] > pixeles[fila * 9 + col + 1])
+    return f"{bits:016x}"
+
+
+def _leer_imagen(img, opciones):
+    """
+    Renglones de la imagen como listas de (palabra, confianza 0-100).
+    """
+    if opciones["preprocesar"]:
+        img = preprocesar(img, **opciones["preprocesado"])
+    config = f"--dpi {opciones['dpi']}" if opciones["dpi"] else ""
+    try:
+        # Con timeout pytesseract mata a Tesseract si se cuelga y lanza RuntimeError
+        datos = pytesseract.image_to_data(
+            img, lang=opciones["idioma"], config=config, output_type=pytesseract.Output.DICT,
+            timeout=opciones["timeout"],
+        )
+    except (pytesseract.TesseractNotFoundError, pytesseract.TesseractError, RuntimeError) as e:
+        # Las excepciones de pytesseract no se pueden pasar de vuelta desde el pool
+        raise ErrorOCR(str(e)) from None
+
+    renglones = {}
+    for i, palabra in enumerate(datos["text"]):
+        palabra = palabra.strip()
+        if not palabra:
+            continue
+        clave = (datos["block_num"][i], datos["par_num"][i], datos["line_num"][i])
+        renglones.setdefault(clave, []).append((palabra, float(datos["conf"][i])))
+    return list(renglones.values())
+
+
+def _leer_pdf(contenido, opciones):
+    """
+    Los PDF que genera un sistema ya traen el texto: se usa tal cual y solo
+    pasan por OCR las páginas que no lo tienen (escaneos).
+    """
+    if pypdfium2 is None:
+        raise ErrorOCR("Para leer PDFs hay que instalar pypdfium2")
+    lineas = []
+    pdf = pypdfium2.PdfDocument(contenido)
+    try:
+        for numero in range(min(len(pdf), MAX_PAGINAS_PDF)):
+            pagina = pdf[numero]
+            texto = pagina.get_textpage().get_text_range()
+            if texto.strip():
+                lineas += [[(p, 100.0) for p in renglon.split()] for renglon in texto.splitlines() if renglon.split()]
+            else:
+                img = pagina.render(scale=(opciones["dpi"] or 300) / 72).to_pil()
+                lineas += _leer_imagen(img, opciones)
+    finally:
+        pdf.close()
+    return lineas
+
+
+def leer_en_proceso(contenido, opciones):
+    """
+    Lo que corre dentro del pool: abre la imagen (o PDF), preprocesa y pasa
+    por Tesseract. Devuelve el texto y los renglones.
+    """
+    pytesseract.pytesseract.tesseract_cmd = opciones["tesseract_cmd"]
+    if es_pdf(contenido):
+        lineas = _leer_pdf(contenido, opciones)
+    else:
+        try:
+            img = Image.open(BytesIO(contenido))
+        except OSError as e:
+            raise ErrorOCR(f"No es una imagen: {e}") from None
+        lineas = _leer_imagen(img, opciones)
+    texto = " ".join(palabra for linea in lineas for palabra, _ in linea)
+    return {"texto": texto, "lineas": lineas}
+
+
+def ocr_en_proceso(img_bytes, opciones):
+    return leer_en_proceso(img_bytes, opciones)["texto"]
+
+
+def opciones_ocr(preprocesar=None):
+    return {
+        "tesseract_cmd": settings.TESSERACT_CMD,
+        "idioma": settings.OCR_IDIOMA,
+        "dpi": settings.OCR_DPI,
+        "timeout": settings.OCR_TIMEOUT,
+        "preprocesar": settings.OCR_PREPROCESAR if preprocesar is None else preprocesar,
+        "preprocesado": {
+            "max_lado": settings.OCR_MAX_LADO,
+            "radio_umbral": settings.OCR_RADIO_UMBRAL,
+            "margen_umbral": settings.OCR_MARGEN_UMBRAL,
+            "max_angulo": settings.OCR_MAX_ANGULO,
+        },
+    }
+
+
+_pool = None
+_lock = threading.Lock()
+
+
+def _anotar_proceso(pids):
+    """
+    Initializer de cada proceso del pool: deja su PID para poder matarlo
+    si se cuelga (el executor no expone sus procesos).
+    """
+    pids.put(os.getpid())
+
+
+def obtener_pool():
+    """
+    Pool de OCR_PROCESOS procesos compartido. Usa "spawn": hacer fork de un
+    proceso con threads (workers, polling) puede dejar locks tomados.
+    """
+    global _pool
+    if _pool is None:
+        with _lock:
+            if _pool is None:
+                contexto = multiprocessing.get_context("spawn")
+                pids = contexto.SimpleQueue()
+                _pool = ProcessPoolExecutor(
+                    max_workers=settings.OCR_PROCESOS,
+                    mp_context=contexto,
+                    initializer=_anotar_proceso,
+                    initargs=(pids,),
+                )
+                _pool.pids_ocr = pids
+    return _pool
+
+
+def _pids_del_pool(pool):
+    """
+    PIDs de los procesos que arrancó el pool (los que anotó _anotar_proceso).
+    """
+    pids = set()
+    while not pool.pids_ocr.empty():
+        pids.add(pool.pids_ocr.get())
+    return pids
+
+
+def _descartar_pool(pool, matar=False):
+    """
+    Saca el pool de uso. Con matar=True termina sus procesos: shutdown no
+    interrumpe un trabajo colgado y el proceso seguiría ocupando CPU.
+    """
+    global _pool
+    with _lock:
+        if _pool is pool:
+            _pool = None
+    pids = _pids_del_pool(pool) if matar else set()
+    pool.shutdown(wait=False, cancel_futures=True)
+    for pid in pids:
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            # Ya había terminado
+            pass
+
+
+def leer_imagen_bytes(img_bytes: bytes, preprocesar=None) -> dict:
+    """
+    OCR de una imagen o PDF en memoria: {"texto", "lineas"} (ver leer_en_proceso).
+    Con OCR_PROCESOS = 0 corre en el mismo proceso.
+    """
+    opciones = opciones_ocr(preprocesar)
+    if not settings.OCR_PROCESOS:
+        return leer_en_proceso(img_bytes, opciones)
+
+    pool = obtener_pool()
+    try:
+        # Margen para abrir y preprocesar la imagen antes de Tesseract
+        return pool.submit(leer_en_proceso, img_bytes, opciones).result(timeout=settings.OCR_TIMEOUT * 2)
+    except TimeoutFuturo:
+        # Se colgó fuera de Tesseract: se matan los procesos y el próximo pedido arma otro pool
+        _descartar_pool(pool, matar=True)
+        raise ErrorOCR("El OCR tardó demasiado") from None
+    except BrokenProcessPool:
+        # Un proceso murió (memoria): el próximo pedido arma otro pool
+        _descartar_pool(pool)
+        raise ErrorOCR("Se cayó el proceso de OCR") from None
+
+
+def extraer_texto_imagen_bytes(img_bytes: bytes, preprocesar=None) -> str:
+    """
+    Extrae texto OCR desde una imagen en memoria (bytes).
+    """
+    return leer_imagen_bytes(img_bytes, preprocesar)["texto"]
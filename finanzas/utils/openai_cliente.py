@@ -0,0 +1,73 @@
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from openai import OpenAI
+
+
+class IASaturada(Exception):
+    """
+    No se consiguió lugar entre las llamadas en curso a tiempo.
+    """
+
+
+def _opciones():
+    return {
+        "api_key": settings.OPENAI_API_KEY,
+        "base_url": settings.OPENAI_BASE_URL or None,
+        "timeout": settings.OPENAI_TIMEOUT,
+        "max_retries": settings.OPENAI_MAX_RETRIES,
+    }
+
+
+_cliente = None
+_semaforo = None
+_lock = threading.Lock()
+
+
+def obtener_cliente():
+    """
+    Cliente síncrono compartido por el proceso (reusa el pool de conexiones).
+    """
+    global _cliente
+    if _cliente is None:
+        with _lock:
+            if _cliente is None:
+                _cliente = OpenAI(**_opciones())
+    return _cliente
+
+
+def obtener_semaforo():
+    """
+    Semáforo del proceso: lo comparten todos los threads (workers de la
+    cola, polling y vistas), así el tope es uno solo.
+    """
+    global _semaforo
+    if _semaforo is None:
+        with _lock:
+            if _semaforo is None:
+                _semaforo = threading.BoundedSemaphore(settings.OPENAI_MAX_CONCURRENCIA)
+    return _semaforo
+
+
+@contextmanager
+def lugar_para_llamar():
+    """
+    Limita las llamadas simultáneas a OPENAI_MAX_CONCURRENCIA. Si no se
+    libera lugar en OPENAI_TIMEOUT segundos lanza IASaturada.
+    """
+    semaforo = obtener_semaforo()
+    if not semaforo.acquire(timeout=settings.OPENAI_TIMEOUT):
+        raise IASaturada("Demasiadas llamadas a la IA en curso")
+    try:
+        yield
+    finally:
+        semaforo.release()
+
+
+def completar_chat(**kwargs):
+    kwargs.setdefault("model", settings.OPENAI_MODELO)
+    cliente = obtener_cliente()
+    with lugar_para_llamar():
+        return cliente.chat.completions.create(**kwargs)
+
@@ -0,0 +1,66 @@
+import base64
+from datetime import date
+
+from django.db.models import Q
+
+TAMANIO_PAGINA = 20
+
+
+def codificar_cursor(fecha, id):
+    """
+    Cursor opaco con la posición (fecha, id) de la última fila entregada.
+    """
+    crudo = f"{fecha.isoformat()}|{id}".encode()
+    return base64.urlsafe_b64encode(crudo).decode().rstrip("=")
+
+
+def decodificar_cursor(cursor):
+    """
+    Devuelve (fecha, id) o lanza ValueError si el cursor no es válido.
+    """
+    try:
+        relleno = "=" * (-len(cursor) % 4)
+        crudo = base64.urlsafe_b64decode(cursor + relleno).decode()
+        fecha, id = crudo.split("|")
+        return date.fromisoformat(fecha), int(id)
+    except Exception as e:
+        raise ValueError("cursor inválido") from e
+
+
+def _valor(fila, campo):
+    return fila[campo] if isinstance(fila, dict) else getattr(fila, campo)
+
+
+def aplicar_cursor(queryset, cursor=None):
+    """
+    Ordena por (fecha, id) descendente y descarta lo ya entregado.
+    """
+    queryset = queryset.order_by('-fecha', '-id')
+    if not cursor:
+        return queryset
+
+    fecha, id = decodificar_cursor(cursor)
+    # fecha <= X acota el rango del índice; el OR resuelve los empates de fecha
+    return queryset.filter(fecha__lte=fecha).filter(
+        Q(fecha__lt=fecha) | Q(id__lt=id)
+    )
+
+
+def pagina_keyset(queryset, cursor=None, tamanio=TAMANIO_PAGINA):
+    """
+    Paginación por cursor sobre (fecha, id) descendente. Cada página es una
+    búsqueda por índice, sin OFFSET, así que la página 100 cuesta lo mismo
+    que la primera.
+
+    Devuelve (filas, siguiente_cursor); siguiente_cursor es None al final.
+    """
+    queryset = aplicar_cursor(queryset, cursor)
+
+    filas = list(queryset[:tamanio + 1])
+    siguiente = None
+    if len(filas) > tamanio:
+        filas = filas[:tamanio]
+        ultima = filas[-1]
+        siguiente = codificar_cursor(_valor(ultima, 'fecha'), _valor(ultima, 'id'))
+
+    return filas, siguiente
@@ -0,0 +1,157 @@
+import re
+
+from finanzas.utils.fechas import MESES
+from finanzas.utils.formatos import montos_en_texto, normalizar_texto
+
+# Reglas para las frases más comunes del bot ("gasté 20000 en comida el
+# 24-10-25", "hoy ingreso 150000 sueldo"). Si algo no encaja se devuelve
+# None y decide la IA: es preferible una llamada de más que un registro mal hecho.
+
+CONFIANZA = 0.9
+
+# Se buscan sobre el texto sin tildes y en minúsculas. Van primero las
+# frases de ingreso que contienen verbos de gasto ("me pagaron").
+VERBOS_INGRESO = re.compile(
+    r"\b(me (pagaron|depositaron|transfirieron|mandaron|giraron)|"
+    r"cobre|cobro|ingreso|ingrese|ingresaron|recibi|vendi|gane)\b"
+)
+VERBOS_GASTO = re.compile(
+    r"\b(gaste|gasto|pague|pago|compre|compra|abone|transferi|"
+    r"me cobraron|cargue|puse|saque|inverti)\b"
+)
+
+# Intenciones, dudas o cosas que todavía no pasaron: las resuelve la IA
+NO_OCURRIO = re.compile(
+    r"\?|\b(voy a|vamos a|tengo que|tendria|quiero|quisiera|pienso|pensaba|"
+    r"si|capaz|quizas|tal vez|podria|deberia|manana|proximo|proxima|"
+    r"gastare|pagare|comprare|cobrare|no)\b"
+)
+
+CATEGORIAS = {
+    "Comida": [
+        "comida", "almuerzo", "almorce", "cena", "cene", "desayuno", "merienda", "cafe",
+        "super", "supermercado", "chino", "verduleria", "carniceria", "panaderia",
+        "pizza", "empanadas", "delivery", "restaurante", "resto", "helado", "birra",
+        "cerveza", "asado", "hamburguesa", "sushi", "kiosco",
+    ],
+    "Salario": ["sueldo", "salario", "aguinaldo", "honorarios", "quincena"],
+    "Compras": [
+        "ropa", "zapatillas", "remera", "pantalon", "campera", "shopping",
+        "compras", "regalo", "libro", "libros", "celular nuevo", "mercado libre",
+    ],
+    "Servicios": [
+        "luz", "gas", "agua", "internet", "wifi", "telefono", "netflix", "spotify",
+        "alquiler", "expensas", "seguro", "abono", "cable", "prepaga", "gimnasio",
+    ],
+    "Transferencias": ["transferencia", "transferi", "transfirieron"],
+    "Ventas": ["venta", "vendi"],
+}
+# Categorías que por sí solas indican el tipo si no hay verbo
+TIPO_POR_CATEGORIA = {
+    "Comida": "gasto", "Servicios": "gasto", "Compras": "gasto",
+    "Salario": "ingreso", "Ventas": "ingreso",
+}
+
+_PALABRAS_CATEGORIA = re.compile(
+    r"\b(" + "|".join(
+        re.escape(palabra)
+        for palabras in CATEGORIAS.values()
+        for palabra in sorted(palabras, key=len, reverse=True)
+    ) + r")\b"
+)
+_CATEGORIA_DE = {palabra: cat for cat, palabras in CATEGORIAS.items() for palabra in palabras}
+
+# Fechas que no deben confundirse con importes ("el 24 de octubre", "24/10/25")
+FECHAS = re.compile(
+    r"\b\d{1,2}\s+de\s+(" + "|".join(MESES) + r")\b|\b\d{1,2}[/-]\d{1,2}(?:[/-]\d{2,4})?\b"
+)
+SEPARADORES = re.compile(r"(?<!\d),|,(?!\d)|;|\n|\s+y\s+|\s+e\s+")
+
+
+def _sin_fechas(texto):
+    # Se reemplaza por espacios para conservar las posiciones
+    return FECHAS.sub(lambda m: " " * len(m.group(0)), texto)
+
+
+def _tipo(texto):
+    if VERBOS_INGRESO.search(texto):
+        return "ingreso"
+    if VERBOS_GASTO.search(texto):
+        return "gasto"
+    return None
+
+
+def categoria_de(texto):
+    """
+    Categoría según las palabras del texto normalizado: "Otros" si no hay
+    ninguna y None si hay de dos categorías distintas.
+    """
+    encontradas = {_CATEGORIA_DE[m.group(1)] for m in _PALABRAS_CATEGORIA.finditer(texto)}
+    if len(encontradas) == 1:
+        return encontradas.pop()
+    return "Otros" if not encontradas else None
+
+
+def _transaccion(segmento, tipo_mensaje):
+    """
+    Una transacción a partir de un fragmento con un único importe, o None.
+    """
+    normal = normalizar_texto(segmento)
+    montos = montos_en_texto(_sin_fechas(normal))
+    if len(montos) != 1 or montos[0][0] <= 0:
+        return None
+
+    categoria = categoria_de(normal)
+    if categoria is None:
+        return None  # palabras de dos categorías: que decida la IA
+
+    tipo = _tipo(normal) or tipo_mensaje or TIPO_POR_CATEGORIA.get(categoria)
+    if tipo is None:
+        return None
+
+    return {
+        "tipo": tipo,
+        "monto": str(montos[0][0]),
+        "categoria": categoria,
+        "fecha": None,
+        "destino": None,
+        "descripcion": segmento.strip(),
+        "confidence": CONFIANZA,
+    }
+
+
+def extraer_transacciones_local(textos):
+    """
+    Extrae las transacciones sin llamar a la IA, con el mismo formato que
+    extraer_transacciones_openai. Devuelve None si algún mensaje no encaja
+    en las reglas (la fecha la resuelve después resolver_fecha).
+    """
+    transacciones = []
+    for numero, texto in enumerate(textos, start=1):
+        normal = normalizar_texto(texto)
+        if NO_OCURRIO.search(normal):
+            return None
+
+        segmentos = [texto]
+        if len(montos_en_texto(_sin_fechas(normal))) > 1:
+            # Listas tipo "café 1500, taxi 4000, super 23000"
+            segmentos = [s for s in SEPARADORES.split(texto) if s.strip()]
+
+        tipo_mensaje = _tipo(normal)
+        if tipo_mensaje is None and len(segmentos) > 1:
+            # Lista sin verbo ("café 1500, taxi 4000, super 23000"): lo que no
+            # tiene categoría va como gasto si todo lo demás es gasto
+            tipos = {TIPO_POR_CATEGORIA.get(categoria_de(normalizar_texto(s))) for s in segmentos}
+            if tipos == {"gasto", None}:
+                tipo_mensaje = "gasto"
+
+        for segmento in segmentos:
+            transaccion = _transaccion(segmento, tipo_mensaje)
+            if transaccion is None:
+                return None
+            transaccion["mensaje"] = numero
+            transacciones.append(transaccion)
+
+    if not transacciones:
+        return None
+    return {"es_transaccion": True, "transacciones": transacciones}
@@ -0,0 +1,60 @@
+from django.conf import settings
+
+from finanzas.models import Perfil
+from finanzas.utils.cache import obtener_cache
+
+# Valor guardado para los chats que no están vinculados (None no se puede
+# distinguir de "no está en la cache")
+NO_VINCULADO = 0
+
+
+def _clave_chat(chat_id):
+    return f"finanzas:chat:{chat_id}"
+
+
+def _datos(perfil):
+    return {
+        'perfil_id': perfil.id,
+        'user_id': perfil.user_id,
+    }
+
+
+def perfil_por_chat(chat_id):
+    """
+    Perfil vinculado al chat o None. Sale de la cache (sin consultas) salvo
+    la primera vez; el Perfil devuelto trae solo id, user_id y chat (el
+    estado de la IA está en control_ia), y se puede guardar con update_fields.
+    """
+    chat_id = str(chat_id)
+    cache = obtener_cache()
+    datos = cache.get(_clave_chat(chat_id))
+
+    if datos is None:
+        perfil = (
+            Perfil.objects
+            .filter(telegram_chat_id=chat_id)
+            .only('id', 'user_id', 'telegram_chat_id')
+            .first()
+        )
+        datos = _datos(perfil) if perfil else NO_VINCULADO
+        cache.set(_clave_chat(chat_id), datos, settings.BOT_PERFIL_CACHE_TIMEOUT)
+
+    if datos == NO_VINCULADO:
+        return None
+    return Perfil(
+        id=datos['perfil_id'],
+        user_id=datos['user_id'],
+        telegram_chat_id=chat_id,
+    )
+
+
+def actualizar_cache_chat(perfil):
+    if perfil.telegram_chat_id:
+        obtener_cache().set(
+            _clave_chat(perfil.telegram_chat_id), _datos(perfil), settings.BOT_PERFIL_CACHE_TIMEOUT
+        )
+
+
+def olvidar_chat(chat_id):
+    if chat_id:
+        obtener_cache().delete(_clave_chat(chat_id))
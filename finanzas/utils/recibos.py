@@ -0,0 +1,147 @@
+import re
+from datetime import date, timedelta
+
+from finanzas.utils.formatos import montos_en_texto, normalizar_texto
+from finanzas.utils.parser_local import categoria_de
+
+# Lectura de tickets a partir de los renglones del OCR (palabras con su
+# confianza). Se busca el TOTAL, la fecha y el comercio; si algo no está
+# claro baja la confianza y el bot le pasa el texto a la IA.
+
+TOTAL_FUERTE = re.compile(r"\b(total a pagar|importe total|total final)\b")
+TOTAL = re.compile(r"\btotal\b")
+# Renglones con "total" que no son el total del ticket
+NO_TOTAL = re.compile(
+    r"\b(sub\W?total|total (de )?(items|articulos|unidades|productos|ahorro|descuentos?)|"
+    r"iva|descuento|ahorro|vuelto|cant)\b"
+)
+FECHA = re.compile(r"\b(\d{1,2})[/.-](\d{1,2})[/.-](\d{2}|\d{4})\b")
+# Renglones del encabezado que no son el nombre del comercio
+NO_COMERCIO = re.compile(
+    r"\b(ticket|factura|cuit|c\.u\.i\.t|fecha|hora|iva|responsable|inscripto|"
+    r"tel|telefono|cod|nro|original|copia|consumidor|caja|cajero|ing\.? brutos)\b"
+)
+
+LINEAS_ENCABEZADO = 6
+CONFIANZA_MIN_COMERCIO = 60
+
+
+def _texto_y_posiciones(linea):
+    """
+    Une las palabras del renglón y devuelve el texto con (inicio, fin, confianza)
+    de cada palabra, para saber qué tan bien se leyó un fragmento.
+    """
+    partes, posiciones, inicio = [], [], 0
+    for palabra, confianza in linea:
+        partes.append(palabra)
+        posiciones.append((inicio, inicio + len(palabra), confianza))
+        inicio += len(palabra) + 1
+    return " ".join(partes), posiciones
+
+
+def _confianza(posiciones, inicio, fin):
+    confianzas = [c for i, f, c in posiciones if i < fin and f > inicio and c >= 0]
+    return min(confianzas) / 100 if confianzas else 0
+
+
+def _buscar_total(lineas):
+    """
+    Candidatos a total: (monto, confianza de lectura, fuerte). El importe
+    puede estar en el mismo renglón o, si no, en el siguiente.
+    """
+    candidatos = []
+    for n, linea in enumerate(lineas):
+        texto, posiciones = _texto_y_posiciones(linea)
+        normal = normalizar_texto(texto)
+        palabra = TOTAL.search(normal)
+        if not palabra or NO_TOTAL.search(normal):
+            continue
+
+        montos = montos_en_texto(normal[palabra.end():])
+        desplazamiento = palabra.end()
+        if not montos and n + 1 < len(lineas):
+            texto, posiciones = _texto_y_posiciones(lineas[n + 1])
+            montos, desplazamiento = montos_en_texto(normalizar_texto(texto)), 0
+        if not montos:
+            continue
+
+        # El importe es el último número del renglón ("TOTAL 3 $ 4.500,00")
+        monto, inicio, fin = montos[-1]
+        if monto <= 0:
+            continue
+        confianza = min(
+            _confianza(_texto_y_posiciones(linea)[1], palabra.start(), palabra.end()),
+            _confianza(posiciones, inicio + desplazamiento, fin + desplazamiento),
+        )
+        candidatos.append((monto, confianza, bool(TOTAL_FUERTE.search(normal))))
+    return candidatos
+
+
+def _buscar_fecha(lineas, hoy):
+    for linea in lineas:
+        texto, _ = _texto_y_posiciones(linea)
+        for match in FECHA.finditer(texto):
+            dia, mes, anio = (int(x) for x in match.groups())
+            if anio < 100:
+                anio += 2000
+            try:
+                fecha = date(anio, mes, dia)
+            except ValueError:
+                continue
+            # Un ticket no es del futuro ni de hace años
+            if hoy - timedelta(days=366) <= fecha <= hoy:
+                return fecha
+    return None
+
+
+def _buscar_comercio(lineas):
+    for linea in lineas[:LINEAS_ENCABEZADO]:
+        texto, posiciones = _texto_y_posiciones(linea)
+        letras = sum(c.isalpha() for c in texto)
+        if letras < 3 or letras / len(texto) < 0.6:
+            continue
+        if NO_COMERCIO.search(normalizar_texto(texto)):
+            continue
+        if _confianza(posiciones, 0, len(texto)) * 100 < CONFIANZA_MIN_COMERCIO:
+            continue
+        return texto.strip(" .:-*")[:60]
+    return None
+
+
+def analizar_recibo(lineas, hoy=None):
+    """
+    Transacción candidata a partir de los renglones OCR de un ticket, con el
+    formato de las que devuelve la IA (incluye "confidence" de 0 a 1), o None
+    si no se encontró un total.
+    """
+    hoy = hoy or date.today()
+    candidatos = _buscar_total(lineas)
+    if not candidatos:
+        return None
+
+    fuertes = [c for c in candidatos if c[2]]
+    monto, confianza, _ = max(fuertes or candidatos, key=lambda c: c[0])
+
+    # Totales distintos en el mismo ticket: no está claro cuál es
+    if len({c[0] for c in candidatos}) > 1 and not fuertes:
+        confianza *= 0.7
+
+    fecha = _buscar_fecha(lineas, hoy)
+    comercio = _buscar_comercio(lineas)
+    if fecha is None:
+        confianza *= 0.9
+    if comercio is None:
+        confianza *= 0.9
+
+    categoria = categoria_de(normalizar_texto(comercio)) if comercio else None
+
+    return {
+        "tipo": "gasto",
+        "monto": str(monto),
+        "categoria": categoria or "Otros",
+        "fecha": fecha.isoformat() if fecha else None,
+        "destino": comercio,
+        "descripcion": f"Ticket {comercio}" if comercio else "Ticket",
+        "mensaje": 1,
+        "confidence": round(confianza, 2),
+    }
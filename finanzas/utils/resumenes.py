@@ -0,0 +1,329 @@
+from decimal import Decimal
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from finanzas.models import ResumenDiario, ResumenUsuario, Transaccion
+
+CENTAVO = Decimal('0.01')
+
+
+def _delta(tipo, cantidad, signo):
+    """
+    Devuelve (ingresos, gastos) a sumar al resumen para un movimiento.
+    signo = 1 para altas, -1 para bajas.
+    """
+    cantidad = Decimal(str(cantidad)) * signo
+    if tipo == 'ingreso':
+        return cantidad, Decimal('0')
+    return Decimal('0'), cantidad
+
+
+def aplicar_movimientos(usuario_id, ingresos, gastos, cantidad):
+    """
+    Suma los deltas al resumen del usuario con un UPDATE atómico (F()).
+    Si el resumen todavía no existe se reconstruye desde la tabla; en ese
+    caso devuelve False (la reconstrucción ya refleja lo que está guardado).
+    Una baja nunca lo crea: obtener_resumen lo arma en la próxima lectura.
+    """
+    with transaction.atomic():
+        filas = ResumenUsuario.objects.filter(usuario_id=usuario_id).update(
+            ingresos=F('ingresos') + ingresos,
+            gastos=F('gastos') + gastos,
+            balance=F('balance') + ingresos - gastos,
+            cantidad_transacciones=F('cantidad_transacciones') + cantidad,
+            actualizado=timezone.now(),
+        )
+        if not filas:
+            if cantidad < 0:
+                # También pasa al borrar el usuario: no se le vuelve a crear
+                return True
+            # La reconstrucción ya incluye el movimiento recién guardado
+            recalcular_resumen(usuario_id)
+            return False
+    return True
+
+
+def aplicar_diario(usuario_id, dia, tipo, categoria, total, cantidad):
+    """
+    Suma (o resta) un movimiento a la fila de ResumenDiario correspondiente,
+    creándola si no existe y borrándola si queda vacía. Si hay que restar y
+    la fila no existe se reconstruye el día desde la tabla y devuelve False.
+    """
+    claves = {
+        'usuario_id': usuario_id,
+        'dia': dia,
+        'tipo': tipo,
+        'categoria': categoria,
+    }
+    with transaction.atomic():
+        filas = ResumenDiario.objects.filter(**claves).update(
+            total=F('total') + total,
+            cantidad=F('cantidad') + cantidad,
+        )
+        if filas:
+            if cantidad < 0:
+                ResumenDiario.objects.filter(cantidad=0, **claves).delete()
+            return True
+
+        if cantidad < 0:
+            # No había rollup para restar: el día estaba mal, se rehace
+            reconstruir_dia(usuario_id, dia)
+            return False
+
+        try:
+            with transaction.atomic():
+                ResumenDiario.objects.create(total=total, cantidad=cantidad, **claves)
+        except IntegrityError:
+            ResumenDiario.objects.filter(**claves).update(
+                total=F('total') + total,
+                cantidad=F('cantidad') + cantidad,
+            )
+    return True
+
+
+def _registrar(transaccion, signo, resumen=True, diario=True):
+    """
+    Aplica el movimiento a los resúmenes. Devuelve (resumen, diario): False
+    en cada uno que se reconstruyó desde la tabla en lugar de sumar el delta.
+    """
+    ingresos, gastos = _delta(transaccion.tipo, transaccion.cantidad, signo)
+    with transaction.atomic():
+        if resumen:
+            resumen = aplicar_movimientos(transaccion.usuario_id, ingresos, gastos, signo)
+        if diario:
+            diario = aplicar_diario(
+                transaccion.usuario_id, transaccion.fecha, transaccion.tipo,
+                transaccion.categoria, ingresos + gastos, signo,
+            )
+    return resumen, diario
+
+
+def registrar_alta(transaccion):
+    _registrar(transaccion, 1)
+
+
+def registrar_baja(transaccion):
+    _registrar(transaccion, -1)
+
+
+def registrar_edicion(previa, actual):
+    """
+    Resta los valores anteriores y suma los nuevos. Si al restar hubo que
+    reconstruir desde la tabla (que ya tiene los valores nuevos), el alta
+    no se vuelve a sumar en lo reconstruido.
+    """
+    with transaction.atomic():
+        resumen, diario = _registrar(previa, -1)
+        mismo_usuario = previa.usuario_id == actual.usuario_id
+        _registrar(
+            actual, 1,
+            resumen=resumen or not mismo_usuario,
+            diario=diario or not mismo_usuario or previa.fecha != actual.fecha,
+        )
+
+
+def aplicar_lote(usuario_id, transacciones):
+    """
+    Actualiza los resúmenes una sola vez para un lote recién insertado con
+    bulk_create (que no dispara señales).
+    """
+    ingresos = gastos = Decimal('0')
+    grupos = {}
+    for t in transacciones:
+        delta_ingresos, delta_gastos = _delta(t.tipo, t.cantidad, 1)
+        ingresos += delta_ingresos
+        gastos += delta_gastos
+        grupo = grupos.setdefault((t.fecha, t.tipo, t.categoria), [Decimal('0'), 0])
+        grupo[0] += delta_ingresos + delta_gastos
+        grupo[1] += 1
+
+    if not grupos:
+        return
+
+    with transaction.atomic():
+        aplicar_movimientos(usuario_id, ingresos, gastos, len(transacciones))
+
+        if connection.vendor in ('sqlite', 'postgresql'):
+            _upsert_diario(usuario_id, grupos)
+        else:
+            for (dia, tipo, categoria), (total, cantidad) in grupos.items():
+                aplicar_diario(usuario_id, dia, tipo, categoria, total, cantidad)
+
+
+def _upsert_diario(usuario_id, grupos):
+    """
+    INSERT ... ON CONFLICT DO UPDATE acumulando, en un solo executemany.
+    bulk_create(update_conflicts=True) pisa los valores en lugar de sumarlos.
+    """
+    tabla = connection.ops.quote_name(ResumenDiario._meta.db_table)
+    sql = (
+        f"INSERT INTO {tabla} (usuario_id, dia, tipo, categoria, total, cantidad) "
+        "VALUES (%s, %s, %s, %s, %s, %s) "
+        "ON CONFLICT (usuario_id, dia, tipo, categoria) DO UPDATE SET "
+        f"total = {tabla}.total + excluded.total, "
+        f"cantidad = {tabla}.cantidad + excluded.cantidad"
+    )
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, [
+            (
+                usuario_id, connection.ops.adapt_datefield_value(dia), tipo, categoria,
+                connection.ops.adapt_decimalfield_value(total), cantidad,
+            )
+            for (dia, tipo, categoria), (total, cantidad) in grupos.items()
+        ])
+
+
+def calcular_totales(usuario_id):
+    """
+    Totales calculados directamente sobre Transaccion (camino lento).
+    """
+    totales = Transaccion.objects.filter(usuario_id=usuario_id).aggregate(
+        ingresos=Sum('cantidad', filter=Q(tipo='ingreso')),
+        gastos=Sum('cantidad', filter=Q(tipo='gasto')),
+        cantidad=Count('id'),
+    )
+    # En SQLite la suma es de punto flotante: se redondea a centavos
+    return {
+        'ingresos': (totales['ingresos'] or Decimal('0')).quantize(CENTAVO),
+        'gastos': (totales['gastos'] or Decimal('0')).quantize(CENTAVO),
+        'cantidad': totales['cantidad'],
+    }
+
+
+def recalcular_resumen(usuario_id):
+    """
+    Reconstruye el resumen de un usuario desde cero.
+    """
+    totales = calcular_totales(usuario_id)
+    valores = {
+        'ingresos': totales['ingresos'],
+        'gastos': totales['gastos'],
+        'balance': totales['ingresos'] - totales['gastos'],
+        'cantidad_transacciones': totales['cantidad'],
+    }
+    try:
+        with transaction.atomic():
+            resumen, _ = ResumenUsuario.objects.update_or_create(
+                usuario_id=usuario_id, defaults=valores
+            )
+    except IntegrityError:
+        # Otro proceso lo creó en paralelo
+        resumen = ResumenUsuario.objects.get(usuario_id=usuario_id)
+        for campo, valor in valores.items():
+            setattr(resumen, campo, valor)
+        resumen.save()
+    return resumen
+
+
+def obtener_resumen(usuario_id):
+    """
+    Lectura O(1) de los totales del usuario.
+    """
+    resumen = ResumenUsuario.objects.filter(usuario_id=usuario_id).first()
+    if resumen is None:
+        resumen = recalcular_resumen(usuario_id)
+    return resumen
+
+
+def verificar_resumen(usuario_id):
+    """
+    Compara el resumen guardado con los totales reales.
+    Devuelve la lista de campos que no coinciden.
+    """
+    totales = calcular_totales(usuario_id)
+    resumen = ResumenUsuario.objects.filter(usuario_id=usuario_id).first()
+    if resumen is None:
+        return ['resumen inexistente']
+
+    diferencias = []
+    if resumen.ingresos != totales['ingresos']:
+        diferencias.append('ingresos')
+    if resumen.gastos != totales['gastos']:
+        diferencias.append('gastos')
+    if resumen.balance != totales['ingresos'] - totales['gastos']:
+        diferencias.append('balance')
+    if resumen.cantidad_transacciones != totales['cantidad']:
+        diferencias.append('cantidad_transacciones')
+    return diferencias
+
+
+def reconstruir_resumen_diario(usuario_id, batch_size=1000):
+    """
+    Regenera los rollups diarios de un usuario agrupando la tabla en una
+    sola consulta e insertando en lotes. Devuelve la cantidad de filas.
+    """
+    agrupado = (
+        Transaccion.objects
+        .filter(usuario_id=usuario_id)
+        .values('fecha', 'tipo', 'categoria')
+        .annotate(total=Sum('cantidad'), cantidad=Count('id'))
+        .order_by('fecha', 'tipo', 'categoria')
+    )
+
+    creadas = 0
+    with transaction.atomic():
+        ResumenDiario.objects.filter(usuario_id=usuario_id).delete()
+        lote = []
+        for fila in agrupado.iterator(chunk_size=batch_size):
+            lote.append(ResumenDiario(
+                usuario_id=usuario_id,
+                dia=fila['fecha'],
+                tipo=fila['tipo'],
+                categoria=fila['categoria'],
+                total=fila['total'],
+                cantidad=fila['cantidad'],
+            ))
+            if len(lote) >= batch_size:
+                ResumenDiario.objects.bulk_create(lote)
+                creadas += len(lote)
+                lote = []
+        if lote:
+            ResumenDiario.objects.bulk_create(lote)
+            creadas += len(lote)
+    return creadas
+
+
+def reconstruir_dia(usuario_id, dia):
+    """
+    Regenera los rollups de un solo día del usuario.
+    """
+    agrupado = (
+        Transaccion.objects
+        .filter(usuario_id=usuario_id, fecha=dia)
+        .values('tipo', 'categoria')
+        .annotate(total=Sum('cantidad'), cantidad=Count('id'))
+        .order_by()
+    )
+    with transaction.atomic():
+        ResumenDiario.objects.filter(usuario_id=usuario_id, dia=dia).delete()
+        ResumenDiario.objects.bulk_create([
+            ResumenDiario(
+                usuario_id=usuario_id, dia=dia, tipo=fila['tipo'], categoria=fila['categoria'],
+                total=Decimal(str(fila['total'])).quantize(CENTAVO), cantidad=fila['cantidad'],
+            )
+            for fila in agrupado
+        ])
+
+
+def resumen_mensual(usuario_id, desde=None, hasta=None, por_categoria=False):
+    """
+    Totales mensuales derivados de ResumenDiario.
+    Ej: [{'mes': date(2025, 10, 1), 'tipo': 'gasto', 'total': ..., 'cantidad': ...}]
+    """
+    diarios = ResumenDiario.objects.filter(usuario_id=usuario_id)
+    if desde:
+        diarios = diarios.filter(dia__gte=desde)
+    if hasta:
+        diarios = diarios.filter(dia__lte=hasta)
+
+    campos = ['mes', 'tipo'] + (['categoria'] if por_categoria else [])
+    return list(
+        diarios
+        .annotate(mes=TruncMonth('dia'))
+        .values(*campos)
+        .annotate(total=Sum('total'), cantidad=Sum('cantidad'))
+        .order_by(*campos)
+    )
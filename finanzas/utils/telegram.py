@@ -0,0 +1,330 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ConnectTimeoutError
+
+logger = logging.getLogger(__name__)
+
+# Límite de Telegram para el texto de un mensaje
+MAX_LARGO_MENSAJE = 4096
+SEPARADOR_AGRUPADOS = "\n\n"
+
+
+class ErrorTelegram(Exception):
+    pass
+
+
+class ArchivoMuyGrande(ErrorTelegram):
+    """
+    El archivo supera el máximo de bytes que se acepta descargar.
+    """
+
+
+class CuboTokens:
+    """
+    Token bucket: `tasa` envíos por segundo con ráfagas de hasta `capacidad`.
+    reservar() toma un token y devuelve cuántos segundos hay que esperar
+    para usarlo (0 si había disponible).
+    """
+
+    def __init__(self, tasa, capacidad):
+        self.tasa = tasa
+        self.capacidad = capacidad
+        self.tokens = capacidad
+        self.ultimo = time.monotonic()
+
+    def reservar(self, ahora):
+        self.tokens = min(self.capacidad, self.tokens + (ahora - self.ultimo) * self.tasa)
+        self.ultimo = ahora
+        self.tokens -= 1
+        return 0 if self.tokens >= 0 else -self.tokens / self.tasa
+
+
+class LimitadorEnvios:
+    """
+    Respeta los límites de Telegram: ~1 mensaje/s por chat y ~30/s en total.
+    Es por proceso: con varios procesos de workers conviene bajar las tasas.
+    """
+
+    MAX_CHATS = 10000
+
+    def __init__(self, tasa_global, tasa_chat, rafaga_chat=1):
+        self.lock = threading.Lock()
+        self.global_ = CuboTokens(tasa_global, tasa_global)
+        self.tasa_chat = tasa_chat
+        self.rafaga_chat = rafaga_chat
+        self.por_chat = {}
+
+    def esperar(self, chat_id):
+        with self.lock:
+            ahora = time.monotonic()
+            if len(self.por_chat) > self.MAX_CHATS:
+                # Los chats inactivos ya tienen el cubo lleno: se pueden descartar
+                self.por_chat = {
+                    chat: cubo for chat, cubo in self.por_chat.items()
+                    if ahora - cubo.ultimo < self.rafaga_chat / self.tasa_chat
+                }
+            cubo = self.por_chat.get(chat_id)
+            if cubo is None:
+                cubo = self.por_chat[chat_id] = CuboTokens(self.tasa_chat, self.rafaga_chat)
+            espera = max(cubo.reservar(ahora), self.global_.reservar(ahora))
+        if espera:
+            time.sleep(espera)
+        return espera
+
+
+class ClienteTelegram:
+    """
+    Cliente de la Bot API con una sesión HTTP compartida (keep-alive),
+    timeouts, reintentos ante 429/errores de red y límite de envíos.
+    """
+
+    def __init__(self, token, api_url, timeout, max_reintentos, max_espera, limitador):
+        self.token = token
+        self.api_url = api_url.rstrip("/")
+        self.timeout = timeout
+        self.max_reintentos = max_reintentos
+        self.max_espera = max_espera
+        self.limitador = limitador
+
+        self.session = requests.Session()
+        adaptador = HTTPAdapter(pool_connections=4, pool_maxsize=32)
+        self.session.mount("http://", adaptador)
+        self.session.mount("https://", adaptador)
+
+    def url_metodo(self, metodo):
+        return f"{self.api_url}/bot{self.token}/{metodo}"
+
+    def url_archivo(self, file_path):
+        return f"{self.api_url}/file/bot{self.token}/{file_path}"
+
+    def _espera_reintento(self, intento, respuesta=None):
+        if respuesta is not None and respuesta.status_code == 429:
+            try:
+                espera = respuesta.json()["parameters"]["retry_after"]
+            except (ValueError, KeyError, TypeError):
+                espera = 1
+        else:
+            espera = 0.5 * 2 ** intento
+        return min(espera, self.max_espera)
+
+    def _pedir(self, http, url, idempotente=True, **kwargs):
+        """
+        Hace la request reintentando ante 429, 5xx y errores de red.
+        Si no es idempotente solo se reintenta lo que seguro no llegó a
+        Telegram (no se pudo conectar o 429): tras un timeout de lectura
+        o un 5xx el mensaje puede haberse enviado igual.
+        Los demás errores HTTP se devuelven tal cual para que decida quien llama.
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        for intento in range(self.max_reintentos + 1):
+            try:
+                respuesta = self.session.request(http, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if intento == self.max_reintentos or not (idempotente or _sin_conectar(e)):
+                    raise ErrorTelegram(f"Sin respuesta de Telegram: {e}") from e
+                time.sleep(self._espera_reintento(intento))
+                continue
+
+            if respuesta.status_code != 429 and respuesta.status_code < 500:
+                return respuesta
+            if intento == self.max_reintentos or (respuesta.status_code != 429 and not idempotente):
+                break
+            espera = self._espera_reintento(intento, respuesta)
+            logger.warning(f"[Telegram] {respuesta.status_code} en {url.rsplit('/', 1)[-1]}, reintento en {espera}s")
+            # Con stream=True la conexión queda tomada hasta cerrar la respuesta
+            respuesta.close()
+            time.sleep(espera)
+
+        try:
+            raise ErrorTelegram(f"Telegram respondió {respuesta.status_code}: {respuesta.text[:200]}")
+        finally:
+            respuesta.close()
+
+    def llamar(self, metodo, timeout_http=None, **params):
+        kwargs = {"timeout": timeout_http} if timeout_http else {}
+        # sendMessage y los demás send* crean un mensaje nuevo en cada pedido
+        respuesta = self._pedir(
+            "POST", self.url_metodo(metodo), idempotente=not metodo.startswith("send"), json=params, **kwargs
+        )
+        try:
+            data = respuesta.json()
+        except ValueError:
+            raise ErrorTelegram(f"Respuesta inválida de {metodo}: {respuesta.status_code}")
+        if not data.get("ok"):
+            raise ErrorTelegram(f"{metodo}: {data.get('description')}")
+        return data
+
+    def enviar_mensaje(self, chat_id, texto):
+        """
+        Envía el mensaje respetando el límite, o lo deja en el buffer si el
+        thread está dentro de agrupar_envios().
+        """
+        pendientes = getattr(_envios, "pendientes", None)
+        if pendientes is not None:
+            pendientes.append((chat_id, texto))
+            return None
+        return self._enviar(chat_id, texto)
+
+    def _enviar(self, chat_id, texto):
+        self.limitador.esperar(str(chat_id))
+        return self.llamar("sendMessage", chat_id=chat_id, text=texto)
+
+    def obtener_archivo(self, file_id):
+        return self.llamar("getFile", file_id=file_id)
+
+    def descargar(self, file_path, max_bytes=None, timeout_total=None):
+        """
+        Descarga el archivo por partes, cortando si pasa de max_bytes o si
+        tarda más de timeout_total segundos en total.
+        """
+        max_bytes = max_bytes or settings.TELEGRAM_MAX_BYTES_DESCARGA
+        limite = time.monotonic() + (timeout_total or settings.TELEGRAM_TIMEOUT_DESCARGA)
+        with self._pedir("GET", self.url_archivo(file_path), stream=True) as respuesta:
+            respuesta.raise_for_status()
+            declarado = int(respuesta.headers.get("Content-Length") or 0)
+            if declarado > max_bytes:
+                raise ArchivoMuyGrande(f"{file_path}: {declarado} bytes (máximo {max_bytes})")
+
+            buffer = _buffer_descarga(declarado or TAMANIO_PARTE)
+            largo = 0
+            for parte in respuesta.iter_content(TAMANIO_PARTE):
+                if largo + len(parte) > max_bytes:
+                    raise ArchivoMuyGrande(f"{file_path}: más de {max_bytes} bytes")
+                if largo + len(parte) > len(buffer):
+                    buffer = _buffer_descarga(min(max_bytes, max(2 * len(buffer), largo + len(parte))), largo)
+                buffer[largo:largo + len(parte)] = parte
+                largo += len(parte)
+                if time.monotonic() > limite:
+                    raise ErrorTelegram(f"{file_path}: la descarga tardó demasiado")
+            return bytes(buffer[:largo])
+
+
+def _sin_conectar(error):
+    """
+    El error fue al conectar (DNS, conexión rechazada, timeout de conexión):
+    el pedido no llegó a Telegram.
+    """
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    if isinstance(error, requests.Timeout):
+        return False
+    causa = error.args[0] if error.args else None
+    # MaxRetryError trae el error original en .reason
+    return isinstance(getattr(causa, "reason", causa), ConnectTimeoutError)
+
+
+def elegir_foto(fotos, lado_minimo, max_bytes=None):
+    """
+    De las resoluciones (PhotoSize) de una foto, la más chica cuyo lado mayor
+    llega a lado_minimo, o la más grande si ninguna llega. Si se puede,
+    entre las que no pasan de max_bytes.
+    """
+    entran = [f for f in fotos if not max_bytes or f.get("file_size", 0) <= max_bytes]
+    candidatas = sorted(entran or fotos, key=lambda f: f.get("width", 0) * f.get("height", 0))
+    for foto in candidatas:
+        if max(foto.get("width", 0), foto.get("height", 0)) >= lado_minimo:
+            return foto
+    return candidatas[-1]
+
+
+# Las descargas se escriben en un buffer por thread que se reusa entre
+# archivos: crece hasta el más grande que se bajó y no se vuelve a pedir.
+TAMANIO_PARTE = 64 * 1024
+_descargas = threading.local()
+
+
+def _buffer_descarga(tamanio, conservar=0):
+    """
+    Buffer del thread con lugar para `tamanio` bytes; si hay que agrandarlo
+    copia los primeros `conservar` bytes.
+    """
+    buffer = getattr(_descargas, "buffer", None)
+    if buffer is None or len(buffer) < tamanio:
+        nuevo = memoryview(bytearray(tamanio))
+        if conservar:
+            nuevo[:conservar] = buffer[:conservar]
+        _descargas.buffer = buffer = nuevo
+    return buffer
+
+
+def agrupar_mensajes(mensajes):
+    """
+    Une los mensajes consecutivos al mismo chat en uno solo (sin pasar
+    MAX_LARGO_MENSAJE). Devuelve la lista de (chat_id, texto) a enviar.
+    """
+    agrupados = []
+    for chat_id, texto in mensajes:
+        if agrupados:
+            ultimo_chat, ultimo_texto = agrupados[-1]
+            unido = ultimo_texto + SEPARADOR_AGRUPADOS + texto
+            if ultimo_chat == chat_id and len(unido) <= MAX_LARGO_MENSAJE:
+                agrupados[-1] = (chat_id, unido)
+                continue
+        agrupados.append((chat_id, texto))
+    return agrupados
+
+
+_envios = threading.local()
+
+
+@contextmanager
+def agrupar_envios():
+    """
+    Junta los send_message hechos dentro del bloque y al salir los envía
+    agrupados: la respuesta a un update sale en un solo mensaje por chat.
+    Si el bloque termina con una excepción no se envía nada: el update se
+    reintenta (o se da por fallido) y las respuestas a medias se descartan.
+    """
+    if getattr(_envios, "pendientes", None) is not None:
+        # Ya estamos agrupando (bloques anidados): lo envía el de afuera
+        yield
+        return
+
+    _envios.pendientes = []
+    try:
+        yield
+    except BaseException:
+        descartados, _envios.pendientes = _envios.pendientes, None
+        if descartados:
+            logger.warning(f"[Telegram] Se descartan {len(descartados)} mensajes por un error")
+        raise
+
+    mensajes, _envios.pendientes = _envios.pendientes, None
+    cliente = obtener_cliente()
+    for chat_id, texto in agrupar_mensajes(mensajes):
+        try:
+            cliente._enviar(chat_id, texto)
+        except ErrorTelegram as e:
+            logger.error(f"[Telegram] No se pudo enviar a {chat_id}: {e}")
+
+
+_cliente = None
+_cliente_lock = threading.Lock()
+
+
+def obtener_cliente():
+    """
+    Cliente compartido por todo el proceso (una sola sesión y un solo limitador).
+    """
+    global _cliente
+    if _cliente is None:
+        with _cliente_lock:
+            if _cliente is None:
+                _cliente = ClienteTelegram(
+                    token=settings.TELEGRAM_TOKEN,
+                    api_url=settings.TELEGRAM_API_URL,
+                    timeout=(settings.TELEGRAM_TIMEOUT_CONEXION, settings.TELEGRAM_TIMEOUT_LECTURA),
+                    max_reintentos=settings.TELEGRAM_MAX_REINTENTOS,
+                    max_espera=settings.TELEGRAM_MAX_ESPERA_REINTENTO,
+                    limitador=LimitadorEnvios(
+                        tasa_global=settings.TELEGRAM_MENSAJES_POR_SEGUNDO,
+                        tasa_chat=settings.TELEGRAM_MENSAJES_POR_CHAT,
+                    ),
+                )
+    return _cliente
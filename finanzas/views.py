@@ -3,36 +3,56 @@ from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
 from django.contrib.auth import login, authenticate, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Sum
+from django.conf import settings
+from django.db import transaction
 from .models import Transaccion, Categoria, Perfil, Notificacion
 from decimal import Decimal
 from datetime import datetime, date, timedelta
-import os, string, json, requests, random
+import io, string, json, random
 import logging
-from django.http import JsonResponse,HttpResponse
+from django.http import JsonResponse,HttpResponse, FileResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import condition
 import re
-import plotly.graph_objects as go
-from plotly.offline import plot
-from django.db.models.functions import TruncDay
-import pandas as pd
-from django.utils.timezone import now
-from finanzas.utils.ocr import extraer_texto_imagen_bytes
+import requests
+from django.utils.timezone import localtime, now
+from finanzas.utils.cache_ocr import buscar_repetido, marcar_registrado, obtener_resultado
+from finanzas.utils.ocr import PDF_DISPONIBLE, ErrorOCR
 from dotenv import load_dotenv
-from openai import OpenAI
 from finanzas.utils.fechas import resolver_fecha
 from finanzas.utils.control_ia import (
+    consumir_llamada_ia,
     ia_bloqueada,
     registrar_no_transaccion,
     registrar_transaccion_valida
 )
 from finanzas.utils.formatos import formatear_pesos
-from finanzas.utils.graficos import generar_grafico_balance
+from finanzas.utils.graficos import MAX_PUNTOS, serie_balance
+from finanzas.utils.cola_bot import encolar_update, limpiar_updates, marcar_update
+from finanzas.utils.telegram import ArchivoMuyGrande, ErrorTelegram, agrupar_envios, elegir_foto, obtener_cliente
+from finanzas.utils.parser_local import extraer_transacciones_local
+from finanzas.utils.cache_ia import buscar_extraccion, guardar_extraccion
+from finanzas.utils.openai_cliente import IASaturada, completar_chat
+from finanzas.utils.perfiles import perfil_por_chat
+from finanzas.utils.resumenes import obtener_resumen
+from finanzas.utils.filtros import calcular_facetas, filtrar_transacciones
+from finanzas.utils.paginacion import pagina_keyset
+from finanzas.utils.importacion import ErrorImportacion, guardar_lote, importar_transacciones, lector_para
+from finanzas.utils.exportacion import generar_csv, generar_xlsx
+from finanzas.utils.cache import (
+    cacheado,
+    invalidar_notificaciones,
+    version_notificaciones,
+    version_usuario,
+)
+from django.template.defaultfilters import date as date_format, floatformat
 
 load_dotenv()
 # Cargar también .env.local para permitir OPENAI_API_KEY local
 load_dotenv(".env.local", override=True)
-TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN")
+
+# Cada cuántos updates el webhook borra los update_id viejos
+LIMPIAR_UPDATES_CADA = 1000
 
 # Logger de módulo
 logger = logging.getLogger(__name__)
@@ -66,46 +86,71 @@ def register_view(request):
         form = UserCreationForm()
     return render(request, 'finanzas/register.html', {'form': form})
 
-@login_required
-def dashboard(request):
-    notificaciones = Notificacion.objects.filter(leido=False).order_by('-fecha')
-    noti_count = notificaciones.count()
-
-    movimientos_recientes = (
+def _contexto_dashboard(usuario):
+    movimientos_recientes = list(
         Transaccion.objects
-        .filter(usuario=request.user)
+        .filter(usuario=usuario)
         .order_by('-fecha', '-id')[:5]
     )
 
-    ingresos = Transaccion.objects.filter(
-        usuario=request.user, tipo='ingreso'
-    ).aggregate(total=Sum('cantidad'))['total'] or 0
-
-    gastos = Transaccion.objects.filter(
-        usuario=request.user, tipo='gasto'
-    ).aggregate(total=Sum('cantidad'))['total'] or 0
-
-    balance = ingresos - gastos
-
-    chart_html = generar_grafico_balance(request.user)
-    print("INGRESOS RAW:", ingresos, type(ingresos))
-    print("GASTOS RAW:", gastos, type(gastos))
-    print("BALANCE RAW:", balance, type(balance))
+    # Totales precalculados (se mantienen en cada alta/baja)
+    resumen = obtener_resumen(usuario.id)
 
-    context = {
+    return {
         "transacciones": movimientos_recientes,
-        "ingresos": formatear_pesos(ingresos),
-        "gastos": formatear_pesos(gastos),
-        "balance": formatear_pesos(balance),
-        "chart": chart_html,
-        "notificaciones": notificaciones,
-        "noti_count": noti_count,
+        "ingresos": formatear_pesos(resumen.ingresos),
+        "gastos": formatear_pesos(resumen.gastos),
+        "balance": formatear_pesos(resumen.balance),
     }
 
+def _notificaciones_pendientes():
+    return list(Notificacion.objects.filter(leido=False).order_by('-fecha'))
+
+@login_required
+def dashboard(request):
+    # Se recalcula solo cuando cambia la versión de datos del usuario
+    # (las señales de Transaccion la cambian en cada alta/baja)
+    context = dict(cacheado(
+        f"dashboard:{request.user.id}",
+        version_usuario(request.user.id),
+        lambda: _contexto_dashboard(request.user),
+    ))
+
+    notificaciones = cacheado(
+        "notificaciones", version_notificaciones(), _notificaciones_pendientes
+    )
+    context["notificaciones"] = notificaciones
+    context["noti_count"] = len(notificaciones)
+
     return render(request, "finanzas/dashboard.html", context)
 
+def _puntos_grafico(request):
+    try:
+        return min(max(int(request.GET.get("puntos", MAX_PUNTOS)), 10), 1000)
+    except ValueError:
+        return MAX_PUNTOS
+
+def _etag_grafico(request):
+    return f"{version_usuario(request.user.id)}-{_puntos_grafico(request)}"
+
+@login_required
+@condition(etag_func=_etag_grafico)
+def api_grafico_balance(request):
+    """
+    Serie del gráfico en JSON compacto. El ETag es la versión de datos del
+    usuario: mientras no cambie el navegador recibe un 304 sin cuerpo.
+    """
+    puntos = _puntos_grafico(request)
+    serie = cacheado(
+        f"grafico:{request.user.id}:{puntos}",
+        version_usuario(request.user.id),
+        lambda: serie_balance(request.user, puntos),
+    )
+    return JsonResponse(serie)
+
 def marcar_notificaciones_leidas(request):
     Notificacion.objects.filter(leido=False).update(leido=True)
+    invalidar_notificaciones()
     return JsonResponse({"ok": True})
 
 def logout_view(request):
@@ -123,16 +168,17 @@ def nuevo_registro(request):
         destino = request.POST.get("destino")
         fecha = request.POST.get("fecha")
 
-        # Crear y guardar la transacción
-        Transaccion.objects.create(
-            usuario=request.user,
-            tipo=tipo,
-            cantidad=cantidad,
-            descripcion=descripcion,
-            categoria=categoria,
-            destino=destino if destino else None,
-            fecha=fecha
-        )
+        # Crear y guardar la transacción (junto con el resumen del usuario)
+        with transaction.atomic():
+            Transaccion.objects.create(
+                usuario=request.user,
+                tipo=tipo,
+                cantidad=cantidad,
+                descripcion=descripcion,
+                categoria=categoria,
+                destino=destino if destino else None,
+                fecha=fecha
+            )
 
         # Redirigir a dashboard u otra página
         return redirect("dashboard")
@@ -143,28 +189,125 @@ def nuevo_registro(request):
 
 @login_required
 def historial_transacciones(request):
-    transacciones = Transaccion.objects.filter(usuario=request.user).order_by('-fecha', '-id')
+    transacciones = filtrar_transacciones(request.user, request.GET)
 
     # Obtener categorías únicas de las transacciones del usuario para el filtro
     categorias = Transaccion.CATEGORIA_CHOICES
 
-    # Filtros por fecha o categoría
-    fecha_filtro = request.GET.get('fecha')
-    categoria_filtro = request.GET.get('categoria')
-
-    if fecha_filtro:
-        transacciones = transacciones.filter(fecha=fecha_filtro)
-    if categoria_filtro:
-        transacciones = transacciones.filter(categoria=categoria_filtro)
+    # Conteos y totales del filtro actual (una sola consulta agrupada)
+    facetas = calcular_facetas(transacciones)
+    facetas_categoria = [
+        {
+            "valor": valor,
+            "n": faceta["n"],
+            "ingreso": formatear_pesos(faceta["ingreso"]) if faceta["ingreso"] else None,
+            "gasto": formatear_pesos(faceta["gasto"]) if faceta["gasto"] else None,
+        }
+        for valor, _ in categorias
+        if (faceta := facetas["por_categoria"].get(valor))
+    ]
+    facetas_tipo = [
+        {"valor": valor, "n": faceta["n"], "total": formatear_pesos(faceta["total"])}
+        for valor, _ in Transaccion.TIPO_CHOICES
+        if (faceta := facetas["por_tipo"].get(valor))
+    ]
+
+    # Primera página; las siguientes se piden a api_transacciones con el cursor
+    try:
+        transacciones, siguiente_cursor = pagina_keyset(transacciones, request.GET.get('cursor'))
+    except ValueError:
+        transacciones, siguiente_cursor = pagina_keyset(transacciones)
 
-    transacciones = transacciones[:20]
+    # Querystring de la página siguiente (conserva los filtros)
+    siguiente_query = None
+    if siguiente_cursor:
+        params = request.GET.copy()
+        params['cursor'] = siguiente_cursor
+        siguiente_query = params.urlencode()
 
     context = {
         'transacciones': transacciones,
          "categorias": categorias,
+        'siguiente_cursor': siguiente_cursor,
+        'siguiente_query': siguiente_query,
+        'categorias_seleccionadas': request.GET.getlist('categoria'),
+        'facetas_categoria': facetas_categoria,
+        'facetas_tipo': facetas_tipo,
     }
     return render(request, 'finanzas/historial_transacciones.html', context)
 
+@login_required
+def api_transacciones(request):
+    """
+    Página de transacciones en JSON para el scroll infinito del historial.
+    Acepta los mismos filtros que historial_transacciones más ?cursor=.
+    """
+    transacciones = (
+        filtrar_transacciones(request.user, request.GET)
+        .values('id', 'fecha', 'tipo', 'categoria', 'descripcion', 'cantidad')
+    )
+
+    try:
+        filas, siguiente_cursor = pagina_keyset(transacciones, request.GET.get('cursor'))
+    except ValueError:
+        return JsonResponse({"error": "cursor inválido"}, status=400)
+
+    # Mismo formato que aplica el template
+    for fila in filas:
+        fila["fecha"] = date_format(fila["fecha"], "j-n-y")
+        fila["cantidad"] = floatformat(fila["cantidad"], 2)
+
+    return JsonResponse({"transacciones": filas, "siguiente": siguiente_cursor})
+
+
+@login_required
+def importar(request):
+    if request.method == "POST":
+        archivo = request.FILES.get("archivo")
+        if not archivo:
+            messages.error(request, "Seleccioná un archivo CSV u OFX.")
+            return redirect("importar_transacciones")
+
+        try:
+            lector = lector_para(archivo.name, request.POST.get("formato") or None)
+            # Se lee como texto en streaming, sin cargar el archivo entero
+            texto = io.TextIOWrapper(archivo.file, encoding="utf-8-sig", errors="replace", newline="")
+            creadas, omitidas, errores = importar_transacciones(request.user, lector(texto))
+        except ErrorImportacion as e:
+            messages.error(request, str(e))
+            return redirect("importar_transacciones")
+
+        messages.success(request, f"Se importaron {creadas} transacciones.")
+        if omitidas:
+            detalle = "; ".join(f"fila {numero}: {motivo}" for numero, motivo in errores[:5])
+            messages.warning(request, f"Se omitieron {omitidas} filas ({detalle}).")
+        return redirect("historial_transacciones")
+
+    return render(request, "finanzas/importar.html")
+
+
+@login_required
+def exportar(request):
+    """
+    Exporta las transacciones con los mismos filtros del historial.
+    El CSV se genera por partes (memoria constante sin importar el tamaño);
+    el Excel se arma entero en un archivo temporal y después se envía.
+    """
+    transacciones = filtrar_transacciones(request.user, request.GET)
+    nombre = f"controlcash_{date.today().isoformat()}"
+
+    if request.GET.get("formato") == "xlsx":
+        try:
+            archivo = generar_xlsx(transacciones)
+        except RuntimeError as e:
+            messages.error(request, str(e))
+            return redirect("historial_transacciones")
+        return FileResponse(archivo, as_attachment=True, filename=f"{nombre}.xlsx")
+
+    response = StreamingHttpResponse(generar_csv(transacciones), content_type="text/csv; charset=utf-8")
+    response["Content-Disposition"] = f'attachment; filename="{nombre}.csv"'
+    return response
+
 
 @csrf_exempt
 def webhook(request):
@@ -172,34 +315,38 @@ def webhook(request):
         return JsonResponse({"status": "invalid method"})
 
     data = json.loads(request.body)
+    update_id = data.get("update_id")
+
+    if settings.TELEGRAM_WEBHOOK_ASINCRONO:
+        # Se guarda y se responde enseguida; lo procesa run_bot_workers.
+        # Marca y encolado van juntos: si falla uno, Telegram lo reenvía.
+        with transaction.atomic():
+            if marcar_update(update_id):
+                encolar_update(data)
+    elif marcar_update(update_id):
+        # Sin cola: se marca antes de procesar (a lo sumo una vez)
+        procesar_update(data)
+
+    # Limpieza ocasional de los update_id viejos
+    if update_id and update_id % LIMPIAR_UPDATES_CADA == 0:
+        limpiar_updates()
 
-    if "message" in data:
-        # 📌 Si el usuario envía una FOTO → usar OCR
-        if "photo" in data["message"]:
-            chat_id = data["message"]["chat"]["id"]
-
-            # Foto de mayor resolución
-            file_id = data["message"]["photo"][-1]["file_id"]
-
-            # Obtener info del archivo desde Telegram
-            file_info = get_file_info(file_id)
-            file_path = file_info["result"]["file_path"]
-            url = f"https://api.telegram.org/file/bot{TELEGRAM_TOKEN}/{file_path}"
-
-            # Descargar imagen en memoria
-            img_bytes = requests.get(url).content
-
-            texto = extraer_texto_imagen_bytes(img_bytes)
+    return JsonResponse({"status": "ok"})
 
-            if texto:
-                try:
-                    procesar_mensaje_usuario(chat_id, texto)
-                except Exception as e:
-                    send_message(chat_id, f"Error interno procesando OCR: {e}")
-            else:
-                send_message(chat_id, "No pude leer ningún texto en la imagen 😕")
+def procesar_update(data):
+    """
+    Procesa un update de Telegram (lo usan el webhook y los workers de la cola).
+    Las respuestas al chat se juntan y salen en un solo mensaje al terminar.
+    """
+    with agrupar_envios():
+        _procesar_update(data)
 
-            return JsonResponse({"status": "ok"})
+def _procesar_update(data):
+    if "message" in data:
+        # 📌 Si el usuario envía una FOTO (o un ticket como archivo) → usar OCR
+        if "photo" in data["message"] or "document" in data["message"]:
+            procesar_imagen(data["message"])
+            return
 
         chat_id = data["message"]["chat"]["id"]
         text = data["message"].get("text", "")
@@ -207,13 +354,13 @@ def webhook(request):
         # Si es comando para vincular
         if text.startswith("/vincular"):
         # 1️⃣ Verificar si este chat YA está vinculado
-            if Perfil.objects.filter(telegram_chat_id=chat_id).exists():
+            if perfil_por_chat(chat_id) is not None:
                 send_message(
                     chat_id,
                     "📣 Este chat ya está vinculado a una cuenta de ControlCash.\n"
                     "Si necesitás cambiar la vinculación, desvincula este dispositivo desde la web."
                 )
-                return JsonResponse({"status": "ok"})
+                return
 
             # 2️⃣ Obtener código
             try:
@@ -221,7 +368,7 @@ def webhook(request):
                 codigo = codigo.strip()
             except ValueError:
                 send_message(chat_id, "Formato incorrecto. Usá: /vincular CODIGO")
-                return JsonResponse({"status": "ok"})
+                return
 
             # 3️⃣ Validar código
             try:
@@ -232,18 +379,18 @@ def webhook(request):
                     "❌ Código inválido.\n"
                     "Respetá mayúsculas y números u obtené un código válido desde la web."
                 )
-                return JsonResponse({"status": "ok"})
+                return
 
-            # Vincular
-            perfil.telegram_chat_id = chat_id
+            # Vincular (la señal de Perfil actualiza la cache del chat)
+            perfil.telegram_chat_id = str(chat_id)
             perfil.telegram_code = None
-            perfil.save()
+            perfil.save(update_fields=["telegram_chat_id", "telegram_code"])
             nombre = perfil.user.username
             mensaje = f"Hola {nombre} 👋.Te vinculaste correctamente.\nDime la primer transacción que quieras que registre por favor."
             send_message(chat_id, mensaje)
             mensaje = "⚠️Recuerda detallar la fecha de la transacción, sino considero que es de hoy 😊.\nEnvía /ayuda para conocer qué comandos manejamos."
             send_message(chat_id, mensaje)
-            return JsonResponse({"status": "ok"})
+            return
         elif text.strip() == "/ayuda":
             send_message(
                 chat_id,
@@ -253,23 +400,18 @@ def webhook(request):
                 "/saldo - Ver tu saldo actual\n"
                 "Puedes escribir: 'gasté 20000 en comida el 24-10-25', 'hoy ingreso 150000 sueldo', o de la forma que quieras expresarte.0"
             )
-            return JsonResponse({"status": "ok"})
+            return
 
         elif text.strip() == "/saldo":
-            perfil = Perfil.objects.get(telegram_chat_id=chat_id)
-            usuario = perfil.user
-
-            ingresos = Transaccion.objects.filter(
-                usuario=usuario,
-                tipo='ingreso'
-            ).aggregate(total=Sum('cantidad'))['total'] or Decimal('0')
-            
-            gastos = Transaccion.objects.filter(
-                usuario=usuario,
-                tipo='gasto'
-            ).aggregate(total=Sum('cantidad'))['total'] or Decimal('0')
-            
-            balance = ingresos - gastos
+            perfil = perfil_por_chat(chat_id)
+            if perfil is None:
+                send_message(chat_id, "Tu cuenta no está vinculada. Vinculá desde la web.")
+                return
+
+            resumen = obtener_resumen(perfil.user_id)
+            ingresos = resumen.ingresos
+            gastos = resumen.gastos
+            balance = resumen.balance
 
             mensaje = (
                 "💰 Saldo cta PESOS: "
@@ -280,23 +422,113 @@ def webhook(request):
             )
 
             send_message(chat_id, mensaje)
-            return JsonResponse({"status": "ok"})
+            return
+
+        # Cualquier otro mensaje
+        procesar_textos(chat_id, [text])
+
+def elegir_archivo(mensaje):
+    """
+    Archivo a leer de una foto o documento, o (None, motivo para el usuario).
+    De una foto se baja la resolución más chica que alcanza para el OCR.
+    """
+    if "photo" in mensaje:
+        return elegir_foto(mensaje["photo"], settings.OCR_LADO_FOTO, settings.TELEGRAM_MAX_BYTES_DESCARGA), None
+
+    documento = mensaje["document"]
+    tipo = documento.get("mime_type") or ""
+    if tipo == "application/pdf":
+        if not PDF_DISPONIBLE:
+            return None, "Por ahora no puedo leer PDFs 😕 Mandame una foto del ticket."
+    elif not tipo.startswith("image/"):
+        return None, "Sólo puedo leer fotos o PDFs de tickets 🧾"
+    if documento.get("file_size", 0) > settings.TELEGRAM_MAX_BYTES_DESCARGA:
+        return None, "El archivo es demasiado grande 😕"
+    return documento, None
+
+def procesar_imagen(mensaje):
+    chat_id = mensaje["chat"]["id"]
+    perfil = perfil_por_chat(chat_id)
+    if perfil is None:
+        send_message(chat_id, "Tu cuenta no está vinculada. Vinculá desde la web.")
+        return
 
-        # Cualquier otro mensaje → verificar si está vinculado
-        try:
-            perfil = Perfil.objects.get(telegram_chat_id=chat_id)
-        except Perfil.DoesNotExist:
-            send_message(chat_id, "¡Hola!👋 Notamos que no estás vinculado al sistema ControlCash.\nEnvianos /vincular codigo_de_vinculacion para poder utilizar este bot.\nSi no tienes una cuenta puedes registrarte en https://terence-fibrotic-communicably.ngrok-free.dev/")
-            return JsonResponse({"status": "ok"})
+    archivo, motivo = elegir_archivo(mensaje)
+    if archivo is None:
+        send_message(chat_id, motivo)
+        return
 
-        # Usuario vinculado → procesar su mensaje
-        # Ejemplo: solo repetimos
-        try:
-            procesar_mensaje_usuario(chat_id, text)
-        except Exception as e:
-            send_message(chat_id, f"Error interno: {e}")
+    def descargar():
+        # Obtener info del archivo desde Telegram y descargarlo en memoria
+        file_info = get_file_info(archivo["file_id"])
+        return obtener_cliente().descargar(file_info["result"]["file_path"])
 
-    return JsonResponse({"status": "ok"})
+    # Si ya se leyó esta imagen no se descarga ni se pasa por OCR de nuevo
+    try:
+        resultado, conocido = obtener_resultado(perfil.user_id, archivo.get("file_unique_id"), descargar)
+    except ArchivoMuyGrande:
+        send_message(chat_id, "El archivo es demasiado grande 😕")
+        return
+    except (ErrorOCR, ErrorTelegram, requests.RequestException) as e:
+        # Reintentar el trabajo no arregla una foto ilegible ni un OCR colgado
+        logger.warning(f"[OCR] No se pudo leer la imagen de {chat_id}: {e!r}")
+        send_message(chat_id, "No pude leer la imagen 😕 Probá con otra foto o mandá el gasto como texto.")
+        return
+    repetido = buscar_repetido(resultado, conocido)
+    if repetido:
+        send_message(
+            chat_id,
+            f"⚠️ Esta foto parece la del ticket que enviaste el "
+            f"{localtime(repetido.registrado):%d/%m/%Y}, ya está registrado.\n"
+            "Si es otra compra, cargala a mano o mandala como texto."
+        )
+        return
+
+    if not resultado.texto:
+        send_message(chat_id, "No pude leer ningún texto en la imagen 😕")
+        return
+
+    try:
+        recibo = resultado.recibo
+        # Sin fecha no se registra directo: quedaría con la de hoy
+        if recibo and recibo["fecha"] and recibo["confidence"] >= settings.OCR_RECIBO_CONFIANZA:
+            # Ticket legible: se registra sin pasar por la IA. La fecha sale
+            # solo de la leída del ticket, no del comercio ("Sábado Market")
+            nuevas = procesar_mensajes_usuario(
+                chat_id, [recibo["descripcion"]], perfil,
+                data={"es_transaccion": True, "transacciones": [recibo]},
+                textos_fecha=[date.fromisoformat(recibo["fecha"]).strftime("%d/%m/%Y")],
+            )
+        else:
+            nuevas = procesar_mensaje_usuario(chat_id, resultado.texto, perfil)
+        if nuevas:
+            marcar_registrado(resultado)
+    except Exception as e:
+        send_message(chat_id, f"Error interno procesando OCR: {e}")
+
+def procesar_updates(updates):
+    """
+    Procesa varios updates de texto seguidos del mismo chat (agrupados por
+    la cola o el polling) con una sola extracción.
+    """
+    if len(updates) == 1:
+        return procesar_update(updates[0])
+    with agrupar_envios():
+        chat_id = updates[0]["message"]["chat"]["id"]
+        procesar_textos(chat_id, [u["message"]["text"] for u in updates])
+
+def procesar_textos(chat_id, textos):
+    # Verificar si está vinculado
+    perfil = perfil_por_chat(chat_id)
+    if perfil is None:
+        send_message(chat_id, "¡Hola!👋 Notamos que no estás vinculado al sistema ControlCash.\nEnvianos /vincular codigo_de_vinculacion para poder utilizar este bot.\nSi no tienes una cuenta puedes registrarte en " + settings.SITIO_URL)
+        return
+
+    # Usuario vinculado → procesar sus mensajes
+    try:
+        procesar_mensajes_usuario(chat_id, textos, perfil)
+    except Exception as e:
+        send_message(chat_id, f"Error interno: {e}")
 
 def generar_codigo():
     return ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
@@ -306,8 +538,12 @@ def vincular_telegram(request):
     perfil, _ = Perfil.objects.get_or_create(user=request.user)
 
     if not perfil.telegram_code:
-        perfil.telegram_code = generar_codigo()
-        perfil.save()
+        codigo = generar_codigo()
+        # telegram_code es único: ante una colisión se genera otro
+        while Perfil.objects.filter(telegram_code=codigo).exists():
+            codigo = generar_codigo()
+        perfil.telegram_code = codigo
+        perfil.save(update_fields=["telegram_code"])
 
     usuario_vinculado = perfil.telegram_chat_id not in [None, ""]
 
@@ -326,8 +562,9 @@ def terminos(request):
 @login_required
 def eliminar_transaccion(request, id):
     if request.method == "POST":
-        transaccion = get_object_or_404(Transaccion, id=id)
-        transaccion.delete()
+        transaccion = get_object_or_404(Transaccion, id=id, usuario=request.user)
+        with transaction.atomic():
+            transaccion.delete()
         messages.success(request, "Transacción eliminada correctamente.")
     # Redirige a la vista que carga las transacciones
     return redirect('historial_transacciones') 
@@ -336,17 +573,31 @@ def eliminar_transaccion(request, id):
 def desvincular_telegram(request):
     if request.method == "POST":
         perfil = request.user.perfil
-        perfil.telegram_chat_id = ""
-        perfil.save()
+        perfil.telegram_chat_id = None
+        perfil.save(update_fields=["telegram_chat_id"])
         messages.success(request, "Tu cuenta fue desvinculada correctamente.")
 
     return redirect('dashboard')
 
-def procesar_mensaje_usuario(chat_id, text):
-    try:
-        perfil = Perfil.objects.get(telegram_chat_id=chat_id)
-        usuario = perfil.user
-    except Perfil.DoesNotExist:
+CATEGORIAS_VALIDAS = {
+    "Comida", "Salario", "Compras",
+    "Transferencias", "Servicios",
+    "Ventas", "Otros"
+}
+
+def procesar_mensaje_usuario(chat_id, text, perfil=None):
+    return procesar_mensajes_usuario(chat_id, [text], perfil)
+
+def procesar_mensajes_usuario(chat_id, textos, perfil=None, data=None, textos_fecha=None):
+    """
+    Extrae y registra las transacciones de uno o varios mensajes seguidos
+    del mismo chat con una sola llamada a la IA y un solo bulk_create.
+    Si ya vienen extraídas en `data` (un ticket leído por OCR) no se llama a la IA.
+    Las fechas se resuelven sobre `textos_fecha` si se pasa (uno por mensaje).
+    Devuelve las transacciones registradas.
+    """
+    perfil = perfil or perfil_por_chat(chat_id)
+    if perfil is None:
         send_message(chat_id, "Tu cuenta no está vinculada. Vinculá desde la web.")
         return
 
@@ -359,147 +610,228 @@ def procesar_mensaje_usuario(chat_id, text):
         )
         return
 
-    # 🤖 2) LLAMADA A LA IA
-    data, err = extraer_transaccion_openai(text)
-    if err or not data:
-        registrar_no_transaccion(perfil)
-        logger.error(f"[Bot] Error IA: err={err} data={data}")
-        send_message(chat_id, "No pude entender la transacción 😕")
-        return
-
-    # 🛑 3) NO ES TRANSACCIÓN (suposición / futuro / idea)
-    if not data.get("es_transaccion", True):
-        registrar_no_transaccion(perfil)
+    # ⚡ 2) Frases comunes → reglas locales; si no encajan, LLAMADA A LA IA
+    # (todas las transacciones de todos los mensajes en una sola llamada)
+    err = None
+    if data is None and settings.BOT_PARSER_LOCAL:
+        data = extraer_transacciones_local(textos)
+    if data is None:
+        data, err = extraer_transacciones_openai(textos, perfil.user_id)
+    if err == "sin_cupo":
+        # No es culpa del mensaje: no suma strike
         send_message(
             chat_id,
-            "ℹ️ Parece que compartiste una idea o una compra futura.\n"
-            "Sólo registro transacciones que ya ocurrieron."
+            "⏳ Llegaste al límite de mensajes que puedo interpretar por ahora.\n"
+            "Probá de nuevo en un rato o cargalo desde la web."
         )
         return
-
-    # 🧾 4) VALIDACIONES DE NEGOCIO
-    if not data.get("tipo") or not data.get("monto"):
+    if err or data is None:
         registrar_no_transaccion(perfil)
-        send_message(chat_id, "Falta información clave (tipo o monto). ¿Podés aclararlo?")
+        logger.error(f"[Bot] Error IA: err={err} data={data}")
+        send_message(chat_id, "No pude entender la transacción 😕")
         return
 
-    fecha = resolver_fecha(text, data)
-
-    tipo = data["tipo"].lower()
-    if tipo not in {"ingreso", "gasto"}:
+    # 🛑 3) NO ES TRANSACCIÓN (suposición / futuro / idea)
+    if not data["transacciones"]:
         registrar_no_transaccion(perfil)
-        send_message(chat_id, "No pude determinar si es ingreso o gasto.")
+        if not data["es_transaccion"]:
+            send_message(
+                chat_id,
+                "ℹ️ Parece que compartiste una idea o una compra futura.\n"
+                "Sólo registro transacciones que ya ocurrieron."
+            )
+        else:
+            send_message(chat_id, "No pude entender la transacción 😕")
         return
 
-    try:
-        monto = Decimal(str(data["monto"]))
-    except Exception:
+    # 🧾 4) VALIDACIONES DE NEGOCIO (por cada transacción)
+    nuevas, a_confirmar, errores = [], [], []
+    varias = len(textos) > 1 or len(data["transacciones"]) > 1
+    for item in data["transacciones"]:
+        campos, error = validar_transaccion_ia(item, textos, varias, textos_fecha)
+        if error:
+            errores.append(error)
+        elif item.get("confidence", 0) < 0.7:
+            # 🤔 5) CONFIDENCE BAJA → NO BLOQUEA
+            a_confirmar.append(item)
+        else:
+            nuevas.append(Transaccion(usuario_id=perfil.user_id, **campos))
+
+    if not nuevas and not a_confirmar:
         registrar_no_transaccion(perfil)
-        send_message(chat_id, "El monto detectado no es válido.")
+        send_message(chat_id, errores[0])
         return
 
-    CATEGORIAS_VALIDAS = {
-        "Comida", "Salario", "Compras",
-        "Transferencias", "Servicios",
-        "Ventas", "Otros"
-    }
-    categoria = data["categoria"] if data.get("categoria") in CATEGORIAS_VALIDAS else "Otros"
+    # ✅ 6) TRANSACCIONES VÁLIDAS → RESET STRIKES
+    if nuevas:
+        registrar_transaccion_valida(perfil)
+        guardar_lote(perfil.user_id, nuevas)
+
+        if len(nuevas) == 1:
+            send_message(chat_id, "✅ Transacción registrada correctamente.")
+        else:
+            detalle = "\n".join(
+                f"• {t.descripcion}: {'+' if t.tipo == 'ingreso' else '-'}${formatear_pesos(t.cantidad)}"
+                for t in nuevas
+            )
+            send_message(chat_id, f"✅ Registré {len(nuevas)} transacciones:\n{detalle}")
 
-    # 🤔 5) CONFIDENCE BAJA → NO BLOQUEA
-    if data.get("confidence", 0) < 0.7:
+    if a_confirmar:
         send_message(
             chat_id,
             "Detecté esto, ¿confirmás?\n"
-            + json.dumps(data, indent=2, ensure_ascii=False)
+            + json.dumps(a_confirmar if len(a_confirmar) > 1 else a_confirmar[0], indent=2, ensure_ascii=False)
         )
-        return
+    for error in errores:
+        send_message(chat_id, error)
+    return nuevas
+
+def validar_transaccion_ia(item, textos, varias=False, textos_fecha=None):
+    """
+    Valida una transacción devuelta por la IA. Devuelve (campos, None) con
+    los campos de Transaccion o (None, mensaje de error para el usuario).
+    Si hay varias, cada una se describe con su fragmento y no con el mensaje entero.
+    """
+    if not item.get("tipo") or not item.get("monto"):
+        return None, "Falta información clave (tipo o monto). ¿Podés aclararlo?"
+
+    tipo = str(item["tipo"]).lower()
+    if tipo not in {"ingreso", "gasto"}:
+        return None, "No pude determinar si es ingreso o gasto."
 
-    # ✅ 6) TRANSACCIÓN VÁLIDA → RESET STRIKES
-    registrar_transaccion_valida(perfil)
-    print("MONTO IA:", data["monto"])
-    print("MONTO FINAL A GUARDAR:", monto)
-
-    Transaccion.objects.create(
-        usuario=usuario,
-        tipo=tipo,
-        cantidad=monto,
-        categoria=categoria,
-        destino=data.get("destino"),
-        fecha=fecha,
-        descripcion=text
-    )
+    try:
+        monto = Decimal(str(item["monto"]))
+    except Exception:
+        return None, "El monto detectado no es válido."
+    if monto <= 0:
+        return None, "El monto detectado no es válido."
 
-    send_message(chat_id, "✅ Transacción registrada correctamente.")
+    # Mensaje del que salió (numerados desde 1) para resolver "ayer", "el lunes", etc.
+    try:
+        indice = int(item.get("mensaje") or 1) - 1
+        texto = textos[indice]
+    except (ValueError, TypeError, IndexError):
+        indice, texto = 0, textos[0]
+    texto_fecha = textos_fecha[indice] if textos_fecha else texto
+
+    categoria = item["categoria"] if item.get("categoria") in CATEGORIAS_VALIDAS else "Otros"
+    descripcion = (item.get("descripcion") or texto) if varias else texto
+
+    return {
+        "tipo": tipo,
+        "cantidad": monto,
+        "categoria": categoria,
+        "destino": item.get("destino"),
+        "fecha": resolver_fecha(texto_fecha, item),
+        "descripcion": descripcion[:200],
+    }, None
+
+PROMPT_EXTRACCION = """
+Extraé TODAS las transacciones financieras que el usuario describa, SOLO si
+describen acciones que YA ocurrieron. Un mensaje puede tener varias
+(ej: "café 1500, taxi 4000, super 23000") y puede haber varios mensajes
+numerados como [1], [2], ...
+
+Ignorá suposiciones, intenciones futuras o posibilidades.
+
+Respondé EXCLUSIVAMENTE en formato JSON con:
+
+{
+"es_transaccion": true | false,
+"transacciones": [
+    {
+    "tipo": "ingreso" | "gasto",
+    "monto": number,
+    "categoria": "Comida" | "Salario" | "Compras" | "Transferencias" | "Servicios" | "Ventas" | "Otros",
+    "fecha": "YYYY-MM-DD" | null,
+    "destino": string | null,
+    "descripcion": string,
+    "mensaje": number,
+    "confidence": number
+    }
+]
+}
+
+"descripcion" es el fragmento del texto que describe esa transacción y
+"mensaje" el número del mensaje del que salió (1 si hay uno solo).
+Si nada ocurrió todavía, respondé {"es_transaccion": false, "transacciones": []}.
+"""
+
+def normalizar_respuesta_ia(data):
+    """
+    Lleva la respuesta de la IA a {"es_transaccion", "transacciones": [...]}.
+    Acepta también el formato viejo de una sola transacción por objeto.
+    """
+    if not isinstance(data, dict):
+        return None
+    if "transacciones" in data:
+        items = [t for t in data.get("transacciones") or [] if isinstance(t, dict)]
+    elif data.get("es_transaccion", True) and (data.get("tipo") or data.get("monto")):
+        items = [data]
+    else:
+        items = []
+    return {
+        "es_transaccion": bool(items) or data.get("es_transaccion", True),
+        "transacciones": items,
+    }
 
-    
-def extraer_transaccion_openai(text):
-    print("🔥 ENTRO A extraer_transaccion_openai 🔥", flush=True)
-    print("Texto recibido:", text, flush=True)
+def _pedido_extraccion(textos):
+    if len(textos) == 1:
+        contenido_usuario = textos[0]
+    else:
+        contenido_usuario = "\n".join(f"[{i}] {texto}" for i, texto in enumerate(textos, start=1))
+
+    return {
+        "messages": [
+            {"role": "system", "content": PROMPT_EXTRACCION},
+            {"role": "user", "content": contenido_usuario},
+        ],
+        "response_format": {"type": "json_object"},
+        # ~100 tokens por transacción: alcanza para listas largas
+        "max_tokens": 800,
+    }
 
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
+def _leer_extraccion(response):
+    data = normalizar_respuesta_ia(json.loads(response.choices[0].message.content))
+    if data is None:
+        return None, "respuesta_invalida"
+    return data, None
+
+def extraer_transacciones_openai(textos, usuario_id=None):
+    """
+    Con usuario_id, la llamada se descuenta de su cupo de la IA (las
+    respuestas que salen de la cache no cuentan).
+    """
+    if not settings.OPENAI_API_KEY:
         return None, "missing_api_key"
 
-    client = OpenAI(api_key=api_key)
-
-    try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {
-                    "role": "system",
-                    "content": """
-                Extraé una transacción financiera SOLO si el texto describe
-                una acción que YA ocurrió.
-
-                Si es una suposición, intención futura o posibilidad,
-                respondé EXCLUSIVAMENTE en formato JSON con:
-
-                {
-                "es_transaccion": false
-                }
-
-                Si ocurrió, respondé EXCLUSIVAMENTE en formato JSON con:
-
-                {
-                "tipo": "ingreso" | "gasto",
-                "monto": number,
-                "categoria": "Comida" | "Salario" | "Compras" | "Transferencias" | "Servicios" | "Ventas" | "Otros",
-                "fecha": "YYYY-MM-DD" | null,
-                "destino": string | null,
-                "confidence": number
-                }
-                """
-                },
-                {
-                    "role": "user",
-                    "content": text
-                }
-            ],
-            response_format={"type": "json_object"},
-            max_tokens=120
-        )
-
-        contenido = response.choices[0].message.content
-        data = json.loads(contenido)
-
+    # Mensajes ya vistos (con otros importes/fechas): sin llamar a la IA
+    data = buscar_extraccion(textos)
+    if data is not None:
         return data, None
 
+    if usuario_id is not None and not consumir_llamada_ia(usuario_id):
+        return None, "sin_cupo"
+
+    try:
+        data, err = _leer_extraccion(completar_chat(**_pedido_extraccion(textos)))
+        if data is not None:
+            guardar_extraccion(textos, data)
+        return data, err
+    except IASaturada as e:
+        logger.warning(f"[Bot] {e}")
+        return None, "ia_saturada"
     except Exception as e:
-        print("❌ ERROR IA:", e, flush=True)
+        logger.error(f"[Bot] Error IA: {e}")
         return None, "api_error"
 
 def get_file_info(file_id):
-    url = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/getFile?file_id={file_id}"
-    return requests.get(url).json()
-
+    return obtener_cliente().obtener_archivo(file_id)
 
-def descargar_archivo(url, destino):
-    r = requests.get(url)
-    with open(destino, "wb") as f:
-        f.write(r.content)
 
 def send_message(chat_id, text):
-    url = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/sendMessage"
-    payload = {"chat_id": chat_id, "text": text}
-    requests.post(url, json=payload)
+    try:
+        obtener_cliente().enviar_mensaje(chat_id, text)
+    except ErrorTelegram as e:
+        # No se relanza: reintentar el update entero duplicaría la transacción
+        logger.error(f"[Bot] No se pudo enviar el mensaje a {chat_id}: {e}")
@@ -24,6 +24,8 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 load_dotenv(BASE_DIR / ".env.local", override=True)
 
 NGROK_URL = os.getenv("NGROK_URL")
+# URL pública del sitio, la que el bot le pasa a los usuarios para registrarse
+SITIO_URL = os.getenv("SITIO_URL") or (f"https://{NGROK_URL}/" if NGROK_URL else "http://localhost:8000/")
 SECRET_KEY_DJANGO = os.getenv("SECRET_KEY_DJANGO")
 
 
@@ -50,9 +52,9 @@ LOGGING = {
     },
 }
 
-ALLOWED_HOSTS = ['localhost', '127.0.0.1', NGROK_URL]
+ALLOWED_HOSTS = ['localhost', '127.0.0.1'] + ([NGROK_URL] if NGROK_URL else [])
 
-CSRF_TRUSTED_ORIGINS = [f'https://{NGROK_URL}']
+CSRF_TRUSTED_ORIGINS = [f'https://{NGROK_URL}'] if NGROK_URL else []
 
 
 # Application definition
@@ -108,6 +110,104 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Por defecto en archivos para que el servidor web y los procesos del bot
+# compartan las invalidaciones. Con un solo proceso alcanza con LocMemCache;
+# en producción se puede apuntar a Redis/Memcached por variables de entorno.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', str(BASE_DIR / 'cache')),
+    }
+}
+
+# Segundos que se guarda el contexto del dashboard (se invalida antes si hay cambios)
+DASHBOARD_CACHE_TIMEOUT = int(os.getenv('DASHBOARD_CACHE_TIMEOUT', 300))
+
+
+# Bot de Telegram
+# Con el webhook asíncrono los updates se guardan en TrabajoBot y los procesa
+# `python manage.py run_bot_workers`. En False se procesan dentro de la request.
+
+TELEGRAM_WEBHOOK_ASINCRONO = os.getenv('TELEGRAM_WEBHOOK_ASINCRONO', 'true').lower() == 'true'
+BOT_COLA_MAX_INTENTOS = int(os.getenv('BOT_COLA_MAX_INTENTOS', 5))
+BOT_COLA_BACKOFF_BASE = float(os.getenv('BOT_COLA_BACKOFF_BASE', 2))   # segundos
+BOT_COLA_BACKOFF_MAX = float(os.getenv('BOT_COLA_BACKOFF_MAX', 300))
+# Mensajes de texto seguidos de un chat con menos de estos segundos entre el
+# primero y el último se extraen juntos (0 = sin agrupar)
+BOT_VENTANA_AGRUPACION = float(os.getenv('BOT_VENTANA_AGRUPACION', 5))
+# Las frases comunes ("gasté 20000 en comida") se interpretan con reglas, sin IA
+BOT_PARSER_LOCAL = os.getenv('BOT_PARSER_LOCAL', 'true').lower() == 'true'
+# Cache en memoria de respuestas de la IA por texto normalizado (0 = desactivada)
+BOT_CACHE_IA_TAMANIO = int(os.getenv('BOT_CACHE_IA_TAMANIO', 5000))
+BOT_CACHE_IA_TTL = int(os.getenv('BOT_CACHE_IA_TTL', 7 * 24 * 3600))
+# Horas que se recuerdan los update_id para descartar reenvíos
+BOT_UPDATES_TTL_HORAS = int(os.getenv('BOT_UPDATES_TTL_HORAS', 48))
+# Segundos que se cachea chat_id → perfil (se actualiza al vincular/desvincular)
+BOT_PERFIL_CACHE_TIMEOUT = int(os.getenv('BOT_PERFIL_CACHE_TIMEOUT', 3600))
+# Llamadas a la IA por usuario (0 = sin límite); se llevan en la cache
+BOT_IA_LLAMADAS_POR_MINUTO = int(os.getenv('BOT_IA_LLAMADAS_POR_MINUTO', 10))
+BOT_IA_LLAMADAS_POR_DIA = int(os.getenv('BOT_IA_LLAMADAS_POR_DIA', 300))
+
+# Cliente de la Bot API (finanzas/utils/telegram.py). TELEGRAM_API_URL se
+# puede apuntar a un servidor local para pruebas.
+TELEGRAM_TOKEN = os.getenv('TELEGRAM_TOKEN')
+TELEGRAM_API_URL = os.getenv('TELEGRAM_API_URL', 'https://api.telegram.org')
+TELEGRAM_TIMEOUT_CONEXION = float(os.getenv('TELEGRAM_TIMEOUT_CONEXION', 5))
+TELEGRAM_TIMEOUT_LECTURA = float(os.getenv('TELEGRAM_TIMEOUT_LECTURA', 30))
+TELEGRAM_MAX_REINTENTOS = int(os.getenv('TELEGRAM_MAX_REINTENTOS', 3))
+TELEGRAM_MAX_ESPERA_REINTENTO = float(os.getenv('TELEGRAM_MAX_ESPERA_REINTENTO', 30))
+TELEGRAM_MENSAJES_POR_SEGUNDO = float(os.getenv('TELEGRAM_MENSAJES_POR_SEGUNDO', 30))
+TELEGRAM_MENSAJES_POR_CHAT = float(os.getenv('TELEGRAM_MENSAJES_POR_CHAT', 1))
+# Fotos y documentos: bytes máximos (la Bot API no baja más de 20 MB) y
+# segundos para toda la descarga
+TELEGRAM_MAX_BYTES_DESCARGA = int(os.getenv('TELEGRAM_MAX_BYTES_DESCARGA', 10 * 1024 * 1024))
+TELEGRAM_TIMEOUT_DESCARGA = float(os.getenv('TELEGRAM_TIMEOUT_DESCARGA', 30))
+
+# `python manage.py run_telegram_polling`: alternativa al webhook sin túnel
+TELEGRAM_POLLING_TIMEOUT = int(os.getenv('TELEGRAM_POLLING_TIMEOUT', 25))
+BOT_POLLING_CONCURRENCIA = int(os.getenv('BOT_POLLING_CONCURRENCIA', 8))
+
+
+# OpenAI (finanzas/utils/openai_cliente.py): un cliente por proceso.
+# OPENAI_BASE_URL permite apuntar a un servidor local para pruebas.
+OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
+OPENAI_BASE_URL = os.getenv('OPENAI_BASE_URL')
+OPENAI_MODELO = os.getenv('OPENAI_MODELO', 'gpt-4o-mini')
+OPENAI_TIMEOUT = float(os.getenv('OPENAI_TIMEOUT', 20))
+OPENAI_MAX_RETRIES = int(os.getenv('OPENAI_MAX_RETRIES', 2))
+# Llamadas simultáneas a la IA por proceso (entre todos sus threads)
+OPENAI_MAX_CONCURRENCIA = int(os.getenv('OPENAI_MAX_CONCURRENCIA', 8))
+
+# OCR de fotos (finanzas/utils/ocr.py). TESSERACT_CMD puede ser solo
+# "tesseract" si está en el PATH. Con OCR_PROCESOS = 0 no se usa el pool.
+TESSERACT_CMD = os.getenv('TESSERACT_CMD', 'tesseract')
+OCR_IDIOMA = os.getenv('OCR_IDIOMA', 'spa')
+OCR_PROCESOS = int(os.getenv('OCR_PROCESOS', 2))
+OCR_TIMEOUT = float(os.getenv('OCR_TIMEOUT', 30))
+OCR_PREPROCESAR = os.getenv('OCR_PREPROCESAR', 'true').lower() == 'true'
+# Resolución que se le informa a Tesseract y lado mayor (px) al que se reduce la foto
+OCR_DPI = int(os.getenv('OCR_DPI', 300))
+OCR_MAX_LADO = int(os.getenv('OCR_MAX_LADO', 2000))
+# De las resoluciones que manda Telegram se baja la menor con este lado mayor (px)
+OCR_LADO_FOTO = int(os.getenv('OCR_LADO_FOTO', 1280))
+# Umbral adaptativo: radio del vecindario (px) y cuánto más oscuro que él es "tinta"
+OCR_RADIO_UMBRAL = int(os.getenv('OCR_RADIO_UMBRAL', 15))
+OCR_MARGEN_UMBRAL = int(os.getenv('OCR_MARGEN_UMBRAL', 10))
+# Inclinación máxima (grados) que se corrige; 0 desactiva el enderezado
+OCR_MAX_ANGULO = float(os.getenv('OCR_MAX_ANGULO', 5))
+# Tickets leídos con al menos esta confianza (0-1) se registran sin la IA
+OCR_RECIBO_CONFIANZA = float(os.getenv('OCR_RECIBO_CONFIANZA', 0.85))
+# Resultados OCR que se guardan (ResultadoOCR) para no releer fotos repetidas
+OCR_CACHE_MAX_FILAS = int(os.getenv('OCR_CACHE_MAX_FILAS', 10000))
+# Fotos con el mismo total y a lo sumo estos bits distintos de dHash se toman
+# como el mismo ticket; se comparan contra los últimos OCR_CACHE_PARECIDOS registrados
+OCR_DHASH_DISTANCIA = int(os.getenv('OCR_DHASH_DISTANCIA', 6))
+OCR_CACHE_PARECIDOS = int(os.getenv('OCR_CACHE_PARECIDOS', 200))
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 